@@ -0,0 +1,111 @@
+import logging
+from typing import Dict, List, Tuple
+
+from cooldown_cache import utc_now
+from write_behind import WriteBehindBuffer
+
+
+class AuditLog(WriteBehindBuffer):
+    """Append-only queue for transactions, drop_stats and card views, written in batches"""
+
+    name = "audit log"
+
+    def __init__(self, database, flush_interval: float = 5.0, flush_events: int = 500,
+                 max_pending: int = 5000):
+        super().__init__(flush_interval)
+        self.database = database
+        self.flush_events = flush_events
+        # Past this many queued rows, loggers wait for a flush instead of growing the queue
+        self.max_pending = max_pending
+
+        self._transactions: List[Tuple[str, str, int, str, str]] = []
+        self._drops: List[Tuple[str, str, int, str, str, str]] = []
+        # (card_id, user_id) -> time of the latest view; card_id -> views since the last flush
+        self._view_interactions: Dict[Tuple[int, str], str] = {}
+        self._view_counts: Dict[int, int] = {}
+
+        self.written = 0
+
+    def pending(self) -> int:
+        """Number of queued rows"""
+        return len(self._transactions) + len(self._drops) + len(self._view_interactions)
+
+    async def _queued(self):
+        """Wake the flusher when the batch is full, and apply backpressure when it falls behind"""
+        pending = self.pending()
+        if pending >= self.max_pending:
+            await self.flush()
+        elif pending >= self.flush_events:
+            self.request_flush()
+
+    @staticmethod
+    def _timestamp() -> str:
+        # Stamped when queued so batching doesn't shift created_at
+        return utc_now().isoformat(sep=' ', timespec='seconds')
+
+    async def log_transaction(self, user_id: str, transaction_type: str, amount: int, description: str):
+        """Queue a transactions row"""
+        self._transactions.append((user_id, transaction_type, amount, description, self._timestamp()))
+        await self._queued()
+
+    async def log_drop(self, guild_id: str, user_id: str, amount: int, rarity: str, collection_type: str):
+        """Queue a drop_stats row"""
+        self._drops.append((guild_id, user_id, amount, rarity, collection_type, self._timestamp()))
+        await self._queued()
+
+    async def log_card_view(self, card_id: int, user_id: str):
+        """Queue a card view; repeat views by the same user collapse into one interaction row"""
+        self._view_interactions[(card_id, user_id)] = self._timestamp()
+        self._view_counts[card_id] = self._view_counts.get(card_id, 0) + 1
+        await self._queued()
+
+    async def flush(self) -> int:
+        """Write everything queued in one transaction and return the number of rows written"""
+        async with self._flush_lock:
+            transactions, self._transactions = self._transactions, []
+            drops, self._drops = self._drops, []
+            view_interactions, self._view_interactions = self._view_interactions, {}
+            view_counts, self._view_counts = self._view_counts, {}
+
+            if not transactions and not drops and not view_interactions:
+                return 0
+
+            try:
+                async with self.database.write() as db:
+                    if transactions:
+                        await db.executemany(
+                            'INSERT INTO transactions (user_id, type, amount, description, created_at) VALUES (?, ?, ?, ?, ?)',
+                            transactions
+                        )
+                    if drops:
+                        await db.executemany(
+                            """INSERT INTO drop_stats
+                               (guild_id, user_id, amount, rarity, collection_type, drop_timestamp)
+                               VALUES (?, ?, ?, ?, ?, ?)""",
+                            drops
+                        )
+                    if view_interactions:
+                        await db.executemany(
+                            """INSERT OR REPLACE INTO intro_card_interactions
+                               (card_id, user_id, interaction_type, created_at)
+                               VALUES (?, ?, 'view', ?)""",
+                            [(card_id, user_id, viewed_at) for (card_id, user_id), viewed_at in view_interactions.items()]
+                        )
+                        await db.executemany(
+                            'UPDATE introduction_cards SET views_count = views_count + ? WHERE id = ?',
+                            [(count, card_id) for card_id, count in view_counts.items()]
+                        )
+            except Exception as e:
+                logging.error(f"Error writing audit log ({len(transactions) + len(drops)} rows): {e}")
+                # Requeue ahead of anything logged meanwhile so order is kept
+                self._transactions = transactions + self._transactions
+                self._drops = drops + self._drops
+                for key, viewed_at in view_interactions.items():
+                    self._view_interactions.setdefault(key, viewed_at)
+                for card_id, count in view_counts.items():
+                    self._view_counts[card_id] = self._view_counts.get(card_id, 0) + count
+                return 0
+
+            written = len(transactions) + len(drops) + len(view_interactions)
+            self.written += written
+            return written
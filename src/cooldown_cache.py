@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from write_behind import WriteBehindBuffer
+
+
+def utc_now() -> datetime:
+    """Naive UTC timestamp, matching SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CooldownCache(WriteBehindBuffer):
+    """Write-through TTL cache of (user_id, command_type) -> last_used in front of the cooldowns table"""
+
+    name = "cooldown cache"
+
+    def __init__(self, database, cooldown_minutes: Dict[str, int], flush_interval: float = 5.0,
+                 default_ttl_minutes: int = 24 * 60):
+        super().__init__(flush_interval)
+        self.database = database
+        self.cooldown_minutes = cooldown_minutes
+        self.default_ttl_minutes = default_ttl_minutes
+
+        self._last_used: Dict[Tuple[str, str], datetime] = {}
+        self._pending: Dict[Tuple[str, str], datetime] = {}
+        # Once warmed, a miss means "no running cooldown" and never reaches the database
+        self.is_warm = False
+
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, command_type: str) -> timedelta:
+        """How long a last_used timestamp matters for a command"""
+        return timedelta(minutes=self.cooldown_minutes.get(command_type) or self.default_ttl_minutes)
+
+    def _max_ttl(self) -> timedelta:
+        return max([self._ttl(command_type) for command_type in self.cooldown_minutes] +
+                   [timedelta(minutes=self.default_ttl_minutes)])
+
+    async def warm(self):
+        """Load every cooldown that can still be running from the table"""
+        cutoff = utc_now() - self._max_ttl()
+        async with self.database.read() as db:
+            async with db.execute(
+                'SELECT user_id, command_type, last_used FROM cooldowns WHERE datetime(last_used) >= datetime(?)',
+                (cutoff.isoformat(sep=' '),)
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        now = utc_now()
+        for user_id, command_type, last_used in rows:
+            used_at = datetime.fromisoformat(last_used)
+            if now - used_at < self._ttl(command_type):
+                self._last_used[(user_id, command_type)] = used_at
+
+        self.is_warm = True
+        logging.info(f"Loaded {len(self._last_used)} active cooldowns")
+
+    def get(self, user_id: str, command_type: str) -> Optional[datetime]:
+        """Last use of a command if it is still within its cooldown window"""
+        key = (user_id, command_type)
+        used_at = self._last_used.get(key)
+        if used_at is None:
+            self.misses += 1
+            return None
+
+        if utc_now() - used_at >= self._ttl(command_type):
+            # Expired: nothing to report, and nothing worth keeping in memory
+            del self._last_used[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return used_at
+
+    def set(self, user_id: str, command_type: str, used_at: Optional[datetime] = None):
+        """Record a use in memory and queue it for the next batch write"""
+        key = (user_id, command_type)
+        used_at = used_at or utc_now()
+        self._last_used[key] = used_at
+        self._pending[key] = used_at
+
+    def evict_expired(self) -> int:
+        """Drop timestamps that no longer affect any cooldown"""
+        now = utc_now()
+        expired = [
+            key for key, used_at in self._last_used.items()
+            if now - used_at >= self._ttl(key[1]) and key not in self._pending
+        ]
+        for key in expired:
+            del self._last_used[key]
+        return len(expired)
+
+    async def flush(self) -> int:
+        """Upsert all pending timestamps in one transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                self.evict_expired()
+                return 0
+
+            pending, self._pending = self._pending, {}
+            rows: List[Tuple[str, str, str]] = [
+                (user_id, command_type, used_at.isoformat(sep=' ', timespec='seconds'))
+                for (user_id, command_type), used_at in pending.items()
+            ]
+
+            try:
+                async with self.database.write() as db:
+                    await db.executemany(
+                        """INSERT INTO cooldowns (user_id, command_type, last_used) VALUES (?, ?, ?)
+                           ON CONFLICT(user_id, command_type) DO UPDATE SET last_used = excluded.last_used""",
+                        rows
+                    )
+            except Exception as e:
+                logging.error(f"Error persisting {len(rows)} cooldowns: {e}")
+                # Keep anything newer that arrived meanwhile, retry the rest next time
+                for key, used_at in pending.items():
+                    self._pending.setdefault(key, used_at)
+                return 0
+
+            self.evict_expired()
+            return len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size, pending writes and hit/miss counters"""
+        return {
+            'size': len(self._last_used),
+            'pending': len(self._pending),
+            'hits': self.hits,
+            'misses': self.misses
+        }
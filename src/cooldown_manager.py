@@ -1,10 +1,10 @@
 import asyncio
-from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Tuple
 import logging
 
 from database import database
 from config import config
+from cooldown_cache import utc_now
 
 class CooldownManager:
     """Manages command cooldowns and active effects"""
@@ -22,15 +22,9 @@ class CooldownManager:
         if 'use_item' not in self.cooldowns:
             self.cooldowns['use_item'] = 1  # 1 minute
     
-    async def check_cooldown(self, user_id: str, command_type: str) -> Dict[str, Any]:
-        """Check if user is on cooldown for a command"""
+    async def check_cooldown(self, user_id: str, command_type: str, use_effects: bool = True) -> Dict[str, Any]:
+        """Check if user is on cooldown for a command (use_effects=False for display, so no charges are spent)"""
         try:
-            # Check for work energy effect that removes work cooldown
-            if command_type == 'work':
-                has_work_energy = await self.has_active_effect(user_id, 'work_cooldown_reset')
-                if has_work_energy:
-                    return {"on_cooldown": False, "time_left": 0}
-            
             cooldown_time = self.cooldowns.get(command_type)
             if not cooldown_time:
                 return {"on_cooldown": False, "time_left": 0}
@@ -40,14 +34,23 @@ class CooldownManager:
             if not last_used:
                 return {"on_cooldown": False, "time_left": 0}
             
-            # Calculate time difference
-            now = datetime.now()
+            # Calculate time difference (cooldowns are stored in UTC)
+            now = utc_now()
             time_diff = now - last_used
             minutes_passed = time_diff.total_seconds() / 60
             
             if minutes_passed >= cooldown_time:
                 return {"on_cooldown": False, "time_left": 0}
             
+            # Work energy skips the work cooldown, one charge per skip
+            if command_type == 'work':
+                if use_effects:
+                    skipped = database.effects.use_effect(user_id, 'work_cooldown_reset')
+                else:
+                    skipped = await self.has_active_effect(user_id, 'work_cooldown_reset')
+                if skipped:
+                    return {"on_cooldown": False, "time_left": 0}
+            
             time_left = int(cooldown_time - minutes_passed)
             return {"on_cooldown": True, "time_left": time_left}
             
@@ -107,7 +110,7 @@ class CooldownManager:
         try:
             cooldowns = {}
             for command_type in self.cooldowns.keys():
-                cooldown_data = await self.check_cooldown(user_id, command_type)
+                cooldown_data = await self.check_cooldown(user_id, command_type, use_effects=False)
                 if cooldown_data['on_cooldown']:
                     cooldowns[command_type] = {
                         'time_left': cooldown_data['time_left'],
@@ -121,10 +124,7 @@ class CooldownManager:
     async def has_active_effect(self, user_id: str, effect_type: str) -> bool:
         """Check if user has an active effect"""
         try:
-            # This would check the active_effects table
-            # For now, return False as effects system needs to be implemented
-            # TODO: Implement active effects checking
-            return False
+            return database.effects.has_effect(user_id, effect_type)
         except Exception as error:
             logging.error(f'Error checking active effect: {error}')
             return False
@@ -132,12 +132,8 @@ class CooldownManager:
     async def apply_gambling_luck(self, user_id: str) -> bool:
         """Apply gambling luck effect"""
         try:
-            has_luck = await self.has_active_effect(user_id, 'gambling_luck')
-            if has_luck:
-                # Use one charge of the luck effect
-                await self.use_effect(user_id, 'gambling_luck')
-                return True
-            return False
+            # Use one charge of the luck effect if there is one
+            return database.effects.use_effect(user_id, 'gambling_luck')
         except Exception as error:
             logging.error(f'Error applying gambling luck: {error}')
             return False
@@ -145,11 +141,7 @@ class CooldownManager:
     async def has_experience_boost(self, user_id: str) -> bool:
         """Check if user has experience boost"""
         try:
-            has_boost = await self.has_active_effect(user_id, 'exp_boost')
-            if has_boost:
-                await self.use_effect(user_id, 'exp_boost')
-                return True
-            return False
+            return database.effects.use_effect(user_id, 'exp_boost')
         except Exception as error:
             logging.error(f'Error checking experience boost: {error}')
             return False
@@ -157,31 +149,30 @@ class CooldownManager:
     async def has_daily_double(self, user_id: str) -> bool:
         """Check if user has daily double effect"""
         try:
-            has_double = await self.has_active_effect(user_id, 'daily_double')
-            if has_double:
-                # Remove the effect after use (it's single use)
-                await self.remove_effect(user_id, 'daily_double')
-                return True
-            return False
+            # Remove the effect after use (it's single use)
+            return database.effects.remove_effect(user_id, 'daily_double')
         except Exception as error:
             logging.error(f'Error checking daily double: {error}')
             return False
     
+    async def add_effect(self, user_id: str, effect_type: str, duration_minutes: Optional[int] = None,
+                         uses: Optional[int] = None) -> int:
+        """Give a user an active effect"""
+        return await database.effects.add_effect(user_id, effect_type, duration_minutes, uses)
+    
     async def use_effect(self, user_id: str, effect_type: str) -> None:
         """Use an active effect (decrement uses or remove if expired)"""
-        # TODO: Implement effect usage
-        pass
+        database.effects.use_effect(user_id, effect_type)
     
     async def remove_effect(self, user_id: str, effect_type: str) -> None:
         """Remove an active effect"""
-        # TODO: Implement effect removal
-        pass
+        database.effects.remove_effect(user_id, effect_type)
     
     async def cleanup_expired_effects(self) -> None:
         """Clean up expired effects (run periodically)"""
         try:
-            # TODO: Implement expired effects cleanup
-            logging.info('🧹 Cleaned up expired effects')
+            removed = database.effects.cleanup_expired()
+            logging.info(f'🧹 Cleaned up {removed} expired effects')
         except Exception as error:
             logging.error(f'Error cleaning up expired effects: {error}')
     
@@ -1,4 +1,3 @@
-import aiosqlite
 import aiomysql
 import asyncio
 import json
@@ -8,6 +7,16 @@ from pathlib import Path
 import logging
 from config import config
 from mysql_database import MySQLDatabase
+from sqlite_connection import SQLiteConnectionManager
+from xp_ledger import XPLedger
+from cooldown_cache import CooldownCache
+from effects_engine import EffectsEngine
+from settings_cache import SettingsCache
+from audit_log import AuditLog
+from giveaway_entries import GiveawayEntryBuffer
+from migrations import MigrationRunner
+from leaderboards import METRICS, Leaderboards
+from utils.card_cache import card_image_cache
 
 class Database:
     """Async database manager for Wonder Discord Bot (supports SQLite and MySQL)"""
@@ -26,13 +35,66 @@ class Database:
             # SQLite configuration (fallback)
             self.db_path = Path(__file__).parent / db_path
             self.db_path.parent.mkdir(exist_ok=True)
+            sqlite_config = self.db_config.get('sqlite', {})
+            self.connections = SQLiteConnectionManager(
+                self.db_path,
+                read_connections=sqlite_config.get('read_connections', 3),
+                busy_timeout_ms=sqlite_config.get('busy_timeout_ms', 5000),
+                cache_size_kb=sqlite_config.get('cache_size_kb', 16000)
+            )
+
+        # Message XP is accumulated in memory and written in batches
+        write_behind = self.db_config.get('write_behind', {})
+        self.xp_ledger = XPLedger(
+            self,
+            flush_interval=write_behind.get('xp_flush_interval', 10),
+            flush_events=write_behind.get('xp_flush_events', 200)
+        )
+        # Command cooldowns are served from memory and persisted in batches
+        self.cooldown_cache = CooldownCache(
+            self,
+            config.cooldowns,
+            flush_interval=write_behind.get('cooldown_flush_interval', 5)
+        )
+        # Consumable effects live in memory; charge use and expiry are persisted in batches
+        self.effects = EffectsEngine(
+            self,
+            flush_interval=write_behind.get('effects_flush_interval', 5)
+        )
+        # Transaction, drop and card-view logs are appended in batches
+        self.audit_log = AuditLog(
+            self,
+            flush_interval=write_behind.get('audit_flush_interval', 5),
+            flush_events=write_behind.get('audit_flush_events', 500),
+            max_pending=write_behind.get('audit_max_pending', 5000)
+        )
+        # Giveaway reactions toggle entries; only the net change per user is written
+        self.giveaway_entries = GiveawayEntryBuffer(
+            self,
+            flush_interval=write_behind.get('giveaway_entry_flush_interval', 2),
+            flush_events=write_behind.get('giveaway_entry_flush_events', 500)
+        )
+        # Ranked balance/XP/drop leaderboards, rebuilt at startup and updated on every write
+        self.leaderboards = Leaderboards(self)
+        # Guild settings are read on most commands and level-ups but rarely written
+        self.settings_cache = SettingsCache(
+            refresh_seconds=self.db_config.get('settings_cache', {}).get('refresh_seconds', 300)
+        )
     
     async def _get_connection(self):
-        """Get database connection (MySQL pool or SQLite)"""
+        """Get database connection (MySQL pool or the shared SQLite writer)"""
         if self.use_mysql:
             return await self.mysql_db._get_connection()
         else:
-            return aiosqlite.connect(self.db_path)
+            return self.write()
+
+    def read(self):
+        """Borrow a pooled read-only SQLite connection (use with `async with`)"""
+        return self.connections.read()
+
+    def write(self):
+        """Hold the shared SQLite writer for one transaction (use with `async with`)"""
+        return self.connections.write()
     
     def _get_sql_syntax(self, type_name: str) -> str:
         """Get SQL syntax for different database types"""
@@ -60,11 +122,15 @@ class Database:
         
     async def init(self):
         """Initialize database and create all tables"""
+        self.xp_ledger.start()
+
         if self.use_mysql:
             await self.mysql_db.init()
+            await self.leaderboards.rebuild()
             return
             
-        async with await self._get_connection() as db:
+        await self.connections.open()
+        async with self.write() as db:
             # Users table for economy system
             users_sql = f"""
                 CREATE TABLE IF NOT EXISTS users (
@@ -138,34 +204,11 @@ class Database:
                     category_voice_enabled BOOLEAN DEFAULT TRUE,
                     category_role_enabled BOOLEAN DEFAULT TRUE,
                     category_overall_enabled BOOLEAN DEFAULT TRUE,
+                    level_roles TEXT,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             
-            # Add category columns to existing tables if they don't exist
-            try:
-                await db.execute("ALTER TABLE server_settings ADD COLUMN category_text_enabled BOOLEAN DEFAULT TRUE")
-            except:
-                pass
-            try:
-                await db.execute("ALTER TABLE server_settings ADD COLUMN category_voice_enabled BOOLEAN DEFAULT TRUE")
-            except:
-                pass
-            try:
-                await db.execute("ALTER TABLE server_settings ADD COLUMN category_role_enabled BOOLEAN DEFAULT TRUE")
-            except:
-                pass
-            try:
-                await db.execute("ALTER TABLE server_settings ADD COLUMN category_overall_enabled BOOLEAN DEFAULT TRUE")
-            except:
-                pass
-            
-            # Add gender column to introduction_cards table if it doesn't exist
-            try:
-                await db.execute("ALTER TABLE introduction_cards ADD COLUMN gender TEXT")
-            except:
-                pass
-
             # Transaction history
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS transactions (
@@ -320,12 +363,6 @@ class Database:
                 )
             """)
             
-            # Add settings column to existing drop_channels if it doesn't exist
-            try:
-                await db.execute("ALTER TABLE drop_channels ADD COLUMN settings TEXT DEFAULT '{}'")
-            except:
-                pass  # Column already exists
-
             # WonderCoins drop statistics table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS drop_stats (
@@ -354,16 +391,26 @@ class Database:
                 )
             """)
 
+            # Columns, keys and indexes added since the tables above were first created
+            await MigrationRunner('sqlite').run(db)
+
             await db.commit()
 
+        await self.cooldown_cache.warm()
+        self.cooldown_cache.start()
+        await self.effects.load()
+        self.effects.start()
+        self.audit_log.start()
+        self.giveaway_entries.start()
+        await self.leaderboards.rebuild()
+
     # User economy methods
     async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user data from database"""
         if self.use_mysql:
             return await self.mysql_db.get_user(user_id)
             
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute('SELECT * FROM users WHERE user_id = ?', (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
@@ -373,41 +420,67 @@ class Database:
         if self.use_mysql:
             return await self.mysql_db.create_user(user_id, username)
             
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 'INSERT OR IGNORE INTO users (user_id, username) VALUES (?, ?)',
                 (user_id, username)
             )
             await db.commit()
-            return cursor.lastrowid
+        if cursor.rowcount > 0:
+            self.leaderboards.set('balance', user_id, 0)
+        return cursor.lastrowid
 
     async def update_balance(self, user_id: str, amount: int) -> int:
         """Update user balance by adding the specified amount"""
         if self.use_mysql:
-            return await self.mysql_db.update_balance(user_id, amount)
-            
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                'UPDATE users SET balance = balance + ?, total_earned = total_earned + ? WHERE user_id = ?',
-                (amount, max(0, amount), user_id)
-            )
-            await db.commit()
-            return cursor.rowcount
+            updated = await self.mysql_db.update_balance(user_id, amount)
+        else:
+            async with self.write() as db:
+                cursor = await db.execute(
+                    'UPDATE users SET balance = balance + ?, total_earned = total_earned + ? WHERE user_id = ?',
+                    (amount, max(0, amount), user_id)
+                )
+                await db.commit()
+            updated = cursor.rowcount
+        if updated:
+            self.leaderboards.add('balance', user_id, amount)
+        return updated
+
+    async def increment_balance(self, user_id: str, amount: int, username: str = 'Unknown') -> int:
+        """Atomically add to a user's balance (creating the user if needed) and return the new balance"""
+        if self.use_mysql:
+            balance = await self.mysql_db.increment_balance(user_id, amount, username)
+        else:
+            async with self.write() as db:
+                async with db.execute(
+                    """INSERT INTO users (user_id, username, balance, total_earned) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                           balance = balance + excluded.balance,
+                           total_earned = total_earned + excluded.total_earned
+                       RETURNING balance""",
+                    (user_id, username, amount, max(0, amount))
+                ) as cursor:
+                    row = await cursor.fetchone()
+            balance = row[0]
+        self.leaderboards.set('balance', user_id, balance)
+        return balance
 
     async def set_balance(self, user_id: str, amount: int) -> int:
         """Set user balance to the specified amount"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 'UPDATE users SET balance = ? WHERE user_id = ?',
                 (amount, user_id)
             )
             await db.commit()
-            return cursor.rowcount
+        if cursor.rowcount:
+            self.leaderboards.set('balance', user_id, amount)
+        return cursor.rowcount
 
     async def update_daily_claim(self, user_id: str) -> int:
         """Update the daily claim timestamp for a user"""
         now = datetime.now().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 'UPDATE users SET daily_last_claimed = ? WHERE user_id = ?',
                 (now, user_id)
@@ -418,7 +491,7 @@ class Database:
     async def update_work_claim(self, user_id: str) -> int:
         """Update the work claim timestamp for a user"""
         now = datetime.now().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 'UPDATE users SET work_last_used = ? WHERE user_id = ?',
                 (now, user_id)
@@ -433,10 +506,18 @@ class Database:
             if not user_id:
                 return False
             
+            # Absolute XP writes must land after any buffered gains
+            if any(field in user_data for field in ('xp', 'level', 'total_messages')):
+                await self.xp_ledger.flush()
+            
             if self.use_mysql:
-                return await self.mysql_db.save_user(user_data)
+                saved = await self.mysql_db.save_user(user_data)
+                self.xp_ledger.invalidate(user_id)
+                if saved:
+                    self._update_leaderboards(user_id, user_data)
+                return saved
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.write() as db:
                 # Handle users table fields
                 user_fields = ['username', 'balance', 'daily_last_claimed', 'work_last_used', 'total_earned']
                 user_updates = {}
@@ -494,16 +575,27 @@ class Database:
                         )
                 
                 await db.commit()
-                return True
+            
+            self.xp_ledger.invalidate(user_id)
+            self._update_leaderboards(user_id, user_data)
+            return True
                 
         except Exception as e:
             logging.error(f"Error saving user data: {e}")
             return False
 
+    def _update_leaderboards(self, user_id: str, user_data: Dict[str, Any]):
+        """Apply absolute scores written by save_user to the leaderboards"""
+        for metric in ('balance', 'xp'):
+            if user_data.get(metric) is not None:
+                self.leaderboards.set(metric, user_id, user_data[metric])
+
     # Introduction card methods
     async def save_intro_card(self, data: Dict[str, Any]) -> int:
         """Save introduction card data"""
-        async with aiosqlite.connect(self.db_path) as db:
+        # Renders are keyed by the card's contents, so this only frees the outdated images
+        await card_image_cache.invalidate(str(data['user_id']))
+        async with self.write() as db:
             # Check if card exists
             existing = await self.get_intro_card(data['user_id'])
             
@@ -544,16 +636,14 @@ class Database:
 
     async def get_intro_card(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get introduction card for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute('SELECT * FROM introduction_cards WHERE user_id = ?', (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
 
     async def get_intro_cards_by_guild(self, guild_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all public introduction cards for a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute(
                 'SELECT * FROM introduction_cards WHERE guild_id = ? AND is_public = TRUE AND is_approved = TRUE ORDER BY created_at DESC LIMIT ?', 
                 (guild_id, limit)
@@ -563,14 +653,20 @@ class Database:
 
     async def delete_intro_card(self, user_id: str) -> bool:
         """Delete introduction card for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute('DELETE FROM introduction_cards WHERE user_id = ?', (user_id,))
             await db.commit()
-            return cursor.rowcount > 0
+        await card_image_cache.invalidate(str(user_id))
+        return cursor.rowcount > 0
 
     async def add_card_interaction(self, card_id: int, user_id: str, interaction_type: str, comment_text: str = None) -> bool:
         """Add interaction to introduction card"""
-        async with aiosqlite.connect(self.db_path) as db:
+        if interaction_type == 'view':
+            # Views are counted in batches by the audit log
+            await self.audit_log.log_card_view(card_id, user_id)
+            return True
+        
+        async with self.write() as db:
             try:
                 cursor = await db.execute(
                     """INSERT OR REPLACE INTO intro_card_interactions 
@@ -585,11 +681,6 @@ class Database:
                         'UPDATE introduction_cards SET likes_count = (SELECT COUNT(*) FROM intro_card_interactions WHERE card_id = ? AND interaction_type = "like") WHERE id = ?',
                         (card_id, card_id)
                     )
-                elif interaction_type == 'view':
-                    await db.execute(
-                        'UPDATE introduction_cards SET views_count = views_count + 1 WHERE id = ?',
-                        (card_id,)
-                    )
                 
                 await db.commit()
                 return True
@@ -599,7 +690,7 @@ class Database:
 
     async def remove_card_interaction(self, card_id: int, user_id: str, interaction_type: str) -> bool:
         """Remove interaction from introduction card"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 'DELETE FROM intro_card_interactions WHERE card_id = ? AND user_id = ? AND interaction_type = ?',
                 (card_id, user_id, interaction_type)
@@ -617,8 +708,7 @@ class Database:
 
     async def get_card_interactions(self, card_id: int, interaction_type: str = None) -> List[Dict[str, Any]]:
         """Get interactions for a card"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             if interaction_type:
                 async with db.execute(
                     'SELECT * FROM intro_card_interactions WHERE card_id = ? AND interaction_type = ? ORDER BY created_at DESC',
@@ -634,52 +724,59 @@ class Database:
             return [dict(row) for row in rows]
 
     # Transaction methods
-    async def add_transaction(self, user_id: str, transaction_type: str, amount: int, description: str) -> int:
-        """Add a transaction record"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                'INSERT INTO transactions (user_id, type, amount, description) VALUES (?, ?, ?, ?)',
-                (user_id, transaction_type, amount, description)
-            )
-            await db.commit()
-            return cursor.lastrowid
+    async def add_transaction(self, user_id: str, transaction_type: str, amount: int, description: str) -> None:
+        """Add a transaction record (written with the next audit log batch)"""
+        await self.audit_log.log_transaction(user_id, transaction_type, amount, description)
 
     # Server settings methods
     async def get_server_settings(self, guild_id: str) -> Optional[Dict[str, Any]]:
         """Get server settings"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        found, settings = self.settings_cache.get(guild_id)
+        if found:
+            return settings
+
+        generation = self.settings_cache.generation
+        async with self.read() as db:
             async with db.execute('SELECT * FROM server_settings WHERE guild_id = ?', (guild_id,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+
+        settings = dict(row) if row else None
+        if settings is not None:
+            settings['level_roles'] = json.loads(settings['level_roles']) if settings.get('level_roles') else {}
+        self.settings_cache.put(guild_id, settings, generation)
+        return settings
     
     async def save_server_settings(self, settings: Dict[str, Any]) -> bool:
         """Save server settings"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             try:
                 # Check if settings exist
                 existing = await self.get_server_settings(settings['guild_id'])
                 
+                level_roles = json.dumps(settings['level_roles']) if 'level_roles' in settings else None
+                
                 if existing:
                     # Update existing settings
                     await db.execute(
                         """UPDATE server_settings SET 
-                           intro_card_theme=?, intro_card_style=?, intro_card_background_url=?
+                           intro_card_theme=?, intro_card_style=?, intro_card_background_url=?,
+                           level_roles=COALESCE(?, level_roles)
                            WHERE guild_id=?""",
                         (settings.get('intro_card_theme'), settings.get('intro_card_style'), 
-                         settings.get('intro_card_background_url'), settings['guild_id'])
+                         settings.get('intro_card_background_url'), level_roles, settings['guild_id'])
                     )
                 else:
                     # Insert new settings
                     await db.execute(
                         """INSERT INTO server_settings 
-                           (guild_id, intro_card_theme, intro_card_style, intro_card_background_url) 
-                           VALUES (?, ?, ?, ?)""",
+                           (guild_id, intro_card_theme, intro_card_style, intro_card_background_url, level_roles) 
+                           VALUES (?, ?, ?, ?, ?)""",
                         (settings['guild_id'], settings.get('intro_card_theme'), 
-                         settings.get('intro_card_style'), settings.get('intro_card_background_url'))
+                         settings.get('intro_card_style'), settings.get('intro_card_background_url'), level_roles)
                     )
                 
                 await db.commit()
+                self.settings_cache.invalidate(settings['guild_id'])
                 return True
             except Exception as e:
                 logging.error(f"Error saving server settings: {e}")
@@ -687,7 +784,7 @@ class Database:
 
     async def update_server_settings(self, guild_id: str, settings: Dict[str, Any]) -> int:
         """Update server settings"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             cursor = await db.execute(
                 """INSERT OR REPLACE INTO server_settings 
                    (guild_id, welcome_channel, introduction_channel, welcome_message) 
@@ -696,48 +793,89 @@ class Database:
                  settings.get('introduction_channel'), settings.get('welcome_message'))
             )
             await db.commit()
-            return cursor.lastrowid
+        self.settings_cache.invalidate(guild_id)
+        return cursor.lastrowid
 
     # Leaderboard methods
     async def get_top_users(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top users by balance"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if self.leaderboards.is_built:
+            user_ids = [user_id for user_id, _ in self.leaderboards.top('balance', limit)]
+            users = await self._get_users_by_id(user_ids)
+            return [users[user_id] for user_id in user_ids if user_id in users]
+        
+        async with self.read() as db:
             async with db.execute(
                 'SELECT * FROM users ORDER BY balance DESC LIMIT ?', (limit,)
             ) as cursor:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
+    async def _get_users_by_id(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch users rows by primary key"""
+        if not user_ids:
+            return {}
+        if self.use_mysql:
+            return await self.mysql_db.get_users_by_id(user_ids)
+        placeholders = ', '.join('?' for _ in user_ids)
+        async with self.read() as db:
+            async with db.execute(f'SELECT * FROM users WHERE user_id IN ({placeholders})', user_ids) as cursor:
+                rows = await cursor.fetchall()
+                return {row['user_id']: dict(row) for row in rows}
+
+    async def get_leaderboard_scores(self, metric: str) -> List[Tuple[str, int]]:
+        """Every (user_id, score) stored for a leaderboard metric"""
+        if self.use_mysql:
+            return await self.mysql_db.get_leaderboard_scores(metric)
+
+        table, column = METRICS[metric]
+        async with self.read() as db:
+            async with db.execute(f'SELECT user_id, {column} FROM {table} WHERE {column} IS NOT NULL') as cursor:
+                return [tuple(row) for row in await cursor.fetchall()]
+
+    async def get_leaderboard(self, metric: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get ranked entries (rank, user_id, username, score) for a leaderboard metric"""
+        entries = self.leaderboards.top(metric, limit, offset)
+        users = await self._get_users_by_id([user_id for user_id, _ in entries])
+        return [
+            {
+                'rank': offset + position,
+                'user_id': user_id,
+                'username': users.get(user_id, {}).get('username') or 'Unknown',
+                'score': score
+            }
+            for position, (user_id, score) in enumerate(entries, 1)
+        ]
+
+    def get_user_rank(self, metric: str, user_id: str, guild_id: Optional[str] = None) -> Optional[int]:
+        """Get a user's 1-based position on a leaderboard (globally or within a guild), or None if unranked"""
+        position = self.leaderboards.position(metric, user_id, guild_id, radius=0)
+        return position['rank'] if position else None
+
+    def get_rank_position(self, metric: str, user_id: str, guild_id: Optional[str] = None,
+                          radius: int = 2) -> Optional[Dict[str, Any]]:
+        """Get a user's rank, the number of ranked users and their neighbours (globally or within a guild)"""
+        return self.leaderboards.position(metric, user_id, guild_id, radius)
+
     # Inventory methods
     async def add_item_to_inventory(self, user_id: str, item_id: str, quantity: int = 1) -> int:
-        """Add item to user inventory"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Check if item already exists
+        """Add item to user inventory and return the new quantity"""
+        if self.use_mysql:
+            return await self.mysql_db.add_item_to_inventory(user_id, item_id, quantity)
+            
+        async with self.write() as db:
             async with db.execute(
-                'SELECT quantity FROM user_inventory WHERE user_id = ? AND item_id = ?',
-                (user_id, item_id)
+                """INSERT INTO user_inventory (user_id, item_id, quantity) VALUES (?, ?, ?)
+                   ON CONFLICT(user_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+                   RETURNING quantity""",
+                (user_id, item_id, quantity)
             ) as cursor:
-                existing = await cursor.fetchone()
-            
-            if existing:
-                cursor = await db.execute(
-                    'UPDATE user_inventory SET quantity = quantity + ? WHERE user_id = ? AND item_id = ?',
-                    (quantity, user_id, item_id)
-                )
-            else:
-                cursor = await db.execute(
-                    'INSERT INTO user_inventory (user_id, item_id, quantity) VALUES (?, ?, ?)',
-                    (user_id, item_id, quantity)
-                )
-            
-            await db.commit()
-            return cursor.rowcount
+                row = await cursor.fetchone()
+            return row[0]
 
     async def get_user_inventory(self, user_id: str) -> List[Dict[str, Any]]:
         """Get user's inventory"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute(
                 'SELECT * FROM user_inventory WHERE user_id = ? ORDER BY acquired_at DESC',
                 (user_id,)
@@ -745,51 +883,172 @@ class Database:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
+    # Giveaway methods
+    async def get_active_giveaways(self) -> List[Dict[str, Any]]:
+        """Get every giveaway that has not ended yet"""
+        if self.use_mysql:
+            return await self.mysql_db.get_active_giveaways()
+
+        async with self.read() as db:
+            async with db.execute("SELECT * FROM giveaways WHERE status = 'active'") as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
+    async def get_giveaway(self, giveaway_id: int) -> Optional[Dict[str, Any]]:
+        """Get a giveaway by ID"""
+        if self.use_mysql:
+            return await self.mysql_db.get_giveaway(giveaway_id)
+
+        async with self.read() as db:
+            async with db.execute('SELECT * FROM giveaways WHERE id = ?', (giveaway_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def get_giveaway_entries(self, giveaway_id: int) -> List[Dict[str, Any]]:
+        """Get a giveaway's entrants and their entry weights"""
+        if self.use_mysql:
+            return await self.mysql_db.get_giveaway_entries(giveaway_id)
+
+        async with self.read() as db:
+            async with db.execute(
+                'SELECT user_id, entries FROM giveaway_entries WHERE giveaway_id = ?', (giveaway_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
+    async def apply_giveaway_entries(self, adds: List[Tuple[int, str, int]], removes: List[Tuple[int, str]]) -> None:
+        """Store batched (giveaway_id, user_id, entries) entries and delete (giveaway_id, user_id) ones"""
+        if self.use_mysql:
+            return await self.mysql_db.apply_giveaway_entries(adds, removes)
+
+        async with self.write() as db:
+            if adds:
+                await db.executemany(
+                    'INSERT OR REPLACE INTO giveaway_entries (giveaway_id, user_id, entries) VALUES (?, ?, ?)',
+                    adds
+                )
+            if removes:
+                await db.executemany(
+                    'DELETE FROM giveaway_entries WHERE giveaway_id = ? AND user_id = ?',
+                    removes
+                )
+
+    async def get_recent_giveaway_winners(self, since: datetime) -> List[Tuple[str, Any]]:
+        """(user_id, latest ended_at) for everyone who won a giveaway that ended after `since`"""
+        if self.use_mysql:
+            return await self.mysql_db.get_recent_giveaway_winners(since)
+
+        async with self.read() as db:
+            async with db.execute(
+                """SELECT gw.user_id, MAX(g.ended_at) FROM giveaway_winners gw
+                   JOIN giveaways g ON gw.giveaway_id = g.id
+                   WHERE g.ended_at > ?
+                   GROUP BY gw.user_id""",
+                (since.isoformat(),)
+            ) as cursor:
+                return [tuple(row) for row in await cursor.fetchall()]
+
+    async def get_giveaway_winners(self, giveaway_id: int) -> List[str]:
+        """A giveaway's original (not rerolled) winners in draw order"""
+        if self.use_mysql:
+            return await self.mysql_db.get_giveaway_winners(giveaway_id)
+
+        async with self.read() as db:
+            async with db.execute(
+                """SELECT user_id FROM giveaway_winners
+                   WHERE giveaway_id = ? AND NOT is_reroll ORDER BY winner_position""",
+                (giveaway_id,)
+            ) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    async def add_giveaway_winners(self, giveaway_id: int, winners: List[str]) -> None:
+        """Store a giveaway's drawn winners in draw order, skipping positions already stored"""
+        if self.use_mysql:
+            return await self.mysql_db.add_giveaway_winners(giveaway_id, winners)
+
+        async with self.write() as db:
+            await db.executemany(
+                """INSERT INTO giveaway_winners (giveaway_id, user_id, winner_position)
+                   SELECT ?, ?, ? WHERE NOT EXISTS (
+                       SELECT 1 FROM giveaway_winners
+                       WHERE giveaway_id = ? AND winner_position = ? AND NOT is_reroll
+                   )""",
+                [(giveaway_id, winner_id, position, giveaway_id, position)
+                 for position, winner_id in enumerate(winners, 1)]
+            )
+
+    async def mark_giveaway_completed(self, giveaway_id: int, ended_at: datetime) -> None:
+        """Mark a giveaway as completed"""
+        if self.use_mysql:
+            return await self.mysql_db.mark_giveaway_completed(giveaway_id, ended_at)
+
+        async with self.write() as db:
+            await db.execute(
+                'UPDATE giveaways SET status = ?, ended_at = ? WHERE id = ?',
+                ('completed', ended_at.isoformat(), giveaway_id)
+            )
+
     # Leveling system methods
     async def get_user_level(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user level data"""
         if self.use_mysql:
             return await self.mysql_db.get_user_level(user_id)
             
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute('SELECT * FROM user_levels WHERE user_id = ?', (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
 
     async def update_user_xp(self, user_id: str, xp_gain: int) -> Tuple[int, bool]:
         """Update user XP and return new level and whether they leveled up"""
+        # Buffered message XP for this user is re-read on top of the new total
+        self.xp_ledger.invalidate(user_id)
+        
         if self.use_mysql:
-            return await self.mysql_db.update_user_xp(user_id, xp_gain)
-            
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get current data
-            async with db.execute(
-                'SELECT xp, level FROM user_levels WHERE user_id = ?', (user_id,)
-            ) as cursor:
-                current = await cursor.fetchone()
-            
-            if not current:
-                # Create new user level record
-                await db.execute(
-                    'INSERT INTO user_levels (user_id, xp, level) VALUES (?, ?, ?)',
-                    (user_id, xp_gain, 1)
-                )
-                await db.commit()
-                return 1, False
-            
-            current_xp, current_level = current
-            new_xp = current_xp + xp_gain
-            new_level = self._calculate_level(new_xp)
-            leveled_up = new_level > current_level
+            new_level, leveled_up, new_xp = await self.mysql_db.update_user_xp(user_id, xp_gain)
+        else:
+            async with self.write() as db:
+                # Add the XP in one statement so concurrent gains can't overwrite each other
+                async with db.execute(
+                    """INSERT INTO user_levels (user_id, xp, level, last_xp_gain) VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+                       ON CONFLICT(user_id) DO UPDATE SET xp = xp + excluded.xp, last_xp_gain = CURRENT_TIMESTAMP
+                       RETURNING xp, level""",
+                    (user_id, xp_gain)
+                ) as cursor:
+                    new_xp, current_level = await cursor.fetchone()
+                
+                new_level = self._calculate_level(new_xp)
+                leveled_up = False
+                if new_level <= current_level:
+                    new_level = current_level
+                else:
+                    # Only the update that actually raises the level reports the level up
+                    cursor = await db.execute(
+                        'UPDATE user_levels SET level = ? WHERE user_id = ? AND level < ?',
+                        (new_level, user_id, new_level)
+                    )
+                    leveled_up = cursor.rowcount > 0
+        
+        # Set from the stored total once the write has gone through, plus any message XP still buffered
+        self.leaderboards.set('xp', user_id, new_xp + self.xp_ledger.pending_xp(user_id))
+        return new_level, leveled_up
+
+    async def apply_xp_deltas(self, rows: List[Tuple[str, int, int, int, str]]) -> None:
+        """Add batched (user_id, xp_delta, level, message_delta, last_xp_gain) rows to user_levels"""
+        if self.use_mysql:
+            return await self.mysql_db.apply_xp_deltas(rows)
             
-            await db.execute(
-                'UPDATE user_levels SET xp = ?, level = ?, last_xp_gain = CURRENT_TIMESTAMP WHERE user_id = ?',
-                (new_xp, new_level, user_id)
+        async with self.write() as db:
+            await db.executemany(
+                """INSERT INTO user_levels (user_id, xp, level, total_messages, last_xp_gain)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET
+                       xp = xp + excluded.xp,
+                       level = MAX(level, excluded.level),
+                       total_messages = total_messages + excluded.total_messages,
+                       last_xp_gain = excluded.last_xp_gain""",
+                rows
             )
-            await db.commit()
-            
-            return new_level, leveled_up
 
     def _calculate_level(self, xp: int) -> int:
         """Calculate level based on XP"""
@@ -800,7 +1059,11 @@ class Database:
     # Cooldown methods
     async def set_cooldown(self, user_id: str, command_type: str) -> None:
         """Set cooldown for a user and command type"""
-        async with aiosqlite.connect(self.db_path) as db:
+        if self.cooldown_cache.is_warm:
+            self.cooldown_cache.set(user_id, command_type)
+            return
+            
+        async with self.write() as db:
             await db.execute(
                 'INSERT OR REPLACE INTO cooldowns (user_id, command_type, last_used) VALUES (?, ?, CURRENT_TIMESTAMP)',
                 (user_id, command_type)
@@ -809,7 +1072,10 @@ class Database:
 
     async def get_cooldown(self, user_id: str, command_type: str) -> Optional[datetime]:
         """Get cooldown timestamp for a user and command type"""
-        async with aiosqlite.connect(self.db_path) as db:
+        if self.cooldown_cache.is_warm:
+            return self.cooldown_cache.get(user_id, command_type)
+            
+        async with self.read() as db:
             async with db.execute(
                 'SELECT last_used FROM cooldowns WHERE user_id = ? AND command_type = ?',
                 (user_id, command_type)
@@ -821,37 +1087,31 @@ class Database:
 
     async def cleanup_expired_cooldowns(self) -> None:
         """Clean up expired cooldowns (older than 24 hours)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute(
                 'DELETE FROM cooldowns WHERE datetime(last_used) < datetime("now", "-24 hours")'
             )
             await db.commit()
+        self.cooldown_cache.evict_expired()
     
     # Category Settings Methods
     async def get_category_settings(self, guild_id: str) -> Dict[str, bool]:
         """Get category enable/disable settings for a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("""
-                SELECT category_text_enabled, category_voice_enabled, 
-                       category_role_enabled, category_overall_enabled
-                FROM server_settings WHERE guild_id = ?
-            """, (guild_id,)) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return {
-                        'text': bool(row[0]) if row[0] is not None else True,
-                        'voice': bool(row[1]) if row[1] is not None else True,
-                        'role': bool(row[2]) if row[2] is not None else True,
-                        'overall': bool(row[3]) if row[3] is not None else True
-                    }
-                else:
-                    # Return defaults if no settings found
-                    return {'text': True, 'voice': True, 'role': True, 'overall': True}
+        settings = await self.get_server_settings(guild_id)
+        if not settings:
+            # Return defaults if no settings found
+            return {'text': True, 'voice': True, 'role': True, 'overall': True}
+        
+        categories = {}
+        for category in ('text', 'voice', 'role', 'overall'):
+            value = settings.get(f'category_{category}_enabled')
+            categories[category] = bool(value) if value is not None else True
+        return categories
     
     async def set_category_enabled(self, guild_id: str, category: str, enabled: bool) -> bool:
         """Set category enabled/disabled for a guild"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.write() as db:
                 # First ensure the guild has an entry in server_settings
                 await db.execute("""
                     INSERT OR IGNORE INTO server_settings (guild_id) VALUES (?)
@@ -875,7 +1135,8 @@ class Database:
                 """, (enabled, guild_id))
                 
                 await db.commit()
-                return True
+            self.settings_cache.invalidate(guild_id)
+            return True
         except Exception as e:
             logging.error(f"Error setting category {category} to {enabled} for guild {guild_id}: {e}")
             return False
@@ -886,10 +1147,18 @@ class Database:
         return settings.get(category, True)  # Default to True if not found
 
     async def close(self):
-        """Close database connection (for cleanup)"""
+        """Close database connections (for cleanup)"""
+        # Flush buffered writes while the connections are still open
+        await self.xp_ledger.close()
+        await self.cooldown_cache.close()
+        await self.effects.close()
+        await self.audit_log.close()
+        await self.giveaway_entries.close()
+        
         if self.use_mysql:
             await self.mysql_db.close()
-        # SQLite handles connections automatically
+        else:
+            await self.connections.close()
 
 # Global database instance
 database = Database()
\ No newline at end of file
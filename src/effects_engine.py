@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Set
+
+from write_behind import WriteBehindBuffer
+
+
+class EffectsEngine(WriteBehindBuffer):
+    """In-memory active effects with an expiry heap and batched persistence to active_effects"""
+
+    name = "active effects"
+
+    def __init__(self, database, flush_interval: float = 5.0):
+        super().__init__(flush_interval)
+        self.database = database
+
+        # user_id -> effect_type -> effects, soonest-expiring first
+        self._effects: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        # (expires_at timestamp, tiebreak, effect) for effects with a duration
+        self._expiry_heap: List[tuple] = []
+        self._sequence = itertools.count()
+
+        self._pending_uses: Dict[int, int] = {}
+        self._pending_deletes: Set[int] = set()
+
+    async def load(self):
+        """Load every stored effect, dropping ones that have expired or run out"""
+        async with self.database.read() as db:
+            async with db.execute(
+                'SELECT id, user_id, effect_type, uses_remaining, expires_at FROM active_effects'
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        self._effects = {}
+        self._expiry_heap = []
+        now = datetime.now()
+        for row in rows:
+            expires_at = datetime.fromisoformat(row['expires_at']) if row['expires_at'] else None
+            uses_remaining = row['uses_remaining']
+            if (expires_at and expires_at <= now) or (uses_remaining is not None and uses_remaining <= 0):
+                self._pending_deletes.add(row['id'])
+                continue
+            self._track({
+                'id': row['id'],
+                'user_id': row['user_id'],
+                'effect_type': row['effect_type'],
+                'uses_remaining': uses_remaining,
+                'expires_at': expires_at,
+                'active': True
+            })
+
+        logging.info(f"Loaded {len(rows) - len(self._pending_deletes)} active effects")
+
+    def _track(self, effect: Dict[str, Any]):
+        """Index an effect by user/type and on the expiry heap"""
+        effects = self._effects.setdefault(effect['user_id'], {}).setdefault(effect['effect_type'], [])
+        effects.append(effect)
+        # Spend the charges that expire soonest first; permanent ones last
+        effects.sort(key=lambda e: e['expires_at'] or datetime.max)
+        if effect['expires_at']:
+            heapq.heappush(self._expiry_heap, (effect['expires_at'].timestamp(), next(self._sequence), effect))
+
+    def _untrack(self, effect: Dict[str, Any]):
+        """Remove an effect from memory and queue its row for deletion"""
+        if not effect['active']:
+            return
+        effect['active'] = False
+        self._pending_uses.pop(effect['id'], None)
+        self._pending_deletes.add(effect['id'])
+
+        user_effects = self._effects.get(effect['user_id'], {})
+        effects = user_effects.get(effect['effect_type'], [])
+        if effect in effects:
+            effects.remove(effect)
+        if not effects:
+            user_effects.pop(effect['effect_type'], None)
+        if not user_effects:
+            self._effects.pop(effect['user_id'], None)
+
+    def cleanup_expired(self) -> int:
+        """Pop expired effects off the heap; returns how many were removed"""
+        now = datetime.now().timestamp()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, _, effect = heapq.heappop(self._expiry_heap)
+            if effect['active']:
+                self._untrack(effect)
+                removed += 1
+        return removed
+
+    def _current(self, user_id: str, effect_type: str) -> Optional[Dict[str, Any]]:
+        """The effect that would be used next, skipping any that expired since the last cleanup"""
+        effects = self._effects.get(user_id, {}).get(effect_type)
+        if not effects:
+            return None
+        now = datetime.now()
+        while effects and effects[0]['expires_at'] and effects[0]['expires_at'] <= now:
+            self._untrack(effects[0])
+            effects = self._effects.get(user_id, {}).get(effect_type)
+        return effects[0] if effects else None
+
+    def has_effect(self, user_id: str, effect_type: str) -> bool:
+        """Whether a user has an active effect of a type"""
+        return self._current(user_id, effect_type) is not None
+
+    def use_effect(self, user_id: str, effect_type: str) -> bool:
+        """Spend one charge of an effect; returns False if the user has none"""
+        effect = self._current(user_id, effect_type)
+        if effect is None:
+            return False
+
+        # Check and decrement happen without yielding, so two callers can't spend the same charge
+        if effect['uses_remaining'] is not None:
+            effect['uses_remaining'] -= 1
+            if effect['uses_remaining'] <= 0:
+                self._untrack(effect)
+            else:
+                self._pending_uses[effect['id']] = effect['uses_remaining']
+        return True
+
+    def remove_effect(self, user_id: str, effect_type: str) -> bool:
+        """Remove the next effect of a type; returns False if the user has none"""
+        effect = self._current(user_id, effect_type)
+        if effect is None:
+            return False
+        self._untrack(effect)
+        return True
+
+    async def add_effect(self, user_id: str, effect_type: str, duration_minutes: Optional[int] = None,
+                         uses: Optional[int] = None) -> int:
+        """Store a new effect right away (so it gets an id) and start tracking it"""
+        expires_at = datetime.now() + timedelta(minutes=duration_minutes) if duration_minutes else None
+
+        async with self.database.write() as db:
+            cursor = await db.execute(
+                """INSERT INTO active_effects
+                   (user_id, effect_type, duration_minutes, uses_remaining, expires_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (user_id, effect_type, duration_minutes, uses, expires_at.isoformat() if expires_at else None)
+            )
+            effect_id = cursor.lastrowid
+
+        self._track({
+            'id': effect_id,
+            'user_id': user_id,
+            'effect_type': effect_type,
+            'uses_remaining': uses,
+            'expires_at': expires_at,
+            'active': True
+        })
+        return effect_id
+
+    async def flush(self) -> int:
+        """Write charge changes and deletions in one transaction"""
+        async with self._flush_lock:
+            self.cleanup_expired()
+            if not self._pending_uses and not self._pending_deletes:
+                return 0
+
+            uses, self._pending_uses = self._pending_uses, {}
+            deletes, self._pending_deletes = self._pending_deletes, set()
+
+            try:
+                async with self.database.write() as db:
+                    if uses:
+                        await db.executemany(
+                            'UPDATE active_effects SET uses_remaining = ? WHERE id = ?',
+                            [(remaining, effect_id) for effect_id, remaining in uses.items()]
+                        )
+                    if deletes:
+                        await db.executemany(
+                            'DELETE FROM active_effects WHERE id = ?',
+                            [(effect_id,) for effect_id in deletes]
+                        )
+            except Exception as e:
+                logging.error(f"Error persisting active effects: {e}")
+                # Retry next time, keeping any newer charge counts
+                for effect_id, remaining in uses.items():
+                    if effect_id not in self._pending_deletes:
+                        self._pending_uses.setdefault(effect_id, remaining)
+                self._pending_deletes |= deletes
+                return 0
+
+            return len(uses) + len(deletes)
@@ -546,14 +546,14 @@ class GamesSystem:
     async def get_gambling_stats(self, user_id: str) -> Dict[str, Any]:
         """Get user's gambling statistics"""
         try:
-            # Get transaction history for gambling activities
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            # Get transaction history for gambling activities, including queued ones
+            await database.audit_log.flush()
+            async with database.read() as db:
                 
                 # Get all gambling transactions
                 async with db.execute(
                     """SELECT type, amount, description FROM transactions 
-                       WHERE user_id = ? AND type LIKE '%_win' OR type LIKE '%_loss'
+                       WHERE user_id = ? AND (type LIKE '%_win' OR type LIKE '%_loss')
                        ORDER BY created_at DESC""",
                     (user_id,)
                 ) as cursor:
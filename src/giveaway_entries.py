@@ -0,0 +1,68 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+from write_behind import WriteBehindBuffer
+
+
+class GiveawayEntryBuffer(WriteBehindBuffer):
+    """Giveaway entries from reactions, coalesced per (giveaway, user) and written in batches"""
+
+    name = "giveaway entries"
+
+    def __init__(self, database, flush_interval: float = 2.0, flush_events: int = 500):
+        super().__init__(flush_interval)
+        self.database = database
+        self.flush_events = flush_events
+
+        # (giveaway_id, user_id) -> entry weight to store, or None to delete; only the latest toggle counts
+        self._pending: Dict[Tuple[int, str], Optional[int]] = {}
+
+        self.coalesced = 0
+        self.written = 0
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _queue(self, key: Tuple[int, str], entries: Optional[int]):
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = entries
+        if len(self._pending) >= self.flush_events:
+            self.request_flush()
+
+    def add(self, giveaway_id: int, user_id: str, entries: int):
+        """Queue an entry (replacing any earlier one for this user)"""
+        self._queue((giveaway_id, user_id), entries)
+
+    def remove(self, giveaway_id: int, user_id: str):
+        """Queue an entry's removal"""
+        self._queue((giveaway_id, user_id), None)
+
+    async def flush(self, strict: bool = False) -> int:
+        """Write the net adds and removes in one transaction and return how many were written.
+
+        With strict, a failed write is raised (after requeueing the batch) for callers that
+        must not read entries until every buffered one is stored.
+        """
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            adds = [(giveaway_id, user_id, entries)
+                    for (giveaway_id, user_id), entries in pending.items() if entries is not None]
+            removes = [key for key, entries in pending.items() if entries is None]
+
+            try:
+                await self.database.apply_giveaway_entries(adds, removes)
+            except Exception as e:
+                logging.error(f"Error writing giveaway entries ({len(pending)} changes): {e}")
+                # Anything toggled since the flush started is newer than the failed batch
+                for key, entries in pending.items():
+                    self._pending.setdefault(key, entries)
+                if strict:
+                    raise
+                return 0
+
+            self.written += len(pending)
+            return len(pending)
@@ -1,23 +1,127 @@
 import discord
-from discord.ext import tasks, commands
+from discord.ext import commands
 import asyncio
 import logging
 import random
+import secrets
 import json
-import aiosqlite
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 
 from database import database
 from config import config
+from utils.sampling import weighted_sample
+from utils.deadline_scheduler import DeadlineScheduler
+from message_dispatcher import MessageDispatcher, PRIORITY_HIGH, PRIORITY_LOW
 
 class AdvancedGiveawaySystem:
     """Advanced Giveaway System with comprehensive features"""
     
+    # Seconds before retrying a giveaway whose end failed, doubling with each failure
+    end_retry_delay = 30
+    end_retry_max_delay = 900
+    
     def __init__(self, client):
         self.client = client
-        self.active_giveaways = {}
-        self.check_giveaways.start()
+        # Active giveaways by message ID, with their role requirements pre-parsed for reaction handling
+        self.active_giveaways: Dict[str, Dict[str, Any]] = {}
+        # user_id -> when they last won, for the winner cooldown
+        self.recent_winners: Dict[str, datetime] = {}
+        self._registry_loaded = False
+        # Ends each giveaway at its end time; loaded from the database once the bot is ready
+        self.scheduler = DeadlineScheduler(self._end_due_giveaway, name="giveaway scheduler")
+        self._ending = set()
+        # giveaway_id -> failed attempts to end it
+        self._end_failures: Dict[int, int] = {}
+        # Announcements and DMs are queued so rate limits never hold up reaction handling
+        self.dispatcher = MessageDispatcher(**config.get('giveaways.dispatcher', {}))
+        self.dispatcher.start()
+        self._load_task = asyncio.create_task(self.load_scheduled_giveaways())
+
+    async def load_scheduled_giveaways(self):
+        """Register and schedule every active giveaway, ending the ones that expired while the bot was offline"""
+        await self.client.wait_until_ready()
+        try:
+            giveaways = await database.get_active_giveaways()
+        except Exception as e:
+            logging.error(f"Error loading active giveaways: {e}")
+            giveaways = []
+        
+        scheduled = 0
+        for giveaway in giveaways:
+            try:
+                entry = self._register_giveaway(giveaway)
+                self.scheduler.schedule(entry['id'], entry['end_time'])
+                scheduled += 1
+            except Exception as e:
+                logging.error(f"Error scheduling giveaway {giveaway.get('id')}: {e}")
+        # Started even if loading failed so giveaways created from now on still end
+        self.scheduler.start()
+        logging.info(f"Scheduled {scheduled} active giveaways")
+        
+        try:
+            await self._load_recent_winners()
+            self._registry_loaded = True
+        except Exception as e:
+            # Winner cooldowns fall back to querying the database
+            logging.error(f"Error loading recent giveaway winners: {e}")
+
+    async def close(self):
+        """Stop scheduling and sending"""
+        await self.scheduler.stop()
+        await self.dispatcher.close()
+        stats = self.dispatcher.stats()
+        logging.info(
+            f"Giveaway messages: {stats['sent']} sent, {stats['failed']} failed, {stats['dropped']} dropped "
+            f"({stats['drop_rate']:.1%}), {stats['deduped']} deduplicated, {stats['digested']} digested, "
+            f"{stats['depth']} still queued"
+        )
+
+    @staticmethod
+    def _parse_end_time(value) -> datetime:
+        """End times are isoformat strings in SQLite and datetimes from MySQL"""
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+    @staticmethod
+    def _parse_role_ids(value) -> frozenset:
+        return frozenset(json.loads(value)) if value else frozenset()
+
+    def _registry_entry(self, giveaway: Dict[str, Any]) -> Dict[str, Any]:
+        """A giveaway row with its end time and role lists parsed once"""
+        entry = dict(giveaway)
+        entry['end_time'] = self._parse_end_time(giveaway['end_time'])
+        entry['required_role_ids'] = self._parse_role_ids(giveaway.get('required_roles'))
+        entry['forbidden_role_ids'] = self._parse_role_ids(giveaway.get('forbidden_roles'))
+        entry['bypass_role_ids'] = self._parse_role_ids(giveaway.get('bypass_roles'))
+        return entry
+
+    def _register_giveaway(self, giveaway: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self._registry_entry(giveaway)
+        self.active_giveaways[str(entry['message_id'])] = entry
+        return entry
+
+    def _unregister_giveaway(self, giveaway: Dict[str, Any]):
+        self.active_giveaways.pop(str(giveaway['message_id']), None)
+
+    async def _find_giveaway(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Registry entry for a giveaway message, falling back to the database for ended ones"""
+        entry = self.active_giveaways.get(message_id)
+        if entry is not None:
+            return entry
+        giveaway = await self._get_giveaway_by_message_id(message_id)
+        return self._registry_entry(giveaway) if giveaway else None
+
+    async def _load_recent_winners(self):
+        """Cache who won within the winner cooldown"""
+        winner_cooldown = config.get('giveaways.winnerCooldown', 10080)
+        cutoff_time = datetime.now() - timedelta(minutes=winner_cooldown)
+        for user_id, ended_at in await database.get_recent_giveaway_winners(cutoff_time):
+            self.recent_winners[user_id] = self._parse_end_time(ended_at)
+
+    def _record_winners(self, winners: List[str], won_at: datetime):
+        for winner_id in winners:
+            if self.recent_winners.get(winner_id, won_at) <= won_at:
+                self.recent_winners[winner_id] = won_at
     
     async def create_giveaway(self, 
                             ctx: commands.Context,
@@ -95,8 +199,7 @@ class AdvancedGiveawaySystem:
             await message.add_reaction("🎉")
             
             # Save to database
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
+            async with database.write() as db:
                 cursor = await db.execute(
                     """INSERT INTO giveaways 
                        (message_id, channel_id, guild_id, host_id, title, description, 
@@ -114,13 +217,8 @@ class AdvancedGiveawaySystem:
                 giveaway_id = cursor.lastrowid
             
             # Store in memory for tracking
-            self.active_giveaways[str(message.id)] = {
-                'id': giveaway_id,
-                'end_time': end_time,
-                'guild_id': str(ctx.guild.id),
-                'channel_id': str(channel.id),
-                'message_id': str(message.id)
-            }
+            self._register_giveaway(await self._get_giveaway_by_id(giveaway_id))
+            self.scheduler.schedule(giveaway_id, end_time)
             
             return {
                 "success": True,
@@ -254,7 +352,8 @@ class AdvancedGiveawaySystem:
                 return {"success": False, "message": "❌ You can only end your own giveaways or need admin permissions!"}
             
             # End the giveaway
-            await self._end_giveaway(giveaway, manual=True)
+            if not await self._end_giveaway(giveaway, manual=True):
+                return {"success": False, "message": "❌ The giveaway couldn't be ended right now; it will be retried automatically."}
             
             return {"success": True, "message": f"✅ Giveaway **{giveaway['prize']}** has been ended manually!"}
             
@@ -288,9 +387,8 @@ class AdvancedGiveawaySystem:
                 return {"success": False, "message": "❌ You can only reroll your own giveaways or need admin permissions!"}
             
             # Get all entries
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            await database.giveaway_entries.flush(strict=True)
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT * FROM giveaway_entries WHERE giveaway_id = ?',
                     (giveaway_id,)
@@ -308,14 +406,12 @@ class AdvancedGiveawaySystem:
                 return {"success": False, "message": f"❌ Maximum {max_winners} winners allowed!"}
             
             # Get previous winners to exclude them
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT user_id FROM giveaway_winners WHERE giveaway_id = ?',
                     (giveaway_id,)
                 ) as cursor:
-                    previous_winners = [row['user_id'] for row in await cursor.fetchall()]
+                    previous_winners = {row['user_id'] for row in await cursor.fetchall()}
             
             # Select new winners (excluding previous ones)
             available_entries = [entry for entry in entries if entry['user_id'] not in previous_winners]
@@ -323,14 +419,13 @@ class AdvancedGiveawaySystem:
             if not available_entries:
                 return {"success": False, "message": "❌ No new participants available for reroll!"}
             
-            new_winners = await self._select_winners(available_entries, winners_count)
+            new_winners = await self._select_winners(available_entries, winners_count, giveaway_id)
             
             if not new_winners:
                 return {"success": False, "message": "❌ Could not select new winners!"}
             
             # Store new winners
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
+            async with database.write() as db:
                 for i, winner_id in enumerate(new_winners):
                     await db.execute(
                         """INSERT INTO giveaway_winners 
@@ -346,6 +441,10 @@ class AdvancedGiveawaySystem:
                 )
                 await db.commit()
             
+            # Rerolled winners count from when the giveaway ended, as in _user_recently_won's query
+            if giveaway.get('ended_at'):
+                self._record_winners(new_winners, self._parse_end_time(giveaway['ended_at']))
+            
             # Announce reroll
             await self._announce_reroll(giveaway, new_winners)
             
@@ -365,9 +464,7 @@ class AdvancedGiveawaySystem:
         try:
             status_filter = None if show_all else 'active'
             
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 query = 'SELECT * FROM giveaways WHERE guild_id = ?'
                 params = [guild_id]
                 
@@ -441,7 +538,10 @@ class AdvancedGiveawaySystem:
         message_id = str(reaction.message.id)
         
         # Check if this is a giveaway message
-        giveaway = await self._get_giveaway_by_message_id(message_id)
+        if self._registry_loaded:
+            giveaway = self.active_giveaways.get(message_id)
+        else:
+            giveaway = await self._find_giveaway(message_id)
         if not giveaway or giveaway['status'] != 'active':
             return
         
@@ -454,9 +554,10 @@ class AdvancedGiveawaySystem:
                     description=check_result['reason'],
                     color=int(config.colors['error'].replace('#', ''), 16)
                 )
-                await user.send(embed=embed)
+                self.dispatcher.send(user, f"dm:{user.id}", embed=embed, priority=PRIORITY_LOW,
+                                     dedupe_key=('denied', giveaway['id'], user.id), digest=True)
             except:
-                pass  # User has DMs disabled
+                pass
             
             # Remove the reaction
             try:
@@ -466,7 +567,7 @@ class AdvancedGiveawaySystem:
             return
         
         # Add entry to database
-        await self._add_giveaway_entry(giveaway['id'], str(user.id))
+        await self._add_giveaway_entry(giveaway, str(user.id))
         
         # Send confirmation DM
         try:
@@ -482,10 +583,12 @@ class AdvancedGiveawaySystem:
             )
             embed.add_field(
                 name="⏰ Ends",
-                value=discord.utils.format_dt(datetime.fromisoformat(giveaway['end_time']), 'R'),
+                value=discord.utils.format_dt(giveaway['end_time'], 'R'),
                 inline=True
             )
-            await user.send(embed=embed)
+            # Re-reacting while the first confirmation is still queued doesn't send another
+            self.dispatcher.send(user, f"dm:{user.id}", embed=embed, priority=PRIORITY_LOW,
+                                 dedupe_key=('entered', giveaway['id'], user.id), digest=True)
         except:
             pass
     
@@ -498,7 +601,7 @@ class AdvancedGiveawaySystem:
             return
         
         message_id = str(reaction.message.id)
-        giveaway = await self._get_giveaway_by_message_id(message_id)
+        giveaway = await self._find_giveaway(message_id)
         
         if not giveaway:
             return
@@ -508,9 +611,7 @@ class AdvancedGiveawaySystem:
     
     async def _get_giveaway_by_message_id(self, message_id: str) -> Optional[Dict[str, Any]]:
         """Get giveaway data by message ID"""
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with database.read() as db:
             async with db.execute(
                 'SELECT * FROM giveaways WHERE message_id = ?', (message_id,)
             ) as cursor:
@@ -519,14 +620,7 @@ class AdvancedGiveawaySystem:
     
     async def _get_giveaway_by_id(self, giveaway_id: int) -> Optional[Dict[str, Any]]:
         """Get giveaway by ID"""
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(
-                'SELECT * FROM giveaways WHERE id = ?', (giveaway_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        return await database.get_giveaway(giveaway_id)
     
     async def _check_entry_requirements(self, user: discord.User, giveaway: Dict[str, Any]) -> Dict[str, Any]:
         """Check if user meets all giveaway entry requirements"""
@@ -539,11 +633,11 @@ class AdvancedGiveawaySystem:
             if not member:
                 return {"allowed": False, "reason": "You must be a member of this server!"}
             
+            member_role_ids = {str(role.id) for role in member.roles}
+            
             # Check bypass roles first
-            if giveaway.get('bypass_roles'):
-                bypass_role_ids = json.loads(giveaway['bypass_roles'])
-                if any(str(role.id) in bypass_role_ids for role in member.roles):
-                    return {"allowed": True, "reason": "Bypass role detected"}
+            if not giveaway['bypass_role_ids'].isdisjoint(member_role_ids):
+                return {"allowed": True, "reason": "Bypass role detected"}
             
             # Check account age requirement
             if giveaway.get('min_account_age_days', 0) > 0:
@@ -562,33 +656,27 @@ class AdvancedGiveawaySystem:
                 pass
             
             # Check required roles
-            if giveaway.get('required_roles'):
-                required_role_ids = json.loads(giveaway['required_roles'])
-                member_role_ids = [str(role.id) for role in member.roles]
+            required_role_ids = giveaway['required_role_ids']
+            if required_role_ids and required_role_ids.isdisjoint(member_role_ids):
+                role_names = []
+                for role_id in required_role_ids:
+                    role = guild.get_role(int(role_id))
+                    if role:
+                        role_names.append(role.name)
                 
-                if not any(role_id in member_role_ids for role_id in required_role_ids):
-                    role_names = []
-                    for role_id in required_role_ids:
-                        role = guild.get_role(int(role_id))
-                        if role:
-                            role_names.append(role.name)
-                    
-                    return {
-                        "allowed": False,
-                        "reason": f"You need one of these roles: {', '.join(role_names)}"
-                    }
+                return {
+                    "allowed": False,
+                    "reason": f"You need one of these roles: {', '.join(role_names)}"
+                }
             
             # Check forbidden roles
-            if giveaway.get('forbidden_roles'):
-                forbidden_role_ids = json.loads(giveaway['forbidden_roles'])
-                member_role_ids = [str(role.id) for role in member.roles]
-                
+            forbidden_role_ids = giveaway['forbidden_role_ids'] & member_role_ids
+            if forbidden_role_ids:
                 forbidden_roles_found = []
                 for role_id in forbidden_role_ids:
-                    if role_id in member_role_ids:
-                        role = guild.get_role(int(role_id))
-                        if role:
-                            forbidden_roles_found.append(role.name)
+                    role = guild.get_role(int(role_id))
+                    if role:
+                        forbidden_roles_found.append(role.name)
                 
                 if forbidden_roles_found:
                     return {
@@ -617,8 +705,14 @@ class AdvancedGiveawaySystem:
         """Check if user recently won a giveaway"""
         cutoff_time = datetime.now() - timedelta(minutes=cooldown_minutes)
         
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
+        if self._registry_loaded:
+            won_at = self.recent_winners.get(user_id)
+            if won_at is not None and won_at <= cutoff_time:
+                del self.recent_winners[user_id]
+                won_at = None
+            return won_at is not None
+        
+        async with database.read() as db:
             async with db.execute(
                 """SELECT COUNT(*) FROM giveaway_winners gw
                    JOIN giveaways g ON gw.giveaway_id = g.id
@@ -628,45 +722,23 @@ class AdvancedGiveawaySystem:
                 row = await cursor.fetchone()
                 return row[0] > 0 if row else False
     
-    async def _add_giveaway_entry(self, giveaway_id: int, user_id: str):
-        """Add user entry to giveaway"""
+    async def _add_giveaway_entry(self, giveaway: Dict[str, Any], user_id: str):
+        """Add user entry to giveaway (written by the entry buffer)"""
         try:
             # Calculate entry weight based on user roles
-            entries = await self._calculate_entry_weight(user_id, giveaway_id)
-            
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                await db.execute(
-                    """INSERT OR REPLACE INTO giveaway_entries 
-                       (giveaway_id, user_id, entries) VALUES (?, ?, ?)""",
-                    (giveaway_id, user_id, entries)
-                )
-                await db.commit()
+            entries = await self._calculate_entry_weight(user_id, giveaway)
+            database.giveaway_entries.add(giveaway['id'], user_id, entries)
                 
         except Exception as e:
             logging.error(f"Error adding giveaway entry: {e}")
     
     async def _remove_giveaway_entry(self, giveaway_id: int, user_id: str):
-        """Remove user entry from giveaway"""
-        try:
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                await db.execute(
-                    'DELETE FROM giveaway_entries WHERE giveaway_id = ? AND user_id = ?',
-                    (giveaway_id, user_id)
-                )
-                await db.commit()
-                
-        except Exception as e:
-            logging.error(f"Error removing giveaway entry: {e}")
+        """Remove user entry from giveaway (written by the entry buffer)"""
+        database.giveaway_entries.remove(giveaway_id, user_id)
     
-    async def _calculate_entry_weight(self, user_id: str, giveaway_id: int) -> int:
+    async def _calculate_entry_weight(self, user_id: str, giveaway: Dict[str, Any]) -> int:
         """Calculate entry weight based on user roles and config"""
         try:
-            giveaway = await self._get_giveaway_by_id(giveaway_id)
-            if not giveaway:
-                return 1
-            
             guild = self.client.get_guild(int(giveaway['guild_id']))
             if not guild:
                 return 1
@@ -697,64 +769,61 @@ class AdvancedGiveawaySystem:
             logging.error(f"Error calculating entry weight: {e}")
             return 1
     
-    @tasks.loop(minutes=1)
-    async def check_giveaways(self):
-        """Check for ended giveaways and process them"""
+    async def _end_due_giveaway(self, giveaway_id: int):
+        """Scheduler callback: end a giveaway whose end time has passed"""
         try:
-            now = datetime.now()
-            
-            # Get all active giveaways that have ended
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                async with db.execute(
-                    'SELECT * FROM giveaways WHERE status = ? AND end_time <= ?',
-                    ('active', now.isoformat())
-                ) as cursor:
-                    ended_giveaways = await cursor.fetchall()
-            
-            for giveaway_row in ended_giveaways:
-                giveaway = dict(giveaway_row)
-                await self._end_giveaway(giveaway)
-                
+            giveaway = await self._get_giveaway_by_id(giveaway_id)
         except Exception as e:
-            logging.error(f"Error checking giveaways: {e}")
+            self._retry_end_later(giveaway_id, e)
+            return
+        if giveaway and giveaway['status'] == 'active':
+            await self._end_giveaway(giveaway)
+    
+    def _retry_end_later(self, giveaway_id: int, error: Exception):
+        """Reschedule a giveaway whose end failed, backing off on repeated failures"""
+        failures = self._end_failures.get(giveaway_id, 0) + 1
+        self._end_failures[giveaway_id] = failures
+        delay = min(self.end_retry_delay * 2 ** (failures - 1), self.end_retry_max_delay)
+        logging.error(f"Error ending giveaway {giveaway_id} (attempt {failures}), retrying in {delay}s: {error}")
+        self.scheduler.schedule(giveaway_id, datetime.now() + timedelta(seconds=delay))
     
-    async def _end_giveaway(self, giveaway: Dict[str, Any], manual: bool = False):
-        """End a giveaway and select winners"""
+    async def _end_giveaway(self, giveaway: Dict[str, Any], manual: bool = False) -> bool:
+        """End a giveaway and select winners; returns False if it failed and was rescheduled"""
+        giveaway_id = giveaway['id']
+        # A manual end and the scheduled one can race; only the first gets through
+        if giveaway_id in self._ending:
+            return True
+        self._ending.add(giveaway_id)
+        self.scheduler.cancel(giveaway_id)
         try:
-            giveaway_id = giveaway['id']
+            # Entries from the last few seconds of reactions may still be buffered; if they can't
+            # be written, this attempt fails and is retried rather than drawing from a partial list
+            await database.giveaway_entries.flush(strict=True)
             
             # Get all entries
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                async with db.execute(
-                    'SELECT * FROM giveaway_entries WHERE giveaway_id = ?',
-                    (giveaway_id,)
-                ) as cursor:
-                    entries = await cursor.fetchall()
+            entries = await database.get_giveaway_entries(giveaway_id)
             
             if not entries:
-                # No entries - announce no winners
-                await self._announce_no_winners(giveaway, manual)
+                # Completed before announcing, so a failed write is retried without a second announcement
                 await self._mark_giveaway_completed(giveaway_id)
-                return
+                self._unregister_giveaway(giveaway)
+                self._end_failures.pop(giveaway_id, None)
+                await self._announce_no_winners(giveaway, manual)
+                return True
             
-            # Select winners
-            winners = await self._select_winners(entries, giveaway['winners_count'])
+            # A retry keeps the winners an earlier attempt already drew and stored
+            winners = await database.get_giveaway_winners(giveaway_id)
+            if not winners:
+                winners = await self._select_winners(entries, giveaway['winners_count'], giveaway_id)
+                await database.add_giveaway_winners(giveaway_id, winners)
+            self._record_winners(winners, datetime.now())
             
-            # Store winners in database
-            import aiosqlite
-            async with aiosqlite.connect(database.db_path) as db:
-                for i, winner_id in enumerate(winners):
-                    await db.execute(
-                        """INSERT INTO giveaway_winners 
-                           (giveaway_id, user_id, winner_position) 
-                           VALUES (?, ?, ?)""",
-                        (giveaway_id, winner_id, i + 1)
-                    )
-                await db.commit()
+            # Mark as completed before any role or message goes out, so a retry never repeats them
+            await self._mark_giveaway_completed(giveaway_id)
+            
+            # Remove from active tracking
+            self._unregister_giveaway(giveaway)
+            self._end_failures.pop(giveaway_id, None)
             
             # Assign winner role if specified
             if giveaway.get('winner_role_id'):
@@ -762,41 +831,26 @@ class AdvancedGiveawaySystem:
             
             # Announce winners
             await self._announce_winners(giveaway, winners, manual)
-            
-            # Mark as completed
-            await self._mark_giveaway_completed(giveaway_id)
-            
-            # Remove from active tracking
-            message_id = str(giveaway['message_id'])
-            if message_id in self.active_giveaways:
-                del self.active_giveaways[message_id]
+            return True
                 
         except Exception as e:
-            logging.error(f"Error ending giveaway: {e}")
+            self._retry_end_later(giveaway_id, e)
+            return False
+        finally:
+            self._ending.discard(giveaway_id)
     
-    async def _select_winners(self, entries: List[Dict[str, Any]], winners_count: int) -> List[str]:
-        """Select winners from giveaway entries using weighted selection"""
-        # Create weighted list based on entry counts
-        weighted_users = []
-        for entry in entries:
-            user_id = entry['user_id']
-            entry_weight = entry['entries']
-            weighted_users.extend([user_id] * entry_weight)
+    async def _select_winners(self, entries: List[Dict[str, Any]], winners_count: int,
+                              giveaway_id: Optional[int] = None, seed: Optional[int] = None) -> List[str]:
+        """Select unique winners from giveaway entries, weighted by entry count"""
+        # The seed is logged so any draw can be replayed from the same entries
+        if seed is None:
+            seed = secrets.randbits(64)
         
-        # Select unique winners
-        winners = []
-        available_users = weighted_users.copy()
-        
-        for _ in range(min(winners_count, len(set(weighted_users)))):
-            if not available_users:
-                break
-            
-            winner = random.choice(available_users)
-            winners.append(winner)
-            
-            # Remove all entries for this user so they can't win multiple times
-            available_users = [user for user in available_users if user != winner]
+        # Entries come back in storage order; sort so the same seed always gives the same winners
+        weighted_entries = sorted((entry['user_id'], entry['entries']) for entry in entries)
+        winners = weighted_sample(weighted_entries, winners_count, random.Random(seed))
         
+        logging.info(f"Giveaway {giveaway_id}: drew {len(winners)} winner(s) from {len(weighted_entries)} entrants with seed {seed}")
         return winners
     
     async def _assign_winner_roles(self, giveaway: Dict[str, Any], winners: List[str]):
@@ -879,7 +933,8 @@ class AdvancedGiveawaySystem:
             
             # Send announcement
             content = " ".join([f"<@{winner}>" for winner in winners]) if winners else None
-            await channel.send(content=content, embed=embed)
+            self.dispatcher.send(channel, f"channel:{channel.id}", content=content, embed=embed,
+                                 priority=PRIORITY_HIGH)
             
             # Update original message if possible
             if message:
@@ -900,7 +955,7 @@ class AdvancedGiveawaySystem:
             # Send DM to winners
             for winner_id in winners:
                 try:
-                    user = await self.client.fetch_user(int(winner_id))
+                    user = self.client.get_user(int(winner_id)) or await self.client.fetch_user(int(winner_id))
                     if user:
                         dm_embed = discord.Embed(
                             title="🎉 Congratulations!",
@@ -913,7 +968,7 @@ class AdvancedGiveawaySystem:
                             value="Please contact the giveaway host to claim your prize!",
                             inline=False
                         )
-                        await user.send(embed=dm_embed)
+                        self.dispatcher.send(user, f"dm:{user.id}", embed=dm_embed, priority=PRIORITY_HIGH)
                 except Exception as e:
                     logging.error(f"Error sending DM to winner {winner_id}: {e}")
                     
@@ -958,7 +1013,8 @@ class AdvancedGiveawaySystem:
             
             # Send announcement
             content = " ".join([f"<@{winner}>" for winner in new_winners]) if new_winners else None
-            await channel.send(content=content, embed=embed)
+            self.dispatcher.send(channel, f"channel:{channel.id}", content=content, embed=embed,
+                                 priority=PRIORITY_HIGH)
             
             # Assign winner role if specified
             if giveaway.get('winner_role_id'):
@@ -967,7 +1023,7 @@ class AdvancedGiveawaySystem:
             # Send DM to new winners
             for winner_id in new_winners:
                 try:
-                    user = await self.client.fetch_user(int(winner_id))
+                    user = self.client.get_user(int(winner_id)) or await self.client.fetch_user(int(winner_id))
                     if user:
                         dm_embed = discord.Embed(
                             title="🎲 You're a Reroll Winner!",
@@ -975,7 +1031,7 @@ class AdvancedGiveawaySystem:
                             color=int(config.colors['success'].replace('#', ''), 16)
                         )
                         dm_embed.add_field(name="🏆 Prize", value=giveaway['prize'], inline=False)
-                        await user.send(embed=dm_embed)
+                        self.dispatcher.send(user, f"dm:{user.id}", embed=dm_embed, priority=PRIORITY_HIGH)
                 except:
                     pass
                     
@@ -1008,20 +1064,14 @@ class AdvancedGiveawaySystem:
                     inline=False
                 )
             
-            await channel.send(embed=embed)
+            self.dispatcher.send(channel, f"channel:{channel.id}", embed=embed, priority=PRIORITY_HIGH)
             
         except Exception as e:
             logging.error(f"Error announcing no winners: {e}")
     
     async def _mark_giveaway_completed(self, giveaway_id: int):
         """Mark giveaway as completed in database"""
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
-            await db.execute(
-                'UPDATE giveaways SET status = ?, ended_at = ? WHERE id = ?',
-                ('completed', datetime.now().isoformat(), giveaway_id)
-            )
-            await db.commit()
+        await database.mark_giveaway_completed(giveaway_id, datetime.now())
 
 # Global giveaway system instance (will be initialized with bot client)
 giveaway_system = None
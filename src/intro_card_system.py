@@ -9,6 +9,7 @@ import logging
 
 from database import database
 from utils.canvas_utils import canvas_utils
+from utils.card_cache import card_image_cache
 
 
 class IntroCardView(discord.ui.View):
@@ -271,8 +272,18 @@ class IntroCardSystem:
             if card_data.get('id'):
                 await database.add_card_interaction(card_data['id'], str(user.id), 'view')
             
-            # Generate Wonder member card
-            return await canvas_utils.create_y2k_identity_card(user, card_data)
+            # Reuse the last render unless the card, avatar or renderer changed
+            user_id = str(user.id)
+            cache_key = card_image_cache.make_key(
+                user_id, card_data, 'y2k_identity', str(user.display_avatar.url), canvas_utils.renderer_version
+            )
+            card_image = await card_image_cache.get(user_id, cache_key)
+            if card_image is None:
+                # Generate Wonder member card
+                card_image, complete = await canvas_utils.render_y2k_identity_card(user, card_data)
+                if complete:
+                    await card_image_cache.put(user_id, cache_key, card_image)
+            return card_image
         except Exception as e:
             logging.error(f"Error generating card image: {e}")
             raise
@@ -0,0 +1,148 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.ranked_index import RankedIndex
+
+# metric -> (table, column) it is rebuilt from
+METRICS: Dict[str, Tuple[str, str]] = {
+    'balance': ('users', 'balance'),
+    'xp': ('user_levels', 'xp'),
+    'drops': ('user_drop_stats', 'total_collected'),
+}
+
+
+class Leaderboards:
+    """In-memory ranked leaderboards per metric, loaded at startup and kept current by every write"""
+
+    def __init__(self, database):
+        self.database = database
+        self.boards: Dict[str, RankedIndex] = {metric: RankedIndex() for metric in METRICS}
+        # Until rebuilt, callers fall back to querying the tables
+        self.is_built = False
+
+        # Guild views are built from the global boards on first use and then kept in step with them
+        self._guild_members: Dict[str, Set[str]] = {}
+        self._user_guilds: Dict[str, Set[str]] = {}
+        self._guild_boards: Dict[Tuple[str, str], RankedIndex] = {}
+
+    async def rebuild(self):
+        """Reload every leaderboard from its table"""
+        for metric in METRICS:
+            board = self.boards[metric]
+            board.clear()
+            for user_id, score in await self.database.get_leaderboard_scores(metric):
+                board.set(user_id, score)
+
+        self.is_built = True
+        self._guild_boards.clear()
+        logging.info("Built leaderboards: " + ', '.join(f"{metric} ({len(board)})" for metric, board in self.boards.items()))
+
+    def set(self, metric: str, user_id: str, score: int):
+        """Record a user's new absolute score"""
+        self.boards[metric].set(user_id, score)
+        self._update_guild_boards(metric, user_id, score)
+
+    def add(self, metric: str, user_id: str, delta: int):
+        """Record a change to a user's score"""
+        score = self.boards[metric].add(user_id, delta)
+        self._update_guild_boards(metric, user_id, score)
+
+    def _update_guild_boards(self, metric: str, user_id: str, score: int):
+        for guild_id in self._user_guilds.get(user_id, ()):
+            board = self._guild_boards.get((metric, guild_id))
+            if board is not None:
+                board.set(user_id, score)
+
+    def has_guild(self, guild_id: str) -> bool:
+        return guild_id in self._guild_members
+
+    def load_guild(self, guild_id: str, member_ids: Iterable[str]):
+        """Register a guild's members; its boards are built on first lookup"""
+        self.remove_guild(guild_id)
+        members = set(member_ids)
+        self._guild_members[guild_id] = members
+        for user_id in members:
+            self._user_guilds.setdefault(user_id, set()).add(guild_id)
+
+    def remove_guild(self, guild_id: str):
+        for user_id in self._guild_members.pop(guild_id, ()):
+            guilds = self._user_guilds.get(user_id)
+            if guilds:
+                guilds.discard(guild_id)
+                if not guilds:
+                    del self._user_guilds[user_id]
+        for metric in METRICS:
+            self._guild_boards.pop((metric, guild_id), None)
+
+    def add_member(self, guild_id: str, user_id: str):
+        """Track a member who joined a loaded guild"""
+        members = self._guild_members.get(guild_id)
+        if members is None or user_id in members:
+            return
+        members.add(user_id)
+        self._user_guilds.setdefault(user_id, set()).add(guild_id)
+        for metric, board in self.boards.items():
+            guild_board = self._guild_boards.get((metric, guild_id))
+            score = board.score(user_id)
+            if guild_board is not None and score is not None:
+                guild_board.set(user_id, score)
+
+    def remove_member(self, guild_id: str, user_id: str):
+        """Stop ranking a member who left a loaded guild"""
+        members = self._guild_members.get(guild_id)
+        if members is None or user_id not in members:
+            return
+        members.discard(user_id)
+        guilds = self._user_guilds.get(user_id)
+        if guilds:
+            guilds.discard(guild_id)
+            if not guilds:
+                del self._user_guilds[user_id]
+        for metric in METRICS:
+            guild_board = self._guild_boards.get((metric, guild_id))
+            if guild_board is not None:
+                guild_board.remove(user_id)
+
+    def _board(self, metric: str, guild_id: Optional[str] = None) -> RankedIndex:
+        """The global board, or a guild's view of it (built from the global scores on first use)"""
+        if guild_id is None:
+            return self.boards[metric]
+
+        board = self._guild_boards.get((metric, guild_id))
+        if board is None:
+            board = RankedIndex()
+            global_board = self.boards[metric]
+            for user_id in self._guild_members.get(guild_id, ()):
+                score = global_board.score(user_id)
+                if score is not None:
+                    board.set(user_id, score)
+            self._guild_boards[(metric, guild_id)] = board
+        return board
+
+    def position(self, metric: str, user_id: str, guild_id: Optional[str] = None,
+                 radius: int = 2) -> Optional[Dict[str, Any]]:
+        """A user's rank, how many are ranked, and the users just above and below them"""
+        board = self._board(metric, guild_id)
+        rank = board.rank(user_id)
+        if rank is None:
+            return None
+        return {
+            'rank': rank,
+            'total': len(board),
+            'score': board.score(user_id),
+            'neighbours': board.around(user_id, radius)
+        }
+
+    def top(self, metric: str, limit: int = 10, offset: int = 0) -> List[Tuple[str, int]]:
+        """(user_id, score) pairs, highest first"""
+        return self.boards[metric].top(limit, offset)
+
+    def rank(self, metric: str, user_id: str) -> Optional[int]:
+        """A user's 1-based position, or None if they have no score"""
+        return self.boards[metric].rank(user_id)
+
+    def score(self, metric: str, user_id: str) -> Optional[int]:
+        return self.boards[metric].score(user_id)
+
+    def size(self, metric: str) -> int:
+        return len(self.boards[metric])
@@ -8,6 +8,7 @@ import random
 
 from database import database
 from config import config
+from utils.cooldown_tracker import CooldownTracker
 
 class LevelingSystem:
     """Manages user leveling and XP system"""
@@ -15,7 +16,6 @@ class LevelingSystem:
     def __init__(self, client):
         self.client = client
         self.voice_sessions = {}  # Track active voice sessions
-        self.xp_cooldowns = {}  # Text XP cooldowns
         
         # XP Configuration from config or defaults
         self.xp_config = {
@@ -42,6 +42,12 @@ class LevelingSystem:
             }
         }
         
+        # Text XP cooldowns per user, pruned as they expire
+        self.xp_cooldowns = CooldownTracker(
+            self.xp_config['text']['cooldown'] / 1000,
+            max_entries=config.get('leveling.xp.cooldown_max_entries', 100000)
+        )
+        
         # Level calculation formula: XP needed = 100 * level^1.5, capped at level 50
         self.level_formula = {
             'calculateXPNeeded': lambda level: math.floor(100 * math.pow(level, 1.5)),
@@ -102,16 +108,9 @@ class LevelingSystem:
         
         user_id = str(message.author.id)
         
-        # Check cooldown
-        cooldown_key = f"{user_id}_text"
-        now = datetime.now()
-        cooldown_time = self.xp_config['text']['cooldown'] / 1000  # Convert to seconds
-        
-        if cooldown_key in self.xp_cooldowns:
-            if (now - self.xp_cooldowns[cooldown_key]).total_seconds() < cooldown_time:
-                return None
-        
-        self.xp_cooldowns[cooldown_key] = now
+        # Check and start cooldown
+        if not self.xp_cooldowns.try_acquire(CooldownTracker.make_key(message.author.id)):
+            return None
         
         # Calculate XP gain
         base_xp = self.xp_config['text']['base']
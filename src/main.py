@@ -5,7 +5,7 @@ import asyncio
 import os
 import logging
 import io
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 import sys
 
@@ -23,6 +23,8 @@ from leveling_system import init_leveling_system
 from progressive_leveling import init_progressive_leveling
 from cooldown_manager import cooldown_manager
 from intro_card_system import init_intro_card_system, IntroCardModal, IntroCardView
+from utils.canvas_utils import render_executor
+from utils.image_fetcher import image_fetcher
 from datetime import datetime
 
 # Configure logging
@@ -120,17 +122,55 @@ class WonderBot(commands.Bot):
         # Start background tasks (will be uncommented as systems are converted)
         # self.check_giveaways.start()
         # self.update_roles.start()
-    
+
+    async def close(self):
+        """Shut down the bot and release database connections"""
+        # Queued winner announcements still need the Discord connection
+        if self.giveaway_system:
+            try:
+                await self.giveaway_system.close()
+            except Exception as e:
+                logging.error(f"Error stopping giveaway system: {e}")
+
+        if self.drop_system:
+            try:
+                await self.drop_system.close()
+            except Exception as e:
+                logging.error(f"Error stopping drop system: {e}")
+
+        await super().close()
+
+        try:
+            await render_executor.close()
+        except Exception as e:
+            logging.error(f"Error stopping render workers: {e}")
+
+        try:
+            await image_fetcher.close()
+        except Exception as e:
+            logging.error(f"Error closing image download session: {e}")
+
+        try:
+            await self.database.close()
+            logging.info("Database connections closed")
+        except Exception as e:
+            logging.error(f"Error closing database: {e}")
+
     async def on_message(self, message: discord.Message):
         """Handle incoming messages"""
         if message.author.bot:
             return
+        
+        # Drops are scheduled towards guilds and channels where people are talking
+        if message.guild and self.drop_system:
+            self.drop_system.record_activity(str(message.guild.id), str(message.channel.id))
             
-        # Create user in database if not exists
-        try:
-            await self.database.create_user(str(message.author.id), message.author.name)
-        except Exception as e:
-            logging.error(f"Error creating user: {e}")
+        # Create user in database if not exists; every stored user has a balance on the leaderboard
+        if self.database.leaderboards.score('balance', str(message.author.id)) is None:
+            try:
+                await self.database.create_user(str(message.author.id), message.author.name)
+            except Exception as e:
+                logging.error(f"Error creating user: {e}")
         
         # Handle leveling system (using progressive leveling)
         if hasattr(self, 'progressive_leveling') and self.progressive_leveling:
@@ -194,10 +234,15 @@ class WonderBot(commands.Bot):
             await self.database.create_user(str(member.id), member.name)
         except Exception as e:
             logging.error(f"Error creating user on join: {e}")
+        self.database.leaderboards.add_member(str(member.guild.id), str(member.id))
         
         # Handle welcome messages (will be implemented)
         # await self.handle_welcome(member)
     
+    async def on_member_remove(self, member: discord.Member):
+        """Handle member leave events"""
+        self.database.leaderboards.remove_member(str(member.guild.id), str(member.id))
+    
     async def on_command_error(self, ctx: commands.Context, error: Exception):
         """Handle command errors with detailed information"""
         if isinstance(error, commands.CommandNotFound):
@@ -445,7 +490,9 @@ async def work(ctx: commands.Context):
     
     if last_work:
         last_work_dt = datetime.fromisoformat(last_work)
-        if now - last_work_dt < timedelta(minutes=config.cooldowns['work']):
+        on_cooldown = now - last_work_dt < timedelta(minutes=config.cooldowns['work'])
+        # Work Energy skips the cooldown, spending one of its charges
+        if on_cooldown and not ctx.bot.database.effects.use_effect(str(ctx.author.id), 'work_cooldown_reset'):
             remaining = timedelta(minutes=config.cooldowns['work']) - (now - last_work_dt)
             minutes, seconds = divmod(remaining.seconds, 60)
             
@@ -489,9 +536,19 @@ async def work(ctx: commands.Context):
     await ctx.send(embed=embed)
 
 @commands.hybrid_command(name='leaderboard', aliases=['lb', 'top'])
-async def leaderboard(ctx: commands.Context):
+@app_commands.describe(board='Leaderboard to show (coins/xp/drops)')
+async def leaderboard(ctx: commands.Context, board: str = 'coins'):
     """View the wonder leaderboard"""
-    top_users = await ctx.bot.database.get_top_users(10)
+    boards = {'coins': 'balance', 'xp': 'xp', 'drops': 'drops'}
+    board = board.lower()
+    if board not in boards:
+        await send_command_error(ctx, "bad_argument", "leaderboard", f"Board must be one of: {', '.join(boards)}")
+        return
+    
+    if board == 'coins':
+        top_users = await ctx.bot.database.get_top_users(10)
+    else:
+        top_users = await ctx.bot.database.get_leaderboard(boards[board], 10)
     
     if not top_users:
         embed = discord.Embed(
@@ -503,8 +560,9 @@ async def leaderboard(ctx: commands.Context):
         await ctx.send(embed=embed)
         return
     
+    board_title = config.currency['name'] if board == 'coins' else ('Drop' if board == 'drops' else "XP")
     embed = discord.Embed(
-        title=f"🌌 {config.currency['name']} Wonder Leaderboard",
+        title=f"🌌 {board_title} Wonder Leaderboard",
         color=int(config.colors['primary'].replace('#', ''), 16)
     )
     
@@ -515,12 +573,23 @@ async def leaderboard(ctx: commands.Context):
             username = user.display_name if user else user_data['username']
             
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-            description += f"{medal} **{username}** - {user_data['balance']:,} {config.currency['symbol']}\n"
+            if board == 'coins':
+                description += f"{medal} **{username}** - {user_data['balance']:,} {config.currency['symbol']}\n"
+            elif board == 'drops':
+                description += f"{medal} **{username}** - {user_data['score']:,} {config.currency['symbol']} collected\n"
+            else:
+                description += f"{medal} **{username}** - {user_data['score']:,} XP\n"
         except:
             continue
     
     embed.description = description
-    embed.set_footer(text=f"Total dreamers: {len(top_users)} • Wonder")
+    
+    # Where the caller stands, even outside the top 10
+    author_rank = ctx.bot.database.get_user_rank(boards[board], str(ctx.author.id))
+    if author_rank:
+        embed.add_field(name="Your Rank", value=f"#{author_rank:,}", inline=False)
+    
+    embed.set_footer(text=f"Total dreamers: {ctx.bot.database.leaderboards.size(boards[board]) or len(top_users)} • Wonder")
     
     await ctx.send(embed=embed)
 
@@ -783,6 +852,29 @@ async def progressive_rank(ctx: commands.Context, user: discord.Member = None):
             inline=False
         )
     
+    # Leaderboard position
+    server_position, global_position = get_rank_positions(ctx.bot, ctx.guild, 'xp', str(target_user.id))
+    if server_position:
+        embed.add_field(
+            name="🏅 Server Rank",
+            value=f"**#{server_position['rank']:,}** of {server_position['total']:,}",
+            inline=True
+        )
+    if global_position:
+        embed.add_field(
+            name="🌍 Global Rank",
+            value=f"**#{global_position['rank']:,}** of {global_position['total']:,}",
+            inline=True
+        )
+    if server_position and len(server_position['neighbours']) > 1:
+        nearby = []
+        for position, user_id, score in server_position['neighbours']:
+            member = ctx.guild.get_member(int(user_id))
+            name = member.display_name if member else f"User {user_id}"
+            marker = "▶ " if user_id == str(target_user.id) else ""
+            nearby.append(f"{marker}#{position} **{name}** - {score:,} XP")
+        embed.add_field(name="👥 Nearby", value="\n".join(nearby), inline=False)
+    
     # Role information
     next_role_level = progress.get('next_role_level')
     if next_role_level:
@@ -1178,6 +1270,16 @@ async def rank(ctx: commands.Context, user: str = None):
             inline=False
         )
     
+    # Add server/global XP positions; only total XP is tracked on the leaderboards, not each category
+    server_position, global_position = get_rank_positions(ctx.bot, ctx.guild, 'xp', str(target_user.id))
+    if server_position and global_position:
+        embed.add_field(
+            name="🏅 Leaderboard Position",
+            value=(f"✨ **#{server_position['rank']:,}** of {server_position['total']:,} here"
+                   f" • #{global_position['rank']:,} global"),
+            inline=False
+        )
+    
     # Add statistics
     stats_value = f"💬 **Messages:** {rank_info['total_messages']:,}\n"
     if rank_info.get('total_voice_time'):
@@ -2735,6 +2837,18 @@ def parse_user_mention_or_id(user_input: str, guild: discord.Guild) -> discord.M
     
     return None
 
+def get_rank_positions(bot: commands.Bot, guild: discord.Guild, metric: str, user_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Get a user's (server, global) leaderboard positions for a metric"""
+    leaderboards = bot.database.leaderboards
+    if not leaderboards.is_built:
+        return None, None
+    if not leaderboards.has_guild(str(guild.id)):
+        leaderboards.load_guild(str(guild.id), [str(member.id) for member in guild.members])
+    return (
+        bot.database.get_rank_position(metric, user_id, str(guild.id)),
+        bot.database.get_rank_position(metric, user_id, radius=0)
+    )
+
 def parse_role_mention_or_id(role_input: str, guild: discord.Guild) -> discord.Role:
     """Parse role from mention or ID only"""
     if not role_input:
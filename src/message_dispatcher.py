@@ -0,0 +1,236 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import discord
+
+from utils.token_bucket import TokenBucket
+
+PRIORITY_HIGH = 0    # Winner announcements and DMs
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # Entry confirmations and denials
+
+# Discord accepts up to 10 embeds in one message
+MAX_DIGEST_EMBEDS = 10
+
+
+class OutboundMessage:
+    __slots__ = ('destination', 'route', 'content', 'embeds', 'priority', 'sequence', 'dedupe_keys', 'digest')
+
+    def __init__(self, destination: discord.abc.Messageable, route: str, content: Optional[str],
+                 embeds: List[discord.Embed], priority: int, sequence: int, digest: bool):
+        self.destination = destination
+        self.route = route
+        self.content = content
+        self.embeds = embeds
+        self.priority = priority
+        self.sequence = sequence
+        self.dedupe_keys: List[Hashable] = []
+        self.digest = digest
+
+
+class MessageDispatcher:
+    """Outbound message queue sent in priority order within per-route and global rate limits.
+
+    Callers queue and return immediately, so a slow or rate-limited send never holds up the handler
+    that produced it. A route is whatever Discord rate-limits together: one DM channel or one text channel.
+    """
+
+    name = "message dispatcher"
+
+    def __init__(self, route_rate: float = 1.0, route_burst: int = 5, global_rate: float = 40.0,
+                 global_burst: int = 40, max_queue: int = 2000, max_in_flight: int = 10,
+                 digest: bool = False, max_buckets: int = 10000):
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.max_queue = max_queue
+        self.max_in_flight = max_in_flight
+        # Fold queued embeds for the same route into one message instead of sending each separately
+        self.digest = digest
+        self.max_buckets = max_buckets
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queue: List[Tuple[int, int, OutboundMessage]] = []
+        self._dedupe: Dict[Hashable, OutboundMessage] = {}
+        self._digests: Dict[str, OutboundMessage] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sending: Set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deduped = 0
+        self.digested = 0
+
+    def send(self, destination: discord.abc.Messageable, route: str, content: Optional[str] = None,
+             embed: Optional[discord.Embed] = None, priority: int = PRIORITY_NORMAL,
+             dedupe_key: Optional[Hashable] = None, digest: bool = False) -> bool:
+        """Queue a message; returns False if it duplicated a queued one or was dropped for space"""
+        self.submitted += 1
+        if dedupe_key is not None and dedupe_key in self._dedupe:
+            self.deduped += 1
+            return False
+
+        if digest and self.digest and embed is not None and content is None:
+            pending = self._digests.get(route)
+            if pending is not None and len(pending.embeds) < MAX_DIGEST_EMBEDS:
+                pending.embeds.append(embed)
+                self._remember(pending, dedupe_key)
+                self.digested += 1
+                return True
+
+        if len(self._queue) >= self.max_queue and not self._drop_lowest(priority):
+            self.dropped += 1
+            return False
+
+        message = OutboundMessage(destination, route, content, [embed] if embed is not None else [],
+                                  priority, next(self._sequence), digest and self.digest)
+        heapq.heappush(self._queue, (priority, message.sequence, message))
+        self._remember(message, dedupe_key)
+        if message.digest and content is None:
+            self._digests[route] = message
+        self._wakeup.set()
+        return True
+
+    def _remember(self, message: OutboundMessage, dedupe_key: Optional[Hashable]):
+        if dedupe_key is not None:
+            message.dedupe_keys.append(dedupe_key)
+            self._dedupe[dedupe_key] = message
+
+    def _forget(self, message: OutboundMessage):
+        for key in message.dedupe_keys:
+            self._dedupe.pop(key, None)
+        if self._digests.get(message.route) is message:
+            del self._digests[message.route]
+
+    def _drop_lowest(self, priority: int) -> bool:
+        """Make room by dropping the newest of the lowest-priority queued messages, if below priority"""
+        lowest = max(self._queue)
+        if lowest[0] <= priority:
+            return False
+        self._queue.remove(lowest)
+        heapq.heapify(self._queue)
+        self._forget(lowest[2])
+        self.dropped += 1
+        return True
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                # Full buckets carry no state worth keeping
+                now = time.monotonic()
+                self._buckets = {key: b for key, b in self._buckets.items() if not b.is_full(now)}
+            bucket = self._buckets[route] = TokenBucket(self.route_rate, self.route_burst)
+        return bucket
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, drain_timeout: float = 10.0):
+        """Deliver what's queued above low priority (for up to drain_timeout seconds), then stop"""
+        if self._task and not self._task.done():
+            # Entry confirmations aren't worth holding up shutdown for
+            low = [entry for entry in self._queue if entry[0] >= PRIORITY_LOW]
+            if low:
+                self._queue = [entry for entry in self._queue if entry[0] < PRIORITY_LOW]
+                heapq.heapify(self._queue)
+                for entry in low:
+                    self._forget(entry[2])
+                self.dropped += len(low)
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + drain_timeout
+            self._wakeup.set()
+            while (self._queue or self._sending) and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            timeout = self._dispatch_ready()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """Start every send the rate limits allow; returns seconds until the next one could go"""
+        now = time.monotonic()
+        deferred = []
+        timeout = None
+        while self._queue and len(self._sending) < self.max_in_flight:
+            global_wait = self.global_bucket.wait_time(now)
+            if global_wait > 0:
+                timeout = global_wait
+                break
+
+            entry = heapq.heappop(self._queue)
+            message = entry[2]
+            bucket = self._bucket(message.route)
+            if not bucket.try_acquire(now):
+                # Leave it queued (and open to digests) until its route has room
+                deferred.append(entry)
+                route_wait = bucket.wait_time(now)
+                timeout = route_wait if timeout is None else min(timeout, route_wait)
+                continue
+
+            self.global_bucket.try_acquire(now)
+            self._forget(message)
+            task = asyncio.create_task(self._deliver(message))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+        return timeout
+
+    def _sent(self, task: asyncio.Task):
+        self._sending.discard(task)
+        self._wakeup.set()
+
+    async def _deliver(self, message: OutboundMessage):
+        try:
+            if len(message.embeds) > 1:
+                await message.destination.send(content=message.content, embeds=message.embeds)
+            else:
+                await message.destination.send(content=message.content,
+                                               embed=message.embeds[0] if message.embeds else None)
+            self.sent += 1
+        except discord.Forbidden:
+            # DMs closed or missing channel permissions
+            self.failed += 1
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"Error sending message to {message.route}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'depth': len(self._queue),
+            'in_flight': len(self._sending),
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'deduped': self.deduped,
+            'digested': self.digested,
+            'drop_rate': self.dropped / self.submitted if self.submitted else 0.0
+        }
@@ -0,0 +1,198 @@
+import logging
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+class AddColumn(NamedTuple):
+    """Add a column unless the table already has it"""
+    table: str
+    column: str
+    definition: str
+    dialects: Tuple[str, ...] = ('sqlite', 'mysql')
+
+
+class AddIndex(NamedTuple):
+    """Create an index unless one with the same name exists"""
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+    dialects: Tuple[str, ...] = ('sqlite', 'mysql')
+
+
+class Statement(NamedTuple):
+    """Raw SQL for each dialect (None skips that dialect)"""
+    sqlite: Optional[str] = None
+    mysql: Optional[str] = None
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: Sequence[Union[AddColumn, AddIndex, Statement]]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Columns added after the original schema", [
+        AddColumn('server_settings', 'category_text_enabled', 'BOOLEAN DEFAULT TRUE'),
+        AddColumn('server_settings', 'category_voice_enabled', 'BOOLEAN DEFAULT TRUE'),
+        AddColumn('server_settings', 'category_role_enabled', 'BOOLEAN DEFAULT TRUE'),
+        AddColumn('server_settings', 'category_overall_enabled', 'BOOLEAN DEFAULT TRUE'),
+        AddColumn('server_settings', 'level_roles', 'TEXT'),
+        AddColumn('introduction_cards', 'gender', 'TEXT'),
+        AddColumn('drop_channels', 'settings', "TEXT DEFAULT '{}'", dialects=('sqlite',)),
+    ]),
+    Migration(2, "One inventory row per user and item", [
+        # Merge duplicate rows into the oldest one before the key can be added
+        Statement(
+            sqlite="""
+                UPDATE user_inventory SET quantity = (
+                    SELECT SUM(quantity) FROM user_inventory dup
+                    WHERE dup.user_id = user_inventory.user_id AND dup.item_id = user_inventory.item_id
+                )
+                WHERE id IN (SELECT MIN(id) FROM user_inventory GROUP BY user_id, item_id HAVING COUNT(*) > 1)
+            """,
+            mysql="""
+                UPDATE user_inventory ui
+                JOIN (SELECT MIN(id) AS id, SUM(quantity) AS total FROM user_inventory
+                      GROUP BY user_id, item_id HAVING COUNT(*) > 1) dup ON ui.id = dup.id
+                SET ui.quantity = dup.total
+            """
+        ),
+        Statement(
+            sqlite="""
+                DELETE FROM user_inventory
+                WHERE id NOT IN (SELECT MIN(id) FROM user_inventory GROUP BY user_id, item_id)
+            """,
+            mysql="""
+                DELETE FROM user_inventory
+                WHERE id NOT IN (SELECT id FROM (SELECT MIN(id) AS id FROM user_inventory
+                                                 GROUP BY user_id, item_id) keep_rows)
+            """
+        ),
+        AddIndex('user_inventory', 'idx_user_inventory_user_item', ('user_id', 'item_id'), unique=True,
+                 dialects=('sqlite',)),
+        AddIndex('user_inventory', 'unique_inventory_item', ('user_id', 'item_id'), unique=True,
+                 dialects=('mysql',)),
+    ]),
+    Migration(3, "Secondary indexes for the bot's lookups", [
+        # get_gambling_stats, newest first
+        AddIndex('transactions', 'idx_transactions_user_created', ('user_id', 'created_at')),
+        # Drop stats per guild, split by SYSTEM/collector rows
+        AddIndex('drop_stats', 'idx_drop_stats_guild_user', ('guild_id', 'user_id'), dialects=('sqlite',)),
+        AddIndex('drop_stats', 'idx_drop_stats_guild', ('guild_id', 'created_at'), dialects=('mysql',)),
+        # Expired giveaway sweep, lookups by message and per-guild listings
+        AddIndex('giveaways', 'idx_giveaways_status_end', ('status', 'end_time'), dialects=('sqlite',)),
+        AddIndex('giveaways', 'idx_giveaways_status_end', ('status', 'ends_at'), dialects=('mysql',)),
+        AddIndex('giveaways', 'idx_giveaways_message', ('message_id',), dialects=('mysql',)),
+        AddIndex('giveaways', 'idx_giveaways_guild_created', ('guild_id', 'created_at')),
+        # _user_recently_won and winner lists; entries are already keyed by (giveaway_id, user_id)
+        AddIndex('giveaway_winners', 'idx_giveaway_winners_user', ('user_id', 'giveaway_id')),
+        AddIndex('giveaway_winners', 'idx_giveaway_winners_giveaway', ('giveaway_id',)),
+        # Card interaction listings, optionally filtered by type
+        AddIndex('intro_card_interactions', 'idx_card_interactions_card_type',
+                 ('card_id', 'interaction_type', 'created_at')),
+        # Public cards per guild, newest first
+        AddIndex('introduction_cards', 'idx_introduction_cards_guild_created', ('guild_id', 'created_at')),
+        # Balance leaderboard
+        AddIndex('users', 'idx_users_balance', ('balance',)),
+    ]),
+]
+
+
+class MigrationRunner:
+    """Applies pending MIGRATIONS in order and records each in schema_version"""
+
+    def __init__(self, dialect: str, migrations: Sequence[Migration] = MIGRATIONS):
+        self.dialect = dialect
+        self.migrations = migrations
+
+    async def _query(self, db, sql: str, params: Tuple = ()) -> List[Any]:
+        """Run one statement on an aiosqlite connection or an aiomysql cursor and return its rows"""
+        if self.dialect == 'mysql':
+            await db.execute(sql.replace('?', '%s'), params or None)
+            return list(await db.fetchall())
+        async with db.execute(sql, params) as cursor:
+            return list(await cursor.fetchall())
+
+    async def current_version(self, db) -> int:
+        """Highest applied migration version (0 for a fresh or pre-migration database)"""
+        if self.dialect == 'mysql':
+            await self._query(db, """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255),
+                    applied_at DATETIME DEFAULT NOW()
+                )
+            """)
+        else:
+            await self._query(db, """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        rows = await self._query(db, 'SELECT MAX(version) FROM schema_version')
+        return (rows[0][0] or 0) if rows else 0
+
+    async def _column_exists(self, db, table: str, column: str) -> bool:
+        if self.dialect == 'mysql':
+            rows = await self._query(
+                db,
+                """SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = DATABASE() AND table_name = ? AND column_name = ?""",
+                (table, column)
+            )
+            return bool(rows)
+        rows = await self._query(db, f'PRAGMA table_info({table})')
+        return any(row[1] == column for row in rows)
+
+    async def _index_exists(self, db, table: str, name: str) -> bool:
+        if self.dialect == 'mysql':
+            rows = await self._query(
+                db,
+                """SELECT 1 FROM information_schema.statistics
+                   WHERE table_schema = DATABASE() AND table_name = ? AND index_name = ?""",
+                (table, name)
+            )
+        else:
+            rows = await self._query(db, "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+        return bool(rows)
+
+    async def _apply_step(self, db, step: Union[AddColumn, AddIndex, Statement]):
+        if isinstance(step, Statement):
+            sql = step.mysql if self.dialect == 'mysql' else step.sqlite
+            if sql:
+                await self._query(db, sql)
+            return
+
+        if self.dialect not in step.dialects:
+            return
+
+        if isinstance(step, AddColumn):
+            if not await self._column_exists(db, step.table, step.column):
+                await self._query(db, f'ALTER TABLE {step.table} ADD COLUMN {step.column} {step.definition}')
+        elif not await self._index_exists(db, step.table, step.name):
+            unique = 'UNIQUE ' if step.unique else ''
+            await self._query(db, f"CREATE {unique}INDEX {step.name} ON {step.table} ({', '.join(step.columns)})")
+
+    async def run(self, db) -> int:
+        """Apply every migration newer than the recorded version; returns how many were applied"""
+        version = await self.current_version(db)
+        applied = 0
+        for migration in self.migrations:
+            if migration.version <= version:
+                continue
+            try:
+                for step in migration.steps:
+                    await self._apply_step(db, step)
+                await self._query(
+                    db, 'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (migration.version, migration.description)
+                )
+            except Exception as e:
+                logging.error(f"Error applying migration {migration.version} ({migration.description}): {e}")
+                raise
+            logging.info(f"Applied migration {migration.version}: {migration.description}")
+            applied += 1
+        return applied
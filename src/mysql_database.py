@@ -5,6 +5,14 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 import logging
 from config import config
+from migrations import MigrationRunner
+
+# Leaderboard metric -> (user_id, score) query; drop stats are kept per guild here
+LEADERBOARD_QUERIES = {
+    'balance': 'SELECT user_id, balance FROM users WHERE balance IS NOT NULL',
+    'xp': 'SELECT user_id, xp FROM user_levels WHERE xp IS NOT NULL',
+    'drops': 'SELECT user_id, SUM(total_amount) FROM user_drop_stats GROUP BY user_id',
+}
 
 class MySQLDatabase:
     """Async MySQL database manager for Wonder Discord Bot"""
@@ -106,6 +114,7 @@ class MySQLDatabase:
                     category_voice_enabled BOOLEAN DEFAULT TRUE,
                     category_role_enabled BOOLEAN DEFAULT TRUE,
                     category_overall_enabled BOOLEAN DEFAULT TRUE,
+                    level_roles TEXT,
                     created_at DATETIME DEFAULT NOW()
                 )
             """)
@@ -129,7 +138,8 @@ class MySQLDatabase:
                     user_id VARCHAR(255),
                     item_id VARCHAR(255),
                     quantity INT DEFAULT 1,
-                    acquired_at DATETIME DEFAULT NOW()
+                    acquired_at DATETIME DEFAULT NOW(),
+                    UNIQUE KEY unique_inventory_item (user_id, item_id)
                 )
             """)
 
@@ -286,6 +296,9 @@ class MySQLDatabase:
                 )
             """)
 
+            # Columns, keys and indexes added since the tables above were first created
+            await MigrationRunner('mysql').run(cursor)
+
             await cursor.close()
             
     async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -297,6 +310,25 @@ class MySQLDatabase:
             await cursor.close()
             return result
     
+    async def get_users_by_id(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch users rows by primary key"""
+        placeholders = ', '.join('%s' for _ in user_ids)
+        async with await self._get_connection() as db:
+            cursor = await db.cursor(aiomysql.DictCursor)
+            await cursor.execute(f"SELECT * FROM users WHERE user_id IN ({placeholders})", user_ids)
+            result = await cursor.fetchall()
+            await cursor.close()
+            return {row['user_id']: row for row in result}
+
+    async def get_leaderboard_scores(self, metric: str) -> List[Tuple[str, int]]:
+        """Every (user_id, score) stored for a leaderboard metric"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(LEADERBOARD_QUERIES[metric])
+            result = await cursor.fetchall()
+            await cursor.close()
+            return [(user_id, int(score)) for user_id, score in result]
+
     async def create_user(self, user_id: str, username: str) -> int:
         """Create new user"""
         async with await self._get_connection() as db:
@@ -321,6 +353,35 @@ class MySQLDatabase:
             await cursor.close()
             return rowcount
     
+    async def increment_balance(self, user_id: str, amount: int, username: str = 'Unknown') -> int:
+        """Atomically add to a user's balance (creating the user if needed) and return the new balance"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(
+                """INSERT INTO users (user_id, username, balance, total_earned) VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE
+                       balance = LAST_INSERT_ID(balance + VALUES(balance)),
+                       total_earned = total_earned + VALUES(total_earned)""",
+                (user_id, username, amount, max(0, amount))
+            )
+            # rowcount is 1 for a fresh insert, otherwise the new balance comes back via LAST_INSERT_ID
+            new_balance = amount if cursor.rowcount == 1 else cursor.lastrowid
+            await cursor.close()
+            return new_balance
+    
+    async def add_item_to_inventory(self, user_id: str, item_id: str, quantity: int = 1) -> int:
+        """Add item to user inventory and return the new quantity"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(
+                """INSERT INTO user_inventory (user_id, item_id, quantity) VALUES (%s, %s, %s)
+                   ON DUPLICATE KEY UPDATE quantity = LAST_INSERT_ID(quantity + VALUES(quantity))""",
+                (user_id, item_id, quantity)
+            )
+            new_quantity = quantity if cursor.rowcount == 1 else cursor.lastrowid
+            await cursor.close()
+            return new_quantity
+    
     async def set_balance(self, user_id: str, amount: int) -> int:
         """Set user balance"""
         async with await self._get_connection() as db:
@@ -436,6 +497,109 @@ class MySQLDatabase:
             self.pool.close()
             await self.pool.wait_closed()
 
+    # Giveaway methods
+    async def get_active_giveaways(self) -> List[Dict[str, Any]]:
+        """Get every giveaway that has not ended yet, with columns named as in the SQLite schema"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor(aiomysql.DictCursor)
+            await cursor.execute(
+                """SELECT *, ends_at AS end_time, winner_count AS winners_count, creator_id AS host_id
+                   FROM giveaways WHERE status = 'active'"""
+            )
+            result = await cursor.fetchall()
+            await cursor.close()
+            return list(result)
+
+    async def get_giveaway(self, giveaway_id: int) -> Optional[Dict[str, Any]]:
+        """Get a giveaway by ID, with columns named as in the SQLite schema"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor(aiomysql.DictCursor)
+            await cursor.execute(
+                """SELECT *, ends_at AS end_time, winner_count AS winners_count, creator_id AS host_id
+                   FROM giveaways WHERE id = %s""",
+                (giveaway_id,)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+            return result
+
+    async def get_giveaway_entries(self, giveaway_id: int) -> List[Dict[str, Any]]:
+        """Get a giveaway's entrants; the MySQL schema has no entry weights, so each counts once"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor(aiomysql.DictCursor)
+            await cursor.execute(
+                'SELECT user_id, 1 AS entries FROM giveaway_entries WHERE giveaway_id = %s', (giveaway_id,)
+            )
+            result = await cursor.fetchall()
+            await cursor.close()
+            return list(result)
+
+    async def apply_giveaway_entries(self, adds: List[Tuple[int, str, int]], removes: List[Tuple[int, str]]) -> None:
+        """Store batched entries and delete removed ones; entry weights aren't stored in this schema"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            if adds:
+                await cursor.executemany(
+                    'INSERT IGNORE INTO giveaway_entries (giveaway_id, user_id) VALUES (%s, %s)',
+                    [(giveaway_id, user_id) for giveaway_id, user_id, _ in adds]
+                )
+            if removes:
+                await cursor.executemany(
+                    'DELETE FROM giveaway_entries WHERE giveaway_id = %s AND user_id = %s',
+                    removes
+                )
+            await cursor.close()
+
+    async def get_recent_giveaway_winners(self, since: datetime) -> List[Tuple[str, Any]]:
+        """(user_id, latest ended_at) for everyone who won a giveaway that ended after `since`"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(
+                """SELECT gw.user_id, MAX(g.ended_at) FROM giveaway_winners gw
+                   JOIN giveaways g ON gw.giveaway_id = g.id
+                   WHERE g.ended_at > %s
+                   GROUP BY gw.user_id""",
+                (since,)
+            )
+            result = await cursor.fetchall()
+            await cursor.close()
+            return list(result)
+
+    async def get_giveaway_winners(self, giveaway_id: int) -> List[str]:
+        """A giveaway's winners in draw order"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(
+                'SELECT user_id FROM giveaway_winners WHERE giveaway_id = %s ORDER BY position', (giveaway_id,)
+            )
+            result = await cursor.fetchall()
+            await cursor.close()
+            return [row[0] for row in result]
+
+    async def add_giveaway_winners(self, giveaway_id: int, winners: List[str]) -> None:
+        """Store a giveaway's drawn winners in draw order, skipping positions already stored"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.executemany(
+                """INSERT INTO giveaway_winners (giveaway_id, user_id, position)
+                   SELECT %s, %s, %s FROM DUAL WHERE NOT EXISTS (
+                       SELECT 1 FROM giveaway_winners WHERE giveaway_id = %s AND position = %s
+                   )""",
+                [(giveaway_id, winner_id, position, giveaway_id, position)
+                 for position, winner_id in enumerate(winners, 1)]
+            )
+            await cursor.close()
+
+    async def mark_giveaway_completed(self, giveaway_id: int, ended_at: datetime) -> None:
+        """Mark a giveaway as completed"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.execute(
+                'UPDATE giveaways SET status = %s, ended_at = %s WHERE id = %s',
+                ('completed', ended_at, giveaway_id)
+            )
+            await cursor.close()
+
     # Leveling system methods
     async def get_user_level(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user level data"""
@@ -446,38 +610,50 @@ class MySQLDatabase:
             await cursor.close()
             return result
 
-    async def update_user_xp(self, user_id: str, xp_gain: int) -> Tuple[int, bool]:
-        """Update user XP and return new level and whether they leveled up"""
+    async def update_user_xp(self, user_id: str, xp_gain: int) -> Tuple[int, bool, int]:
+        """Update user XP and return new level, whether they leveled up and the new XP total"""
         async with await self._get_connection() as db:
             cursor = await db.cursor()
             
-            # Get current data
+            # Both branches go through LAST_INSERT_ID(expr), so this connection can read back the total it wrote
             await cursor.execute(
-                'SELECT xp, level FROM user_levels WHERE user_id = %s', (user_id,)
+                """INSERT INTO user_levels (user_id, xp, level, last_xp_gain) VALUES (%s, LAST_INSERT_ID(%s), 1, NOW())
+                   ON DUPLICATE KEY UPDATE xp = LAST_INSERT_ID(xp + VALUES(xp)), last_xp_gain = NOW()""",
+                (user_id, xp_gain)
             )
-            current = await cursor.fetchone()
+            await cursor.execute('SELECT LAST_INSERT_ID(), level FROM user_levels WHERE user_id = %s', (user_id,))
+            new_xp, current_level = await cursor.fetchone()
             
-            if not current:
-                # Create new user level record
-                await cursor.execute(
-                    'INSERT INTO user_levels (user_id, xp, level) VALUES (%s, %s, %s)',
-                    (user_id, xp_gain, 1)
-                )
-                await cursor.close()
-                return 1, False
-            
-            current_xp, current_level = current
-            new_xp = current_xp + xp_gain
             new_level = self._calculate_level(new_xp)
-            leveled_up = new_level > current_level
+            if new_level <= current_level:
+                await cursor.close()
+                return current_level, False, new_xp
             
+            # Only the update that actually raises the level reports the level up
             await cursor.execute(
-                'UPDATE user_levels SET xp = %s, level = %s, last_xp_gain = NOW() WHERE user_id = %s',
-                (new_xp, new_level, user_id)
+                'UPDATE user_levels SET level = %s WHERE user_id = %s AND level < %s',
+                (new_level, user_id, new_level)
             )
+            leveled_up = cursor.rowcount > 0
             await cursor.close()
             
-            return new_level, leveled_up
+            return new_level, leveled_up, new_xp
+
+    async def apply_xp_deltas(self, rows: List[Tuple[str, int, int, int, str]]) -> None:
+        """Add batched (user_id, xp_delta, level, message_delta, last_xp_gain) rows to user_levels"""
+        async with await self._get_connection() as db:
+            cursor = await db.cursor()
+            await cursor.executemany(
+                """INSERT INTO user_levels (user_id, xp, level, messages_sent, last_xp_gain)
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE
+                       xp = xp + VALUES(xp),
+                       level = GREATEST(level, VALUES(level)),
+                       messages_sent = messages_sent + VALUES(messages_sent),
+                       last_xp_gain = VALUES(last_xp_gain)""",
+                rows
+            )
+            await cursor.close()
 
     def _calculate_level(self, xp: int) -> int:
         """Calculate level based on XP"""
@@ -4,12 +4,15 @@ import asyncio
 import logging
 import math
 import random
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Iterable
 import json
 
 from database import database
 from config import config
+from cooldown_manager import cooldown_manager
+from utils.cooldown_tracker import CooldownTracker
 
 class ProgressiveLevelingSystem:
     """Enhanced leveling system with progressive XP and configurable roles every 5 levels up to level 100"""
@@ -17,7 +20,6 @@ class ProgressiveLevelingSystem:
     def __init__(self, client):
         self.client = client
         self.voice_sessions = {}  # Track active voice sessions
-        self.xp_cooldowns = {}  # Text XP cooldowns
         
         # XP Configuration
         self.xp_config = {
@@ -34,41 +36,77 @@ class ProgressiveLevelingSystem:
             }
         }
         
+        # Text XP cooldowns per (user, guild), pruned as they expire
+        self.xp_cooldowns = CooldownTracker(
+            self.xp_config['text']['cooldown'] / 1000,
+            max_entries=config.get('leveling.xp.cooldown_max_entries', 100000)
+        )
+        
         # Progressive XP formula for levels 1-100
         self.max_level = 100
         self.role_interval = 5  # Role every 5 levels
         
-    def calculate_xp_needed(self, level: int) -> int:
-        """Calculate XP needed to reach a specific level with progressive scaling"""
-        if level <= 1:
-            return 0
-        
-        # Progressive formula: Base XP increases significantly with level
+        # Curve tiers as (last level in tier, base XP, exponent); the last tier is open-ended
         # Level 1-10: 100 * level^1.2
-        # Level 11-30: 150 * level^1.3  
+        # Level 11-30: 150 * level^1.3
         # Level 31-60: 200 * level^1.4
         # Level 61-100: 300 * level^1.5
+        self.xp_curve = [
+            (10, 100, 1.2),
+            (30, 150, 1.3),
+            (60, 200, 1.4),
+            (None, 300, 1.5)
+        ]
+        self.rebuild_xp_table()
+    
+    def rebuild_xp_table(self):
+        """Precompute per-level and cumulative XP for every level up to max_level"""
+        # Index by level; levels 0 and 1 need nothing
+        self._xp_needed_table = [0, 0]
+        self._total_xp_table = [0, 0]
+        for level in range(2, self.max_level + 2):
+            xp_needed = self._xp_needed_from_curve(level)
+            self._xp_needed_table.append(xp_needed)
+            self._total_xp_table.append(self._total_xp_table[-1] + xp_needed)
         
-        if level <= 10:
-            base_xp = 100
-            exponent = 1.2
-        elif level <= 30:
-            base_xp = 150
-            exponent = 1.3
-        elif level <= 60:
-            base_xp = 200
-            exponent = 1.4
-        else:
-            base_xp = 300
-            exponent = 1.5
-            
+        # Sorted thresholds for levels 2..max_level, searched with bisect
+        self._level_thresholds = self._total_xp_table[2:self.max_level + 1]
+    
+    def set_xp_curve(self, xp_curve: List[Tuple[Optional[int], int, float]], max_level: Optional[int] = None):
+        """Replace the XP curve (and optionally the level cap) and rebuild the lookup tables"""
+        self.xp_curve = xp_curve
+        if max_level is not None:
+            self.max_level = max_level
+        self.rebuild_xp_table()
+    
+    def _xp_needed_from_curve(self, level: int) -> int:
+        """Evaluate the curve formula for a single level"""
+        for last_level, base_xp, exponent in self.xp_curve:
+            if last_level is None or level <= last_level:
+                return math.floor(base_xp * math.pow(level, exponent))
+        # Past the last closed tier without an open-ended one: keep using the final tier
+        _, base_xp, exponent = self.xp_curve[-1]
         return math.floor(base_xp * math.pow(level, exponent))
     
+    def calculate_xp_needed(self, level: int) -> int:
+        """Calculate XP needed to reach a specific level with progressive scaling"""
+        if level <= 1:
+            return 0
+        if level < len(self._xp_needed_table):
+            return self._xp_needed_table[level]
+        return self._xp_needed_from_curve(level)
+    
     def calculate_total_xp_for_level(self, target_level: int) -> int:
         """Calculate total XP needed to reach a specific level"""
-        total_xp = 0
-        for level in range(2, target_level + 1):
-            total_xp += self.calculate_xp_needed(level)
+        if target_level <= 1:
+            return 0
+        if target_level < len(self._total_xp_table):
+            return self._total_xp_table[target_level]
+        
+        # Beyond the table (above the level cap): extend from the last precomputed total
+        total_xp = self._total_xp_table[-1]
+        for level in range(len(self._total_xp_table), target_level + 1):
+            total_xp += self._xp_needed_from_curve(level)
         return total_xp
     
     def calculate_level_from_xp(self, total_xp: int) -> Tuple[int, int, int]:
@@ -76,24 +114,27 @@ class ProgressiveLevelingSystem:
         if total_xp <= 0:
             return 1, 0, self.calculate_xp_needed(2)
         
-        current_level = 1
-        xp_accumulated = 0
-        
-        for level in range(2, self.max_level + 1):
-            xp_needed = self.calculate_xp_needed(level)
-            if xp_accumulated + xp_needed > total_xp:
-                break
-            xp_accumulated += xp_needed
-            current_level = level
+        # Number of level thresholds reached, plus the starting level
+        current_level = 1 + bisect_right(self._level_thresholds, total_xp)
+        xp_accumulated = self._total_xp_table[current_level]
         
         if current_level >= self.max_level:
             return self.max_level, total_xp - xp_accumulated, 0
         
         current_level_xp = total_xp - xp_accumulated
-        next_level_xp_needed = self.calculate_xp_needed(current_level + 1) - current_level_xp
+        next_level_xp_needed = self._xp_needed_table[current_level + 1] - current_level_xp
         
         return current_level, current_level_xp, next_level_xp_needed
     
+    def calculate_levels_for_xp(self, xp_totals: Iterable[int]) -> List[int]:
+        """Map many XP totals to levels at once (for leaderboards and recalculation jobs)"""
+        thresholds = self._level_thresholds
+        return [1 + bisect_right(thresholds, total_xp) if total_xp > 0 else 1 for total_xp in xp_totals]
+    
+    def get_level_for_xp(self, total_xp: int) -> int:
+        """Get the level for a total XP amount"""
+        return self.calculate_level_from_xp(total_xp)[0]
+    
     def get_role_levels(self) -> List[int]:
         """Get all levels that should have roles (every 5 levels)"""
         return [level for level in range(self.role_interval, self.max_level + 1, self.role_interval)]
@@ -197,17 +238,10 @@ class ProgressiveLevelingSystem:
             user_id = str(message.author.id)
             guild_id = str(message.guild.id)
             
-            # Check cooldown
-            current_time = datetime.now()
-            cooldown_key = f"{user_id}_{guild_id}_text"
-            
-            if cooldown_key in self.xp_cooldowns:
-                time_diff = (current_time - self.xp_cooldowns[cooldown_key]).total_seconds() * 1000
-                if time_diff < self.xp_config['text']['cooldown']:
-                    return None
-            
-            # Update cooldown
-            self.xp_cooldowns[cooldown_key] = current_time
+            # Check and start cooldown
+            cooldown_key = CooldownTracker.make_key(message.author.id, message.guild.id)
+            if not self.xp_cooldowns.try_acquire(cooldown_key):
+                return None
             
             # Calculate XP gain
             base_xp = self.xp_config['text']['base']
@@ -216,31 +250,15 @@ class ProgressiveLevelingSystem:
             
             # Apply multipliers based on user roles
             multiplier = await self.get_user_multiplier(message.author)
+            if await cooldown_manager.has_experience_boost(user_id):
+                multiplier += 0.5  # XP Boost item
             total_xp_gain = math.floor(total_xp_gain * multiplier)
             
-            # Get current user data
-            user_data = await database.get_user(user_id)
-            if not user_data:
-                await database.create_user(user_id, message.author.name)
-                user_data = await database.get_user(user_id)
-            
-            # Get current level data
-            level_data = await database.get_user_level(user_id)
-            if not level_data:
-                # Create initial level data
-                current_xp = 0
-                current_level = 1
-            else:
-                current_xp = level_data.get('total_xp', 0)
-                current_level, _, _ = self.calculate_level_from_xp(current_xp)
-            
-            # Add XP
-            new_total_xp = current_xp + total_xp_gain
+            # Accumulate in memory; the ledger writes user_levels in batches
+            old_total_xp, new_total_xp = await database.xp_ledger.add_xp(user_id, total_xp_gain)
+            current_level = self.get_level_for_xp(old_total_xp)
             new_level, current_level_xp, next_level_xp = self.calculate_level_from_xp(new_total_xp)
             
-            # Update database
-            xp_gain, level_up = await database.update_user_xp(user_id, total_xp_gain)
-            
             # Check for role rewards
             role_reward = None
             if new_level > current_level and self.is_role_level(new_level):
@@ -285,8 +303,8 @@ class ProgressiveLevelingSystem:
     async def get_user_progress(self, user_id: str) -> Dict[str, Any]:
         """Get detailed user level progress"""
         try:
-            level_data = await database.get_user_level(user_id)
-            if not level_data:
+            total_xp = await database.xp_ledger.get_xp(user_id)
+            if total_xp <= 0:
                 return {
                     'level': 1,
                     'total_xp': 0,
@@ -297,7 +315,6 @@ class ProgressiveLevelingSystem:
                     'levels_to_next_role': 4
                 }
             
-            total_xp = level_data.get('total_xp', 0)
             current_level, current_level_xp, next_level_xp = self.calculate_level_from_xp(total_xp)
             
             # Calculate progress percentage
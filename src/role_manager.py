@@ -40,8 +40,7 @@ class RoleManager:
     async def _load_level_roles(self, guild_id: int):
         """Load level role configurations from database"""
         try:
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT * FROM level_role_config ORDER BY level_type, level'
                 ) as cursor:
@@ -104,7 +103,7 @@ class RoleManager:
                 return {"success": False, "message": "Role not found!"}
             
             # Check if configuration already exists
-            async with await database._get_connection() as db:
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT id FROM level_role_config WHERE level_type = ? AND level = ?',
                     (level_type, level)
@@ -115,7 +114,7 @@ class RoleManager:
                 return {"success": False, "message": f"Role reward for {level_type} level {level} already exists!"}
             
             # Add new configuration
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                     await db.execute(
                         """INSERT INTO level_role_config 
                            (level_type, level, role_id, role_name, created_by)
@@ -148,7 +147,7 @@ class RoleManager:
         """Remove a level role reward configuration"""
         try:
             # Remove from database
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                 cursor = await db.execute(
                     'DELETE FROM level_role_config WHERE level_type = ? AND level = ?',
                     (level_type, level)
@@ -173,8 +172,7 @@ class RoleManager:
     async def get_level_role_rewards(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get all level role rewards for a guild"""
         try:
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT * FROM level_role_config ORDER BY level_type, level'
                 ) as cursor:
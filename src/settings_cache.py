@@ -0,0 +1,52 @@
+import copy
+import time
+from typing import Dict, Any, Optional, Tuple
+
+
+class SettingsCache:
+    """Per-guild read-through cache of server_settings rows, invalidated on every write"""
+
+    def __init__(self, refresh_seconds: float = 300.0):
+        # Entries older than this are re-read so other processes' writes show up; 0 keeps them until invalidated
+        self.refresh_seconds = refresh_seconds
+
+        # guild_id -> (monotonic load time, settings row or None when the guild has no row)
+        self._entries: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        # Bumped on every invalidation so a read that raced a write doesn't cache the old row
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, guild_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Return (found, settings); callers get their own copy to modify"""
+        entry = self._entries.get(guild_id)
+        if entry is None or (self.refresh_seconds and time.monotonic() - entry[0] >= self.refresh_seconds):
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        return True, copy.deepcopy(entry[1])
+
+    def put(self, guild_id: str, settings: Optional[Dict[str, Any]], generation: int):
+        """Cache a guild's settings read from the database while generation was current"""
+        if generation != self.generation:
+            return
+        self._entries[guild_id] = (time.monotonic(), copy.deepcopy(settings))
+
+    def invalidate(self, guild_id: str):
+        """Forget a guild's settings after a write"""
+        self._entries.pop(guild_id, None)
+        self.generation += 1
+
+    def clear(self):
+        """Forget every guild"""
+        self._entries.clear()
+        self.generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit/miss counters"""
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -2,7 +2,6 @@ import discord
 import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 import random
 
@@ -306,22 +305,8 @@ class ShopSystem:
         if not effect_type:
             return
         
-        # Calculate expiry time
-        expires_at = None
-        if item.get('duration_minutes'):
-            expires_at = datetime.now() + timedelta(minutes=item['duration_minutes'])
-        
-        # Add effect to database
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
-                await db.execute(
-                    """INSERT INTO active_effects 
-                       (user_id, effect_type, duration_minutes, uses_remaining, expires_at)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (user_id, effect_type, item.get('duration_minutes'), 
-                     item.get('uses'), expires_at.isoformat() if expires_at else None)
-                )
-                await db.commit()
+        # Tracked in memory by the effects engine and stored right away
+        await cooldown_manager.add_effect(user_id, effect_type, item.get('duration_minutes'), item.get('uses'))
     
     async def _open_mystery_box(self, user_id: str) -> Dict[str, Any]:
         """Open a mystery box and give random rewards"""
@@ -374,8 +359,7 @@ class ShopSystem:
     
     async def _remove_item_from_inventory(self, user_id: str, item_id: str, quantity: int) -> None:
         """Remove item from user inventory"""
-        import aiosqlite
-        async with aiosqlite.connect(database.db_path) as db:
+        async with database.write() as db:
                 # Get current quantity
                 async with db.execute(
                     'SELECT quantity FROM user_inventory WHERE user_id = ? AND item_id = ?',
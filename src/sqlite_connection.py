@@ -0,0 +1,104 @@
+import aiosqlite
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+import logging
+
+
+class SQLiteConnectionManager:
+    """Long-lived SQLite connections: one serialized writer plus a small read pool"""
+
+    def __init__(self, db_path: Path, read_connections: int = 3, busy_timeout_ms: int = 5000,
+                 cache_size_kb: int = 16000):
+        self.db_path = db_path
+        self.read_connections = max(1, read_connections)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._read_pool: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the connections have been opened"""
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open a single connection with the shared pragmas applied"""
+        db = await aiosqlite.connect(self.db_path)
+        db.row_factory = aiosqlite.Row
+        await db.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        await db.execute("PRAGMA journal_mode = WAL")
+        await db.execute("PRAGMA synchronous = NORMAL")
+        await db.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        await db.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            await db.execute("PRAGMA query_only = ON")
+        return db
+
+    async def open(self):
+        """Open the writer and the read pool (no-op if already open)"""
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+
+            # The writer goes first so WAL mode is set before readers attach
+            self._writer = await self._connect()
+            self._read_pool = asyncio.Queue()
+            for _ in range(self.read_connections):
+                reader = await self._connect(read_only=True)
+                self._readers.append(reader)
+                self._read_pool.put_nowait(reader)
+
+            logging.info(f"Opened SQLite connections for {self.db_path} (1 writer, {self.read_connections} readers)")
+
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a read-only connection from the pool"""
+        if self._writer is None:
+            await self.open()
+
+        db = await self._read_pool.get()
+        try:
+            yield db
+        finally:
+            self._read_pool.put_nowait(db)
+
+    @asynccontextmanager
+    async def write(self):
+        """Hold the writer for one transaction; commits on success, rolls back on error"""
+        if self._writer is None:
+            await self.open()
+
+        async with self._write_lock:
+            db = self._writer
+            try:
+                yield db
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+
+    async def close(self):
+        """Close every connection"""
+        async with self._open_lock:
+            if self._writer is None:
+                return
+
+            async with self._write_lock:
+                for reader in self._readers:
+                    await reader.close()
+                self._readers = []
+                self._read_pool = None
+
+                # Fold the WAL back into the main file on clean shutdown
+                try:
+                    await self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except Exception as e:
+                    logging.error(f"Error checkpointing SQLite WAL: {e}")
+                await self._writer.close()
+                self._writer = None
@@ -0,0 +1,30 @@
+import math
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ActivityTracker:
+    """Event rates per key as exponentially decaying counters: O(1) to record and read, no history kept"""
+
+    def __init__(self, half_life: float = 600.0):
+        self.decay = math.log(2) / half_life
+        # key -> (decayed count, when it was last decayed)
+        self._counts: Dict[Hashable, Tuple[float, float]] = {}
+
+    def record(self, key: Hashable, count: float = 1.0, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        value, updated = self._counts.get(key, (0.0, now))
+        self._counts[key] = (value * math.exp(-self.decay * (now - updated)) + count, now)
+
+    def rate(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Events per minute, weighted towards roughly the last half-life"""
+        entry = self._counts.get(key)
+        if entry is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        value, updated = entry
+        # A steady stream of r events per second settles at a count of r / decay
+        return value * math.exp(-self.decay * (now - updated)) * self.decay * 60
+
+    def forget(self, key: Hashable):
+        self._counts.pop(key, None)
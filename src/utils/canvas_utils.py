@@ -2,17 +2,37 @@ from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import requests
 import io
 import asyncio
-import aiohttp
+import hashlib
 from typing import Dict, Any, List, Tuple, Optional
 import logging
 import math
+from collections import OrderedDict
+import numpy as np
+
+from config import config
+from utils.image_fetcher import image_fetcher
+from utils.render_pool import RenderExecutor
 
 class CanvasUtils:
     """Canvas utility for creating introduction cards and other images"""
     
+    # Bump whenever a renderer's output changes so cached card images are re-rendered
+    renderer_version = 1
+    
+    # Most static layers, masks and fonts kept per template and size
+    max_layers = 64
+    
+    # Most decoded avatars and backgrounds kept per render process
+    max_decoded_images = 32
+    
     def __init__(self):
         self.width = 800
         self.height = 600
+        self._error_image: Optional[bytes] = None
+        
+        # Backgrounds, overlays, masks and fonts depend only on template, size and colors, so each is built once
+        self._layers: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self._decoded: 'OrderedDict[Tuple[str, bytes], Image.Image]' = OrderedDict()
         
         # Try to load default fonts
         self.fonts = self._load_fonts()
@@ -38,8 +58,13 @@ class CanvasUtils:
     
     async def create_member_identity_card(self, user, card_data: Dict[str, Any]) -> bytes:
         """Create a Member Identity Card similar to the reference design"""
+        image, _ = await self._render('member_identity_card', user, card_data)
+        return image
+    
+    def _render_member_identity_card(self, spec: Dict[str, Any]) -> bytes:
+        """Draw a Member Identity Card from a render spec"""
         try:
-            from database import database
+            card_data = spec['card_data']
             
             # Card dimensions - wider format like the reference
             card_width = 850
@@ -62,12 +87,11 @@ class CanvasUtils:
             card_content_width = card_width - (card_margin * 2)
             card_content_height = card_height - card_content_y - card_margin - 60  # Leave space for footer
             
-            # Create rounded rectangle for main content
-            content_bg = Image.new('RGBA', (card_content_width, card_content_height), color=(255, 255, 255, 250))
-            content_bg = self._add_rounded_corners(content_bg, 15)
-            
-            # Add subtle shadow
-            shadow = content_bg.filter(ImageFilter.GaussianBlur(radius=3))
+            # Rounded rectangle for main content with a subtle shadow
+            content_bg, shadow = self._cached_layer(
+                ('member_identity_card', 'content', card_content_width, card_content_height),
+                lambda: self._build_panel(card_content_width, card_content_height, (255, 255, 255, 250), 15, 3)
+            )
             img.paste(shadow, (card_content_x + 2, card_content_y + 3), shadow)
             img.paste(content_bg, (card_content_x, card_content_y), content_bg)
             
@@ -89,19 +113,20 @@ class CanvasUtils:
             avatar_y = card_content_y + 30
             
             # Get and draw user avatar
-            avatar = await self._get_user_avatar(user)
+            avatar = self._open_image(spec['avatar'])
             if avatar:
                 # Create rounded rectangle mask for avatar
-                avatar_bg = Image.new('RGBA', (avatar_size + 10, avatar_size + 10), (255, 255, 255, 255))
-                avatar_bg = self._add_rounded_corners(avatar_bg, 10)
+                avatar_bg = self._cached_layer(
+                    ('member_identity_card', 'avatar_frame', avatar_size),
+                    lambda: self._add_rounded_corners(
+                        Image.new('RGBA', (avatar_size + 10, avatar_size + 10), (255, 255, 255, 255)), 10
+                    )
+                )
                 img.paste(avatar_bg, (avatar_x - 5, avatar_y - 5), avatar_bg)
                 
                 # Resize and crop avatar to square
                 avatar = avatar.resize((avatar_size, avatar_size))
-                avatar_mask = Image.new('L', (avatar_size, avatar_size), 0)
-                avatar_mask_draw = ImageDraw.Draw(avatar_mask)
-                avatar_mask_draw.rounded_rectangle((0, 0, avatar_size, avatar_size), radius=8, fill=255)
-                avatar.putalpha(avatar_mask)
+                avatar.putalpha(self._rounded_mask((avatar_size, avatar_size), 8))
                 img.paste(avatar, (avatar_x, avatar_y), avatar)
             else:
                 # Fallback: draw rounded rectangle with initials
@@ -145,7 +170,7 @@ class CanvasUtils:
             draw.text((card_margin + 20, footer_y), brand_text, fill='white', font=brand_font)
             
             # ID and barcode section
-            id_number = f"{user.id % 1000000000000000:015d}"  # Generate a 15-digit ID from user ID
+            id_number = f"{spec['user_id'] % 1000000000000000:015d}"  # Generate a 15-digit ID from user ID
             self._draw_id_section(draw, id_number, card_width, footer_y)
             
             # Convert to bytes
@@ -163,33 +188,85 @@ class CanvasUtils:
         top_color = (255, 140, 60)     # Light orange
         bottom_color = (255, 100, 20)  # Darker orange
         
-        # Create vertical gradient
-        for y in range(height):
-            ratio = y / height
-            r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
-            g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
-            b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+        gradient = self._cached_layer(('vertical_gradient', width, height, top_color, bottom_color),
+                                      lambda: self._vertical_gradient(top_color, bottom_color, width, height))
+        img.paste(gradient, (0, 0))
     
     def _add_dotted_pattern(self, img: Image.Image, draw: ImageDraw.Draw, width: int, height: int):
         """Add dotted pattern overlay like the reference"""
-        pattern_overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        pattern_draw = ImageDraw.Draw(pattern_overlay)
+        pattern_overlay = self._cached_layer(
+            ('dotted_pattern', width, height),
+            lambda: self._dot_grid_layer(width, height, 20, 'ellipse', 2, (255, 255, 255, 80))
+        )
+        img.paste(pattern_overlay, (0, 0), pattern_overlay)
+    
+    def _cached_layer(self, key: Tuple, build) -> Any:
+        """Return a static layer, building it on first use; callers must not draw on it"""
+        layer = self._layers.get(key)
+        if layer is not None:
+            self._layers.move_to_end(key)
+            return layer
+        layer = self._layers[key] = build()
+        if len(self._layers) > self.max_layers:
+            self._layers.popitem(last=False)
+        return layer
+    
+    def _build_panel(self, width: int, height: int, fill: Tuple[int, int, int, int], radius: int,
+                     shadow_blur: int) -> Tuple[Image.Image, Image.Image]:
+        """Rounded content panel and its blurred drop shadow"""
+        panel = self._add_rounded_corners(Image.new('RGBA', (width, height), color=fill), radius)
+        return panel, panel.filter(ImageFilter.GaussianBlur(radius=shadow_blur))
+    
+    def _rounded_mask(self, size: Tuple[int, int], radius: int) -> Image.Image:
+        """Rounded rectangle mask covering the whole size"""
+        def build() -> Image.Image:
+            mask = Image.new('L', size, 0)
+            ImageDraw.Draw(mask).rounded_rectangle((0, 0) + size, radius=radius, fill=255)
+            return mask
         
-        dot_spacing = 20
-        dot_size = 2
+        return self._cached_layer(('rounded_mask', size, radius), build)
+    
+    def _circle_mask(self, size: int) -> Image.Image:
+        """Circular mask for a square avatar"""
+        def build() -> Image.Image:
+            mask = Image.new('L', (size, size), 0)
+            ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+            return mask
         
-        for x in range(0, width, dot_spacing):
-            for y in range(0, height, dot_spacing):
-                pattern_draw.ellipse(
-                    (x, y, x + dot_size, y + dot_size),
-                    fill=(255, 255, 255, 80)
-                )
+        return self._cached_layer(('circle_mask', size), build)
+    
+    def _vertical_gradient(self, top_color: Tuple[int, int, int], bottom_color: Tuple[int, int, int],
+                           width: int, height: int) -> Image.Image:
+        """Top-to-bottom linear gradient, one color per row"""
+        ratio = (np.arange(height) / height)[:, None]
+        rows = np.array(top_color) * (1 - ratio) + np.array(bottom_color) * ratio
+        return self._rows_to_image(rows, width)
+    
+    def _rows_to_image(self, rows: np.ndarray, width: int) -> Image.Image:
+        """Stretch one RGB value per row across the full width"""
+        rows = np.clip(rows.astype(np.int64), 0, 255).astype(np.uint8)
+        return Image.fromarray(np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (len(rows), width, 3))), 'RGB')
+    
+    def _dot_grid_layer(self, width: int, height: int, spacing: int, shape: str, size: int,
+                        fill: Tuple[int, int, int, int]) -> Image.Image:
+        """Transparent layer with the same small shape stamped every `spacing` pixels"""
+        # Rasterize one shape with Pillow so the stamp matches what drawing it directly gives
+        stamp = Image.new('L', (size + 1, size + 1), 0)
+        getattr(ImageDraw.Draw(stamp), shape)((0, 0, size, size), fill=255)
         
-        img.paste(pattern_overlay, (0, 0), pattern_overlay)
+        covered = np.zeros((height, width), dtype=bool)
+        for dy, dx in zip(*np.nonzero(np.asarray(stamp))):
+            covered[dy::spacing, dx::spacing] = True
+        
+        layer = np.zeros((height, width, 4), dtype=np.uint8)
+        layer[covered] = fill
+        return Image.fromarray(layer, 'RGBA')
     
     def _get_font(self, style: str, size: int) -> ImageFont.FreeTypeFont:
         """Get font with specific style and size"""
+        return self._cached_layer(('font', style, size), lambda: self._load_font(style, size))
+    
+    def _load_font(self, style: str, size: int) -> ImageFont.FreeTypeFont:
         try:
             if style == 'title':
                 return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", size)
@@ -259,35 +336,42 @@ class CanvasUtils:
 
     async def create_introduction_card(self, user, card_data: Dict[str, Any]) -> bytes:
         """Create an introduction card image"""
+        from database import database
+        
+        # Check if custom background is set
+        guild_id = card_data.get('guild_id')
+        custom_bg_url = None
+        
+        if guild_id:
+            try:
+                server_settings = await database.get_server_settings(guild_id)
+                if server_settings:
+                    custom_bg_url = server_settings.get('intro_card_background_url')
+            except Exception as e:
+                logging.warning(f"Could not load server settings for intro card: {e}")
+        
+        image, _ = await self._render('introduction_card', user, card_data, background_url=custom_bg_url)
+        return image
+    
+    def _render_introduction_card(self, spec: Dict[str, Any]) -> bytes:
+        """Draw an introduction card from a render spec"""
         try:
-            from database import database
+            card_data = spec['card_data']
             
             # Create base image
             img = Image.new('RGB', (self.width, self.height), color='white')
             draw = ImageDraw.Draw(img)
             
-            # Check if custom background is set
-            guild_id = card_data.get('guild_id')
-            custom_bg_url = None
-            
-            if guild_id:
-                server_settings = await database.get_server_settings(guild_id)
-                if server_settings:
-                    custom_bg_url = server_settings.get('intro_card_background_url')
-            
             # Use custom background if available, otherwise use gradient
-            if custom_bg_url:
+            background = None
+            if spec['background']:
                 try:
-                    background = await self._create_custom_background(custom_bg_url)
-                    img.paste(background, (0, 0))
+                    background = self._create_custom_background(spec['background'])
                 except Exception as e:
                     logging.warning(f"Failed to load custom background, using default: {e}")
-                    # Fallback to gradient
-                    background = self._create_gradient_background('#7C3AED')
-                    img.paste(background, (0, 0))
-                    # Add pattern overlay for gradient
-                    pattern_overlay = self._create_pattern_overlay()
-                    img.paste(pattern_overlay, (0, 0), pattern_overlay)
+            
+            if background is not None:
+                img.paste(background, (0, 0))
             else:
                 # Create gradient background (default)
                 background = self._create_gradient_background('#7C3AED')
@@ -301,31 +385,25 @@ class CanvasUtils:
             content_width = self.width - 100
             content_height = self.height - 100
             
-            # Create rounded rectangle for content background
-            content_bg = Image.new('RGBA', (content_width, content_height), color=(255, 255, 255, 240))
-            content_bg = self._add_rounded_corners(content_bg, 20)
-            
-            # Add shadow effect
-            shadow = content_bg.filter(ImageFilter.GaussianBlur(radius=5))
+            # Rounded rectangle for content background with a shadow
+            content_bg, shadow = self._cached_layer(
+                ('introduction_card', 'content', content_width, content_height),
+                lambda: self._build_panel(content_width, content_height, (255, 255, 255, 240), 20, 5)
+            )
             img.paste(shadow, (content_x + 5, content_y + 10), shadow)
             img.paste(content_bg, (content_x, content_y), content_bg)
             
             # Get user avatar
-            avatar = await self._get_user_avatar(user)
+            avatar = self._open_image(spec['avatar'])
             
             # Draw avatar
             avatar_size = 120
             avatar_x, avatar_y = content_x + 40, content_y + 40
             
             if avatar:
-                # Create circular mask for avatar
-                mask = Image.new('L', (avatar_size, avatar_size), 0)
-                mask_draw = ImageDraw.Draw(mask)
-                mask_draw.ellipse((0, 0, avatar_size, avatar_size), fill=255)
-                
-                # Resize and apply mask
+                # Resize and apply circular mask
                 avatar = avatar.resize((avatar_size, avatar_size))
-                avatar.putalpha(mask)
+                avatar.putalpha(self._circle_mask(avatar_size))
                 img.paste(avatar, (avatar_x, avatar_y), avatar)
             else:
                 # Fallback: draw colored circle with initials
@@ -336,7 +414,7 @@ class CanvasUtils:
                 
                 # Draw initials
                 initials = ''.join([n[0] for n in card_data.get('name', 'U').split()]).upper()
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36) if self.fonts else ImageFont.load_default()
+                font = self._get_font('bold', 36)
                 bbox = draw.textbbox((0, 0), initials, font=font)
                 text_width = bbox[2] - bbox[0]
                 text_height = bbox[3] - bbox[1]
@@ -412,38 +490,62 @@ class CanvasUtils:
             # Return a simple error image
             return self._create_error_image()
     
-    async def _get_user_avatar(self, user) -> Optional[Image.Image]:
-        """Download and return user avatar"""
+    async def _render(self, kind: str, user, card_data: Dict[str, Any],
+                      background_url: Optional[str] = None) -> Tuple[bytes, bool]:
+        """Download a card's images here, then draw it in the render pool.
+
+        Returns the image and whether it is complete, i.e. not an error image and not drawn with a
+        placeholder for an avatar or background that failed to download.
+        """
         try:
-            avatar_url = user.display_avatar.url
-            async with aiohttp.ClientSession() as session:
-                async with session.get(avatar_url) as response:
-                    if response.status == 200:
-                        avatar_data = await response.read()
-                        return Image.open(io.BytesIO(avatar_data)).convert('RGBA')
+            spec = {
+                'user_id': user.id,
+                'card_data': dict(card_data),
+                'avatar': await self._download_image(str(user.display_avatar.url)),
+                'background': await self._download_image(background_url) if background_url else None
+            }
+            image = await render_executor.run(render_card, kind, spec)
+            downloaded = spec['avatar'] is not None and (not background_url or spec['background'] is not None)
+            return image, downloaded and not self.is_error_image(image)
         except Exception as e:
-            logging.warning(f"Could not load user avatar: {e}")
+            logging.error(f"Error rendering {kind}: {e!r}")
+            return self._create_error_image(), False
+    
+    async def _download_image(self, url: str) -> Optional[bytes]:
+        """Download raw image bytes; decoding happens in the render pool"""
+        return await image_fetcher.fetch(url)
+    
+    def _decoded_image(self, kind: str, data: bytes, build) -> Image.Image:
+        """Decode image bytes once per content, keeping recent results in an LRU"""
+        key = (kind, hashlib.sha256(data).digest())
+        image = self._decoded.get(key)
+        if image is not None:
+            self._decoded.move_to_end(key)
+            return image
+        image = self._decoded[key] = build()
+        if len(self._decoded) > self.max_decoded_images:
+            self._decoded.popitem(last=False)
+        return image
+    
+    def _open_image(self, data: Optional[bytes]) -> Optional[Image.Image]:
+        """Decode downloaded image bytes"""
+        if not data:
+            return None
+        try:
+            return self._decoded_image('image', data, lambda: Image.open(io.BytesIO(data)).convert('RGBA')).copy()
+        except Exception as e:
+            logging.warning(f"Could not decode image: {e}")
         return None
     
     def _create_gradient_background(self, color: str) -> Image.Image:
         """Create a gradient background"""
         # Create gradient from color to darker version
         base_color = self._hex_to_rgb(color)
-        dark_color = self._darken_color(color, 0.3)
-        dark_rgb = self._hex_to_rgb(dark_color)
-        
-        gradient = Image.new('RGB', (self.width, self.height))
-        draw = ImageDraw.Draw(gradient)
-        
-        # Create vertical gradient
-        for y in range(self.height):
-            ratio = y / self.height
-            r = int(base_color[0] * (1 - ratio) + dark_rgb[0] * ratio)
-            g = int(base_color[1] * (1 - ratio) + dark_rgb[1] * ratio)
-            b = int(base_color[2] * (1 - ratio) + dark_rgb[2] * ratio)
-            draw.line([(0, y), (self.width, y)], fill=(r, g, b))
+        dark_rgb = self._hex_to_rgb(self._darken_color(color, 0.3))
         
-        return gradient
+        gradient = self._cached_layer(('vertical_gradient', self.width, self.height, base_color, dark_rgb),
+                                      lambda: self._vertical_gradient(base_color, dark_rgb, self.width, self.height))
+        return gradient.copy()
     
     def _create_solid_background(self, color: str) -> Image.Image:
         """Create a solid color background"""
@@ -453,16 +555,24 @@ class CanvasUtils:
     def _create_pattern_background(self, color: str) -> Image.Image:
         """Create a geometric pattern background"""
         base_color = self._hex_to_rgb(color)
-        dark_color = self._darken_color(color, 0.2)
-        dark_rgb = self._hex_to_rgb(dark_color)
+        dark_rgb = self._hex_to_rgb(self._darken_color(color, 0.2))
         
-        pattern = Image.new('RGB', (self.width, self.height), base_color)
-        draw = ImageDraw.Draw(pattern)
+        def build() -> Image.Image:
+            shapes = self._geometric_pattern_mask(self.width, self.height)
+            return Image.fromarray(np.where(shapes[..., None], np.array(dark_rgb, dtype=np.uint8),
+                                            np.array(base_color, dtype=np.uint8)), 'RGB')
+        
+        return self._cached_layer(('pattern_background', self.width, self.height, base_color, dark_rgb), build).copy()
+    
+    def _geometric_pattern_mask(self, width: int, height: int) -> np.ndarray:
+        """Where the alternating diamonds and circles of the pattern background fall"""
+        mask = Image.new('L', (width, height), 0)
+        draw = ImageDraw.Draw(mask)
         
         # Create geometric pattern
         pattern_size = 40
-        for x in range(0, self.width, pattern_size):
-            for y in range(0, self.height, pattern_size):
+        for x in range(0, width, pattern_size):
+            for y in range(0, height, pattern_size):
                 # Alternate between shapes
                 if (x // pattern_size + y // pattern_size) % 2 == 0:
                     # Diamond shape
@@ -472,56 +582,47 @@ class CanvasUtils:
                         (x + pattern_size // 2, y + pattern_size),
                         (x, y + pattern_size // 2)
                     ]
-                    draw.polygon(points, fill=dark_rgb)
+                    draw.polygon(points, fill=255)
                 else:
                     # Circle
                     margin = pattern_size // 4
                     draw.ellipse(
                         (x + margin, y + margin, x + pattern_size - margin, y + pattern_size - margin),
-                        fill=dark_rgb
+                        fill=255
                     )
         
-        return pattern
+        return np.asarray(mask) > 0
     
-    async def _create_custom_background(self, image_url: str) -> Image.Image:
-        """Create background from custom image URL"""
-        try:
-            # Download image
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        
-                        # Open and process image
-                        bg_image = Image.open(io.BytesIO(image_data)).convert('RGBA')
-                        
-                        # Resize to fit card dimensions while maintaining aspect ratio
-                        bg_image = self._resize_background_image(bg_image)
-                        
-                        # Create final background
-                        background = Image.new('RGB', (self.width, self.height), color='white')
-                        
-                        # Center the background image
-                        bg_width, bg_height = bg_image.size
-                        x = (self.width - bg_width) // 2
-                        y = (self.height - bg_height) // 2
-                        
-                        # Paste background image
-                        if bg_image.mode == 'RGBA':
-                            background.paste(bg_image, (x, y), bg_image)
-                        else:
-                            background.paste(bg_image, (x, y))
-                        
-                        # Add slight overlay to ensure text readability
-                        overlay = Image.new('RGBA', (self.width, self.height), (0, 0, 0, 30))
-                        background.paste(overlay, (0, 0), overlay)
-                        
-                        return background
-                    else:
-                        raise Exception(f"HTTP {response.status}")
-        except Exception as e:
-            logging.error(f"Error loading custom background: {e}")
-            raise
+    def _create_custom_background(self, image_data: bytes) -> Image.Image:
+        """Create background from downloaded custom image bytes"""
+        return self._decoded_image('background', image_data, lambda: self._build_custom_background(image_data))
+    
+    def _build_custom_background(self, image_data: bytes) -> Image.Image:
+        # Open and process image
+        bg_image = Image.open(io.BytesIO(image_data)).convert('RGBA')
+        
+        # Resize to fit card dimensions while maintaining aspect ratio
+        bg_image = self._resize_background_image(bg_image)
+        
+        # Create final background
+        background = Image.new('RGB', (self.width, self.height), color='white')
+        
+        # Center the background image
+        bg_width, bg_height = bg_image.size
+        x = (self.width - bg_width) // 2
+        y = (self.height - bg_height) // 2
+        
+        # Paste background image
+        if bg_image.mode == 'RGBA':
+            background.paste(bg_image, (x, y), bg_image)
+        else:
+            background.paste(bg_image, (x, y))
+        
+        # Add slight overlay to ensure text readability
+        overlay = Image.new('RGBA', (self.width, self.height), (0, 0, 0, 30))
+        background.paste(overlay, (0, 0), overlay)
+        
+        return background
     
     def _resize_background_image(self, image: Image.Image) -> Image.Image:
         """Resize background image to fit card dimensions"""
@@ -552,27 +653,17 @@ class CanvasUtils:
     
     def _create_pattern_overlay(self) -> Image.Image:
         """Create a subtle pattern overlay"""
-        pattern = Image.new('RGBA', (self.width, self.height), color=(0, 0, 0, 0))
-        draw = ImageDraw.Draw(pattern)
-        
-        pattern_size = 20
-        for x in range(0, self.width, pattern_size):
-            for y in range(0, self.height, pattern_size):
-                draw.rectangle((x, y, x + 2, y + 2), fill=(255, 255, 255, 25))
-        
-        return pattern
+        return self._cached_layer(
+            ('pattern_overlay', self.width, self.height),
+            lambda: self._dot_grid_layer(self.width, self.height, 20, 'rectangle', 2, (255, 255, 255, 25))
+        ).copy()
     
     def _add_rounded_corners(self, img: Image.Image, radius: int) -> Image.Image:
         """Add rounded corners to an image"""
-        # Create a mask with rounded corners
-        mask = Image.new('L', img.size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.rounded_rectangle((0, 0) + img.size, radius=radius, fill=255)
-        
-        # Apply the mask
+        # Apply a mask with rounded corners
         result = Image.new('RGBA', img.size, (0, 0, 0, 0))
         result.paste(img, (0, 0))
-        result.putalpha(mask)
+        result.putalpha(self._rounded_mask(img.size, radius))
         
         return result
     
@@ -634,11 +725,26 @@ class CanvasUtils:
         img_bytes = io.BytesIO()
         img.save(img_bytes, format='PNG')
         return img_bytes.getvalue()
+    
+    def is_error_image(self, image: bytes) -> bool:
+        """Whether a render failed and produced the error placeholder"""
+        if self._error_image is None:
+            self._error_image = self._create_error_image()
+        return image == self._error_image
 
     async def create_y2k_identity_card(self, user, card_data: Dict[str, Any]) -> bytes:
         """Create a Wonder member card with Y2K aesthetic, chrome effects and purple theme"""
+        image, _ = await self.render_y2k_identity_card(user, card_data)
+        return image
+
+    async def render_y2k_identity_card(self, user, card_data: Dict[str, Any]) -> Tuple[bytes, bool]:
+        """Create a Wonder member card, along with whether it is complete enough to cache"""
+        return await self._render('y2k_identity_card', user, card_data)
+    
+    def _render_y2k_identity_card(self, spec: Dict[str, Any]) -> bytes:
+        """Draw a Wonder member card from a render spec"""
         try:
-            from database import database
+            card_data = spec['card_data']
             
             # Card dimensions
             card_width = 850
@@ -666,13 +772,17 @@ class CanvasUtils:
             self._create_chrome_border(draw, card_margin, card_content_y - 5, 
                                      card_width - card_margin * 2, card_content_height + 10)
             
-            # Create glass-like content background
-            content_bg = Image.new('RGBA', (card_content_width, card_content_height), color=(40, 20, 80, 200))
-            content_bg = self._add_rounded_corners(content_bg, 12)
+            # Glass-like content background with a holographic overlay
+            def build_content() -> Image.Image:
+                panel = Image.new('RGBA', (card_content_width, card_content_height), color=(40, 20, 80, 200))
+                panel = self._add_rounded_corners(panel, 12)
+                holo_overlay = self._create_holographic_overlay(card_content_width, card_content_height)
+                panel.paste(holo_overlay, (0, 0), holo_overlay)
+                return panel
             
-            # Add holographic overlay to content area
-            holo_overlay = self._create_holographic_overlay(card_content_width, card_content_height)
-            content_bg.paste(holo_overlay, (0, 0), holo_overlay)
+            content_bg = self._cached_layer(
+                ('y2k_identity_card', 'content', card_content_width, card_content_height), build_content
+            )
             
             # Apply content background
             img.paste(content_bg, (card_content_x, card_content_y), content_bg)
@@ -697,7 +807,7 @@ class CanvasUtils:
             self._draw_chrome_frame(draw, avatar_x - 5, avatar_y - 5, avatar_size + 10, avatar_size + 10)
             
             # Get and draw user avatar
-            avatar = await self._get_user_avatar(user)
+            avatar = self._open_image(spec['avatar'])
             if avatar:
                 # Create hexagonal mask for Y2K aesthetic
                 avatar_mask = self._create_hexagonal_mask(avatar_size, avatar_size)
@@ -739,7 +849,7 @@ class CanvasUtils:
             self._add_y2k_decorations(draw, card_width, card_height)
             
             # Holographic ID section
-            id_number = f"{user.id % 1000000000000000:015d}"
+            id_number = f"{spec['user_id'] % 1000000000000000:015d}"
             self._draw_y2k_id_section(draw, id_number, card_width, footer_y)
             
             # Final holographic overlay
@@ -757,71 +867,40 @@ class CanvasUtils:
     
     def _create_y2k_holographic_background(self, img: Image.Image, draw: ImageDraw.Draw, width: int, height: int):
         """Create Y2K holographic gradient background"""
-        # Y2K purple/pink gradient with chrome accents
-        colors = [
-            (120, 50, 200),   # Deep purple
-            (180, 70, 255),   # Bright purple
-            (220, 120, 255),  # Light purple
-            (255, 150, 220),  # Pink
-            (150, 100, 255),  # Blue-purple
-            (100, 60, 180)    # Dark purple
-        ]
-        
-        # Create complex gradient
-        for y in range(height):
-            for x in range(width):
-                # Create wave-like color transitions
-                wave1 = math.sin(x * 0.01) * 0.3
-                wave2 = math.cos(y * 0.015) * 0.3
-                combined_wave = (wave1 + wave2 + 1) / 2
-                
-                # Select color based on position and waves
-                color_index = int(combined_wave * (len(colors) - 1))
-                color_index = max(0, min(color_index, len(colors) - 1))
-                
-                # Add some variation
-                base_color = colors[color_index]
-                variation = int(math.sin(x * 0.02 + y * 0.02) * 15)
-                
-                r = max(0, min(255, base_color[0] + variation))
-                g = max(0, min(255, base_color[1] + variation))
-                b = max(0, min(255, base_color[2] + variation))
-                
-                # Set pixel (for performance, we'll use lines instead)
-                if x == 0:  # Only draw vertical lines for performance
-                    draw.line([(x, y), (x, y)], fill=(r, g, b))
-        
-        # Simplified approach for better performance
-        for y in range(height):
+        def build() -> Image.Image:
+            y = np.arange(height)
             ratio1 = y / height
-            ratio2 = math.sin(y * 0.02) * 0.3 + 0.5
+            ratio2 = np.sin(y * 0.02) * 0.3 + 0.5
             
             # Blend between purple tones
-            r = int(120 + (180 - 120) * ratio1 + 30 * ratio2)
-            g = int(50 + (120 - 50) * ratio1 + 20 * ratio2)
-            b = int(200 + (255 - 200) * ratio1 + 15 * ratio2)
-            
-            r = max(0, min(255, r))
-            g = max(0, min(255, g))
-            b = max(0, min(255, b))
-            
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+            rows = np.stack([
+                120 + (180 - 120) * ratio1 + 30 * ratio2,
+                50 + (120 - 50) * ratio1 + 20 * ratio2,
+                200 + (255 - 200) * ratio1 + 15 * ratio2
+            ], axis=1)
+            return self._rows_to_image(rows, width)
+        
+        img.paste(self._cached_layer(('y2k_holographic', width, height), build), (0, 0))
     
     def _add_chrome_grid_pattern(self, img: Image.Image, draw: ImageDraw.Draw, width: int, height: int):
         """Add chrome grid pattern overlay"""
-        grid_overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        grid_draw = ImageDraw.Draw(grid_overlay)
-        
-        grid_size = 40
-        line_width = 1
-        
-        # Draw grid lines with chrome effect
-        for x in range(0, width, grid_size):
-            grid_draw.line([(x, 0), (x, height)], fill=(200, 200, 255, 30), width=line_width)
-        
-        for y in range(0, height, grid_size):
-            grid_draw.line([(0, y), (width, y)], fill=(200, 200, 255, 30), width=line_width)
+        def build() -> Image.Image:
+            grid_overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            grid_draw = ImageDraw.Draw(grid_overlay)
+            
+            grid_size = 40
+            line_width = 1
+            
+            # Draw grid lines with chrome effect
+            for x in range(0, width, grid_size):
+                grid_draw.line([(x, 0), (x, height)], fill=(200, 200, 255, 30), width=line_width)
+            
+            for y in range(0, height, grid_size):
+                grid_draw.line([(0, y), (width, y)], fill=(200, 200, 255, 30), width=line_width)
+            
+            return grid_overlay
         
+        grid_overlay = self._cached_layer(('chrome_grid', width, height), build)
         img.paste(grid_overlay, (0, 0), grid_overlay)
     
     def _create_chrome_border(self, draw: ImageDraw.Draw, x: int, y: int, width: int, height: int):
@@ -844,28 +923,31 @@ class CanvasUtils:
     
     def _create_holographic_overlay(self, width: int, height: int) -> Image.Image:
         """Create holographic rainbow overlay"""
-        overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
-        
-        # Create rainbow stripes
-        stripe_height = 3
-        colors = [
-            (255, 100, 255, 40),  # Magenta
-            (100, 200, 255, 40),  # Cyan
-            (255, 255, 100, 40),  # Yellow
-            (100, 255, 100, 40),  # Green
-        ]
-        
-        for y in range(0, height, stripe_height * len(colors)):
-            for i, color in enumerate(colors):
-                stripe_y = y + i * stripe_height
-                if stripe_y < height:
-                    overlay_draw.rectangle(
-                        (0, stripe_y, width, stripe_y + stripe_height),
-                        fill=color
-                    )
+        def build() -> Image.Image:
+            overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            overlay_draw = ImageDraw.Draw(overlay)
+            
+            # Create rainbow stripes
+            stripe_height = 3
+            colors = [
+                (255, 100, 255, 40),  # Magenta
+                (100, 200, 255, 40),  # Cyan
+                (255, 255, 100, 40),  # Yellow
+                (100, 255, 100, 40),  # Green
+            ]
+            
+            for y in range(0, height, stripe_height * len(colors)):
+                for i, color in enumerate(colors):
+                    stripe_y = y + i * stripe_height
+                    if stripe_y < height:
+                        overlay_draw.rectangle(
+                            (0, stripe_y, width, stripe_y + stripe_height),
+                            fill=color
+                        )
+            
+            return overlay
         
-        return overlay
+        return self._cached_layer(('holographic_overlay', width, height), build)
     
     def _draw_chrome_text(self, draw: ImageDraw.Draw, x: int, y: int, text: str, font: ImageFont.FreeTypeFont, size: str = 'medium'):
         """Draw text with chrome effect"""
@@ -878,22 +960,25 @@ class CanvasUtils:
     
     def _create_hexagonal_mask(self, width: int, height: int) -> Image.Image:
         """Create hexagonal mask for Y2K aesthetic"""
-        mask = Image.new('L', (width, height), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        
-        center_x, center_y = width // 2, height // 2
-        radius = min(width, height) // 2 - 5
-        
-        # Calculate hexagon points
-        points = []
-        for i in range(6):
-            angle = i * math.pi / 3
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            points.append((x, y))
+        def build() -> Image.Image:
+            mask = Image.new('L', (width, height), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            
+            center_x, center_y = width // 2, height // 2
+            radius = min(width, height) // 2 - 5
+            
+            # Calculate hexagon points
+            points = []
+            for i in range(6):
+                angle = i * math.pi / 3
+                x = center_x + radius * math.cos(angle)
+                y = center_y + radius * math.sin(angle)
+                points.append((x, y))
+            
+            mask_draw.polygon(points, fill=255)
+            return mask
         
-        mask_draw.polygon(points, fill=255)
-        return mask
+        return self._cached_layer(('hexagonal_mask', width, height), build)
     
     def _draw_hexagonal_avatar(self, draw: ImageDraw.Draw, x: int, y: int, size: int, name: str):
         """Draw hexagonal avatar fallback"""
@@ -1013,27 +1098,38 @@ class CanvasUtils:
     
     def _create_subtle_holographic_overlay(self, width: int, height: int) -> Image.Image:
         """Create subtle final holographic overlay"""
-        overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
+        def build() -> Image.Image:
+            overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            overlay_draw = ImageDraw.Draw(overlay)
+            
+            # Add subtle rainbow gradients in corners
+            gradient_size = 100
+            
+            # Top-left corner
+            for i in range(gradient_size):
+                alpha = int(30 * (1 - i / gradient_size))
+                color = (255, 200, 255, alpha)
+                overlay_draw.ellipse((0, 0, i*2, i*2), fill=color)
+            
+            # Bottom-right corner  
+            for i in range(gradient_size):
+                alpha = int(30 * (1 - i / gradient_size))
+                color = (200, 255, 255, alpha)
+                start_x = width - i*2
+                start_y = height - i*2
+                overlay_draw.ellipse((start_x, start_y, width, height), fill=color)
+            
+            return overlay
         
-        # Add subtle rainbow gradients in corners
-        gradient_size = 100
-        
-        # Top-left corner
-        for i in range(gradient_size):
-            alpha = int(30 * (1 - i / gradient_size))
-            color = (255, 200, 255, alpha)
-            overlay_draw.ellipse((0, 0, i*2, i*2), fill=color)
-        
-        # Bottom-right corner  
-        for i in range(gradient_size):
-            alpha = int(30 * (1 - i / gradient_size))
-            color = (200, 255, 255, alpha)
-            start_x = width - i*2
-            start_y = height - i*2
-            overlay_draw.ellipse((start_x, start_y, width, height), fill=color)
-        
-        return overlay
+        return self._cached_layer(('subtle_holographic_overlay', width, height), build)
 
 # Global canvas utils instance
-canvas_utils = CanvasUtils()
\ No newline at end of file
+canvas_utils = CanvasUtils()
+
+# Shared pool the card renderers draw in
+render_executor = RenderExecutor(**config.get('rendering', {}))
+
+
+def render_card(kind: str, spec: Dict[str, Any]) -> bytes:
+    """Render pool entry point: draw a card of the given kind from its spec"""
+    return getattr(canvas_utils, f"_render_{kind}")(spec)
\ No newline at end of file
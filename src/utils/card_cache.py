@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Card fields that can change how a card looks; counters and timestamps don't
+RENDERED_FIELDS = (
+    'name', 'age', 'gender', 'location', 'hobbies', 'favorite_color', 'bio', 'occupation',
+    'pronouns', 'timezone', 'fun_fact', 'social_media', 'card_template', 'background_style'
+)
+
+
+class CardImageCache:
+    """Rendered card PNGs keyed by a hash of everything drawn: an in-memory LRU in front of a directory"""
+
+    def __init__(self, directory: Optional[Path] = None, max_memory_bytes: int = 32 * 1024 * 1024):
+        # None keeps the cache in memory only
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+
+        # key -> (user_id, png), least recently used first
+        self._memory: 'OrderedDict[str, Tuple[str, bytes]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._keys_by_user: Dict[str, Set[str]] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user_id: str, card_data: Dict[str, Any], template: str, avatar_url: Optional[str],
+                 renderer_version: int) -> str:
+        """Hash of the card's drawn fields, template, avatar and renderer version"""
+        payload = {
+            'user_id': user_id,
+            'fields': {field: card_data.get(field) for field in RENDERED_FIELDS},
+            'template': template,
+            'avatar_url': avatar_url,
+            'renderer_version': renderer_version
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, user_id: str, key: str) -> Path:
+        # One directory per user so invalidating a card never scans everyone's files
+        return self.directory / user_id / f"{key}.png"
+
+    async def get(self, user_id: str, key: str) -> Optional[bytes]:
+        """Cached PNG for a key, or None"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return entry[1]
+
+        if self.directory is not None:
+            try:
+                image = await asyncio.to_thread(self._path(user_id, key).read_bytes)
+            except FileNotFoundError:
+                image = None
+            except Exception as e:
+                logging.error(f"Error reading cached card image: {e}")
+                image = None
+            if image is not None:
+                self._remember(user_id, key, image)
+                self.disk_hits += 1
+                return image
+
+        self.misses += 1
+        return None
+
+    async def put(self, user_id: str, key: str, image: bytes):
+        """Store a rendered PNG, replacing any older render of the same user's card"""
+        await self.invalidate(user_id, keep=key)
+        self._remember(user_id, key, image)
+        if self.directory is not None:
+            try:
+                await asyncio.to_thread(self._write, self._path(user_id, key), image)
+            except Exception as e:
+                logging.error(f"Error writing cached card image: {e}")
+
+    def _write(self, path: Path, image: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed so a reader never sees a partial file
+        partial = path.with_suffix('.tmp')
+        partial.write_bytes(image)
+        partial.replace(path)
+
+    def _remember(self, user_id: str, key: str, image: bytes):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = (user_id, image)
+        self._memory_bytes += len(image)
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            old_key, (old_user_id, old_image) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_image)
+            keys = self._keys_by_user.get(old_user_id)
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self._keys_by_user[old_user_id]
+
+    async def invalidate(self, user_id: str, keep: Optional[str] = None):
+        """Forget every cached render of a user's card (except `keep`)"""
+        for key in self._keys_by_user.pop(user_id, set()):
+            if key == keep:
+                self._keys_by_user.setdefault(user_id, set()).add(key)
+                continue
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_bytes -= len(entry[1])
+
+        if self.directory is not None:
+            try:
+                await asyncio.to_thread(self._remove_files, user_id, keep)
+            except Exception as e:
+                logging.error(f"Error removing cached card images: {e}")
+
+    def _remove_files(self, user_id: str, keep: Optional[str]):
+        user_directory = self.directory / user_id
+        if not user_directory.is_dir():
+            return
+        for path in user_directory.iterdir():
+            if path.stem != keep:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+
+# Global card image cache, stored next to the database
+card_image_cache = CardImageCache(Path(__file__).parent.parent.parent / 'cache' / 'intro_cards')
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Dict
+
+
+class CooldownTracker:
+    """Bounded per-key cooldowns on the monotonic clock that expire on their own"""
+
+    def __init__(self, cooldown_seconds: float, max_entries: int = 100000):
+        self.cooldown_seconds = cooldown_seconds
+        self.max_entries = max_entries
+
+        # key -> monotonic time of the last accepted use, oldest first.
+        # Every entry shares one cooldown, so the oldest entry always expires first.
+        self._last_used: "OrderedDict[int, float]" = OrderedDict()
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(*ids) -> int:
+        """Pack one or more Discord snowflakes into a single integer key"""
+        key = 0
+        for snowflake in ids:
+            key = (key << 64) | int(snowflake)
+        return key
+
+    def _expire(self, now: float):
+        """Drop entries whose cooldown has passed, oldest first"""
+        cutoff = now - self.cooldown_seconds
+        last_used = self._last_used
+        while last_used:
+            key, used_at = next(iter(last_used.items()))
+            if used_at > cutoff:
+                break
+            last_used.popitem(last=False)
+            self.expirations += 1
+
+    def remaining(self, key: int) -> float:
+        """Seconds left on a key's cooldown (0 if it is free)"""
+        used_at = self._last_used.get(key)
+        if used_at is None:
+            return 0.0
+        return max(0.0, self.cooldown_seconds - (time.monotonic() - used_at))
+
+    def try_acquire(self, key: int) -> bool:
+        """Start the cooldown for a key unless it is still running; returns whether it started"""
+        now = time.monotonic()
+        self._expire(now)
+
+        if key in self._last_used:
+            return False
+
+        self._last_used[key] = now
+        # Over capacity even after expiry: forget the oldest cooldowns
+        while len(self._last_used) > self.max_entries:
+            self._last_used.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def reset(self, key: int):
+        """Clear a key's cooldown"""
+        self._last_used.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._last_used)
+
+    def stats(self) -> Dict[str, int]:
+        """Size and eviction counters"""
+        return {
+            'size': len(self._last_used),
+            'max_entries': self.max_entries,
+            'expirations': self.expirations,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class DeadlineScheduler:
+    """Runs a callback for each key when its deadline passes, sleeping exactly until the next one"""
+
+    def __init__(self, callback: Callable[[Hashable], Awaitable[None]], name: str = "scheduler",
+                 max_sleep: float = 3600.0):
+        self.callback = callback
+        self.name = name
+        # Wake up at least this often so wall-clock jumps (e.g. after suspend) are noticed
+        self.max_sleep = max_sleep
+
+        # (deadline, tiebreak, key); rescheduled or cancelled keys leave stale entries that are skipped
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def schedule(self, key: Hashable, when: datetime):
+        """Run the callback for key at when (local time), replacing any earlier schedule for it"""
+        deadline = when.timestamp()
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+        if self._heap[0][2] == key:
+            # New earliest deadline: cut the current sleep short
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable):
+        """Forget a key's deadline; its heap entry is dropped when it reaches the top"""
+        self._deadlines.pop(key, None)
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """A key's pending deadline as a timestamp, or None if it has none"""
+        return self._deadlines.get(key)
+
+    def next_deadline(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop firing deadlines and let running callbacks finish, cancelling any still running after timeout"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._running:
+            _, unfinished = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                logging.warning(f"Cancelled {len(unfinished)} {self.name} callback(s) still running at shutdown")
+                await asyncio.gather(*unfinished, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            deadline = self.next_deadline()
+            delay = self.max_sleep if deadline is None else min(deadline - time.time(), self.max_sleep)
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            # Run each callback on its own so a slow one doesn't delay the next deadline
+            task = asyncio.create_task(self._fire(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key: Hashable):
+        try:
+            await self.callback(key)
+        except Exception as e:
+            logging.error(f"Error in {self.name} callback for {key}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
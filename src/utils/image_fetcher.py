@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+
+class CachedImage:
+    __slots__ = ('data', 'etag', 'checked')
+
+    def __init__(self, data: bytes, etag: Optional[str], checked: float):
+        self.data = data
+        self.etag = etag
+        # Wall-clock time the copy was last confirmed current, so disk entries survive restarts
+        self.checked = checked
+
+
+class ImageFetcher:
+    """Image downloads over one pooled HTTP session, cached by URL in memory and on disk.
+
+    Cached copies are served without a request until `revalidate_after` seconds have passed,
+    then revalidated with their ETag so an unchanged image costs a 304 instead of a download.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_memory_bytes: int = 16 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024, max_download_bytes: int = 8 * 1024 * 1024,
+                 timeout: float = 10.0, revalidate_after: float = 3600.0, max_connections: int = 20):
+        # None keeps the cache in memory only
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_download_bytes = max_download_bytes
+        self.timeout = timeout
+        self.revalidate_after = revalidate_after
+        self.max_connections = max_connections
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        # url -> cached image, least recently used first
+        self._memory: 'OrderedDict[str, CachedImage]' = OrderedDict()
+        self._memory_bytes = 0
+        # Concurrent requests for one URL share a single download
+        self._fetching: Dict[str, asyncio.Task] = {}
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self.failures = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """Image bytes for a URL, or None if it can't be downloaded"""
+        task = self._fetching.get(url)
+        if task is None:
+            task = self._fetching[url] = asyncio.create_task(self._fetch(url))
+            task.add_done_callback(lambda _: self._fetching.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str) -> Optional[bytes]:
+        cached = self._memory.get(url)
+        if cached is not None:
+            self._memory.move_to_end(url)
+            self.memory_hits += 1
+        elif self.directory is not None:
+            cached = await self._read_disk(url)
+            if cached is not None:
+                self._remember(url, cached)
+                self.disk_hits += 1
+
+        if cached is not None and time.time() - cached.checked < self.revalidate_after:
+            return cached.data
+
+        try:
+            headers = {'If-None-Match': cached.etag} if cached is not None and cached.etag else {}
+            async with self._get_session().get(url, headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    self.revalidated += 1
+                    cached.checked = time.time()
+                    await self._write_disk(url, cached, data_changed=False)
+                    return cached.data
+
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+                if response.content_length is not None and response.content_length > self.max_download_bytes:
+                    raise Exception(f"image is {response.content_length} bytes")
+
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > self.max_download_bytes:
+                        raise Exception(f"image is over {self.max_download_bytes} bytes")
+
+                self.downloads += 1
+                fresh = CachedImage(bytes(data), response.headers.get('ETag'), time.time())
+        except Exception as e:
+            self.failures += 1
+            logging.warning(f"Could not download image: {e}")
+            # A stale copy beats no image
+            return cached.data if cached is not None else None
+
+        self._remember(url, fresh)
+        await self._write_disk(url, fresh, data_changed=True)
+        return fresh.data
+
+    def _remember(self, url: str, image: CachedImage):
+        old = self._memory.pop(url, None)
+        if old is not None:
+            self._memory_bytes -= len(old.data)
+        self._memory[url] = image
+        self._memory_bytes += len(image.data)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.data)
+
+    def _paths(self, url: str):
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{name}.img", self.directory / f"{name}.json"
+
+    async def _read_disk(self, url: str) -> Optional[CachedImage]:
+        try:
+            return await asyncio.to_thread(self._load, url)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error reading cached image: {e}")
+            return None
+
+    def _load(self, url: str) -> CachedImage:
+        data_path, meta_path = self._paths(url)
+        meta = json.loads(meta_path.read_text())
+        if meta.get('url') != url:
+            raise FileNotFoundError(url)
+        return CachedImage(data_path.read_bytes(), meta.get('etag'), meta.get('checked', 0.0))
+
+    async def _write_disk(self, url: str, image: CachedImage, data_changed: bool):
+        if self.directory is None:
+            return
+        try:
+            await asyncio.to_thread(self._store, url, image, data_changed)
+        except Exception as e:
+            logging.error(f"Error writing cached image: {e}")
+
+    def _store(self, url: str, image: CachedImage, data_changed: bool):
+        data_path, meta_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed so a reader never sees a partial file
+        if data_changed:
+            partial = data_path.with_suffix('.tmp')
+            partial.write_bytes(image.data)
+            partial.replace(data_path)
+        partial = meta_path.with_suffix('.tmp')
+        partial.write_text(json.dumps({'url': url, 'etag': image.etag, 'checked': image.checked}))
+        partial.replace(meta_path)
+
+        if data_changed:
+            self._disk_writes += 1
+            if self._disk_writes % 100 == 0:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently written images once the directory is over its size limit"""
+        files = sorted(self.directory.glob('*.img'), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in files)
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            path.with_suffix('.json').unlink(missing_ok=True)
+
+    async def close(self):
+        """Close the HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'revalidated': self.revalidated,
+            'downloads': self.downloads,
+            'failures': self.failures
+        }
+
+
+# Global image fetcher, caching next to the rendered card images
+image_fetcher = ImageFetcher(Path(__file__).parent.parent.parent / 'cache' / 'images')
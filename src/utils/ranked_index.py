@@ -0,0 +1,164 @@
+import random
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class _Tail:
+    """Sentinel that sorts after every entry"""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+
+class _Node:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, levels: int):
+        self.value = value
+        self.next: List['_Node'] = [None] * levels
+        # Number of bottom-level steps each link skips, which is what makes positions O(log n)
+        self.width: List[int] = [1] * levels
+
+
+class RankedIndex:
+    """Scores kept in descending order in an indexable skip list: O(log n) updates, ranks and top-K"""
+
+    def __init__(self, max_levels: int = 24, seed: Optional[int] = None):
+        self.max_levels = max_levels
+        self._random = random.Random(seed)
+        self._tail = _Node(_Tail(), 0)
+        self._head = _Node(None, max_levels)
+        self._head.next = [self._tail] * max_levels
+        self._scores: Dict[Hashable, int] = {}
+
+    @staticmethod
+    def _entry(key: Hashable, score: int) -> Tuple:
+        # Highest score first; ties broken by key so every entry has one position
+        return (-score, key)
+
+    def _random_levels(self) -> int:
+        levels = 1
+        while levels < self.max_levels and self._random.random() < 0.5:
+            levels += 1
+        return levels
+
+    def _insert(self, value: Tuple):
+        chain = [None] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = self._random_levels()
+        new_node = _Node(value, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+
+    def _remove(self, value: Tuple):
+        chain = [None] * self.max_levels
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.max_levels):
+            chain[level].width[level] -= 1
+
+    def set(self, key: Hashable, score: int):
+        """Insert a key or move it to a new score"""
+        old_score = self._scores.get(key)
+        if old_score == score:
+            return
+        if old_score is not None:
+            self._remove(self._entry(key, old_score))
+        self._insert(self._entry(key, score))
+        self._scores[key] = score
+
+    def add(self, key: Hashable, delta: int) -> int:
+        """Add to a key's score (starting from 0) and return the new score"""
+        score = self._scores.get(key, 0) + delta
+        self.set(key, score)
+        return score
+
+    def remove(self, key: Hashable):
+        """Drop a key if present"""
+        score = self._scores.pop(key, None)
+        if score is not None:
+            self._remove(self._entry(key, score))
+
+    def clear(self):
+        self._head.next = [self._tail] * self.max_levels
+        self._head.width = [1] * self.max_levels
+        self._scores.clear()
+
+    def score(self, key: Hashable) -> Optional[int]:
+        return self._scores.get(key)
+
+    def rank(self, key: Hashable) -> Optional[int]:
+        """1-based position of a key (1 = highest score), or None if it isn't ranked"""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        value = self._entry(key, score)
+        position = 0
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].value < value:
+                position += node.width[level]
+                node = node.next[level]
+        return position + 1
+
+    def _node_at(self, index: int) -> _Node:
+        """Node at a 0-based position"""
+        remaining = index + 1
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[Hashable, int]]:
+        """(key, score) pairs for positions offset+1 .. offset+limit"""
+        if offset >= len(self._scores) or limit <= 0:
+            return []
+        node = self._node_at(offset)
+        entries = []
+        while len(entries) < limit and node is not self._tail:
+            entries.append((node.value[1], -node.value[0]))
+            node = node.next[0]
+        return entries
+
+    def around(self, key: Hashable, radius: int = 2) -> List[Tuple[int, Hashable, int]]:
+        """(position, key, score) for up to radius entries either side of a key, the key included"""
+        position = self.rank(key)
+        if position is None:
+            return []
+        start = max(0, position - 1 - radius)
+        entries = self.top(position - start + radius, start)
+        return [(start + offset, entry_key, score) for offset, (entry_key, score) in enumerate(entries, 1)]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._scores
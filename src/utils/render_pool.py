@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class RenderQueueFull(Exception):
+    """Raised when more renders are waiting than the queue allows"""
+
+
+class RenderExecutor:
+    """Runs CPU-bound image renders in worker processes so drawing never blocks the event loop.
+
+    Work must be a module-level function taking picklable arguments. Renders that overrun the
+    timeout have their workers terminated, since a running Pillow call can't be cancelled.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 15.0, max_queue: int = 16,
+                 use_processes: bool = True, start_method: str = 'spawn'):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_queue = max_queue
+        # Threads skip the process start-up cost but share the GIL with the bot
+        self.use_processes = use_processes
+        self.start_method = start_method
+
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        # Held while a render runs, so queued renders don't use up their timeout waiting for a worker
+        self._slots = asyncio.Semaphore(self.workers)
+
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.use_processes:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render')
+        return self._pool
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """Run function(*args) in the pool and return its result"""
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise RenderQueueFull(f"{self._pending} renders already pending")
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                pool = self._get_pool()
+                future = asyncio.get_running_loop().run_in_executor(pool, function, *args)
+                try:
+                    result = await asyncio.wait_for(future, timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    logging.warning(f"Render timed out after {self.timeout}s, restarting render workers")
+                    self._reset_pool(pool)
+                    raise
+                except BrokenProcessPool:
+                    self.failed += 1
+                    self._reset_pool(pool)
+                    raise
+                except Exception:
+                    self.failed += 1
+                    raise
+            self.completed += 1
+            return result
+        finally:
+            self._pending -= 1
+
+    def _reset_pool(self, pool: Executor):
+        """Replace a failed pool, unless another render already has"""
+        if self._pool is not pool:
+            return
+        self._pool = None
+        if isinstance(pool, ProcessPoolExecutor):
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def close(self):
+        """Cancel queued renders and stop the workers"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self._pending,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'rejected': self.rejected
+        }
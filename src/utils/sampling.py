@@ -0,0 +1,66 @@
+import heapq
+import math
+import random
+from typing import Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+
+
+def weighted_sample(items: Iterable[Tuple[T, float]], k: int, rng: Optional[random.Random] = None) -> List[T]:
+    """Pick k distinct items with probability proportional to weight, in draw order.
+
+    Efraimidis-Spirakis: each item gets the key log(u) / weight and the k largest keys win,
+    which is the same as drawing one at a time without replacement. O(n log k) time, O(k) memory.
+    """
+    rng = rng or random.Random()
+    if k <= 0:
+        return []
+
+    heap: List[Tuple[float, int, T]] = []
+    for index, (item, weight) in enumerate(items):
+        if weight <= 0:
+            continue
+        # 1 - random() is in (0, 1], so the log is always defined
+        key = math.log(1.0 - rng.random()) / weight
+        if len(heap) < k:
+            heapq.heappush(heap, (key, index, item))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, index, item))
+
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+class AliasSampler(Generic[T]):
+    """Constant-time draws from a fixed weighted distribution (Vose's alias method), built in O(n)"""
+
+    def __init__(self, items: Iterable[Tuple[T, float]]):
+        pairs = [(item, weight) for item, weight in items if weight > 0]
+        if not pairs:
+            raise ValueError("AliasSampler needs at least one item with a positive weight")
+
+        self.items: List[T] = [item for item, _ in pairs]
+        count = len(pairs)
+        total = sum(weight for _, weight in pairs)
+        # Scale so the average column holds exactly 1.0
+        scaled = [weight * count / total for _, weight in pairs]
+        self._probability = [1.0] * count
+        self._alias = list(range(count))
+
+        small = [index for index, share in enumerate(scaled) if share < 1.0]
+        large = [index for index, share in enumerate(scaled) if share >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probability[less] = scaled[less]
+            self._alias[less] = more
+            # The large item donates what filled the small column
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error
+
+    def sample(self, rng: Optional[random.Random] = None) -> T:
+        rng = rng or random
+        index = rng.randrange(len(self.items))
+        return self.items[index] if rng.random() < self._probability[index] else self.items[self._alias[index]]
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -4,10 +4,13 @@ import asyncio
 import random
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from database import database
 from config import config
+from utils.deadline_scheduler import DeadlineScheduler
+from utils.sampling import AliasSampler
+from utils.activity_tracker import ActivityTracker
 
 class DropCollectionView(discord.ui.View):
     """Button view for collecting WonderCoins drops"""
@@ -38,6 +41,10 @@ class WonderCoinsDropSystem:
         self.drop_channels = {}
         self.channel_settings = {}  # Advanced channel-specific settings
         self.active_drops = {}
+        # Ends each drop at its expiry time
+        self.expiry_scheduler = DeadlineScheduler(self._end_drop, name="drop expiry")
+        # Countdown edits in flight at once across all channels; each channel's edits go one at a time
+        self.max_concurrent_edits = 5
         
         # Enhanced rarity configuration
         self.rarity_config = {
@@ -107,16 +114,39 @@ class WonderCoinsDropSystem:
             }
         ]
         
+        # Weighted pickers, built once: rarity per channel, drop channel per guild
+        self._collection_sampler = AliasSampler(
+            (collection, collection['chance']) for collection in self.collection_types
+        )
+        self._rarity_samplers: Dict[str, AliasSampler] = {}
+        self._channel_samplers: Dict[str, AliasSampler] = {}
+        
+        # Each guild gets its next drop scheduled on its own, sooner the busier its chat is
+        self.activity = ActivityTracker(half_life=config.get('drops.activityHalfLife', 600))
+        self.drop_scheduler = DeadlineScheduler(self._run_guild_drop, name="drop scheduler")
+        self.min_interval = config.get('drops.minInterval', 1800)
+        self.max_interval = config.get('drops.maxInterval', 10800)
+        # Messages per minute at which a guild gets drops at the drawn base interval
+        self.reference_activity = config.get('drops.referenceActivity', 2.0)
+        # Below this many messages per minute a guild's drop is skipped rather than dropped into silence
+        self.min_activity = config.get('drops.minActivity', 0.1)
+        self.channel_min_interval = config.get('drops.channelMinInterval', 1200)
+        # A busier guild's drop is only brought forward when that saves at least this many seconds
+        self.reschedule_slack = config.get('drops.rescheduleSlack', 60)
+        # guild_id -> (when its next drop was drawn, the drawn base wait), so activity can rescale it
+        self._drop_plans: Dict[str, Tuple[datetime, float]] = {}
+        self.channel_last_drop: Dict[str, datetime] = {}
+        
         # Start the drop system
-        self.start_drop_system.start()
+        self._start_task = asyncio.create_task(self.start_drop_system())
         # Start the countdown updater
         self.update_drop_countdowns.start()
+        self.expiry_scheduler.start()
     
     async def initialize_drop_channels(self):
         """Load drop channels and their settings from database"""
         try:
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 async with db.execute('SELECT * FROM drop_channels') as cursor:
                     channels = await cursor.fetchall()
             
@@ -137,6 +167,9 @@ class WonderCoinsDropSystem:
                     'drop_frequency_modifier': 1.0,
                     'special_events': False
                 }
+            
+            self._rarity_samplers.clear()
+            self._channel_samplers.clear()
                 
         except Exception as e:
             logging.error(f"Error initializing drop channels: {e}")
@@ -146,7 +179,7 @@ class WonderCoinsDropSystem:
         """Add a channel with advanced configuration options"""
         try:
             # Check if channel already exists
-            async with await database._get_connection() as db:
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT id FROM drop_channels WHERE guild_id = ? AND channel_id = ?',
                     (guild_id, channel_id)
@@ -158,7 +191,7 @@ class WonderCoinsDropSystem:
             
             # Add to database with settings
             settings_json = str(settings) if settings else "{}"
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                 await db.execute(
                     'INSERT INTO drop_channels (guild_id, channel_id, created_by, settings) VALUES (?, ?, ?, ?)',
                     (guild_id, channel_id, created_by, settings_json)
@@ -183,6 +216,9 @@ class WonderCoinsDropSystem:
                 default_settings.update(settings)
             
             self.channel_settings[f"{guild_id}_{channel_id}"] = default_settings
+            self._invalidate_samplers(guild_id, f"{guild_id}_{channel_id}")
+            if guild_id not in self.drop_scheduler:
+                self._schedule_next_drop(guild_id)
             
             return {"success": True, "message": "Channel added to drop system with advanced settings!"}
             
@@ -205,10 +241,11 @@ class WonderCoinsDropSystem:
                 self.channel_settings[channel_key] = {}
             
             self.channel_settings[channel_key].update(settings)
+            self._invalidate_samplers(guild_id, channel_key)
             
             # Save to database
             settings_json = str(self.channel_settings[channel_key])
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                 await db.execute(
                     'UPDATE drop_channels SET settings = ? WHERE guild_id = ? AND channel_id = ?',
                     (settings_json, guild_id, channel_id)
@@ -229,7 +266,7 @@ class WonderCoinsDropSystem:
         """Remove a channel from the drop system"""
         try:
             # Remove from database
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                 cursor = await db.execute(
                     'DELETE FROM drop_channels WHERE guild_id = ? AND channel_id = ?',
                     (guild_id, channel_id)
@@ -247,6 +284,13 @@ class WonderCoinsDropSystem:
             channel_key = f"{guild_id}_{channel_id}"
             if channel_key in self.channel_settings:
                 del self.channel_settings[channel_key]
+            self._invalidate_samplers(guild_id, channel_key)
+            self.channel_last_drop.pop(channel_key, None)
+            self.activity.forget(channel_key)
+            if not self.drop_channels.get(guild_id):
+                self.drop_scheduler.cancel(guild_id)
+                self._drop_plans.pop(guild_id, None)
+                self.activity.forget(guild_id)
             
             return {"success": True, "message": "Channel removed from drop system!"}
             
@@ -305,111 +349,158 @@ class WonderCoinsDropSystem:
             logging.error(f"Error getting channel list: {e}")
             return []
     
-    @tasks.loop(minutes=20)  # Check every 20 minutes (faster than before)
     async def start_drop_system(self):
-        """Enhanced drop system loop with dynamic timing"""
+        """Load drop channels and schedule each guild's first drop"""
         try:
-            # Random timing between 20 minutes to 2 hours
-            base_wait = random.randint(20, 120)
-            
-            # Apply global modifiers based on server activity
-            # Could be enhanced to check user activity levels
-            wait_minutes = base_wait
-            
-            await asyncio.sleep(wait_minutes * 60)
-            
-            # Select random guild and channel for drop
-            await self.create_random_drop()
-            
+            await self.client.wait_until_ready()
+            await self.initialize_drop_channels()
+            for guild_id in self.drop_channels:
+                self._schedule_next_drop(guild_id)
+            self.drop_scheduler.start()
         except Exception as e:
-            logging.error(f"Error in drop system: {e}")
+            logging.error(f"Error starting drop system: {e}")
+    
+    async def close(self):
+        """Stop scheduling drops and expiring them"""
+        self.update_drop_countdowns.cancel()
+        if not self._start_task.done():
+            self._start_task.cancel()
+            try:
+                await self._start_task
+            except asyncio.CancelledError:
+                pass
+        await self.drop_scheduler.stop()
+        await self.expiry_scheduler.stop()
+    
+    def record_activity(self, guild_id: str, channel_id: str):
+        """Count a message towards its guild's and channel's activity"""
+        # Only guilds with drop channels are ever scheduled, so nothing else needs tracking
+        channels = self.drop_channels.get(guild_id)
+        if not channels:
+            return
+        self.activity.record(guild_id)
+        if channel_id in channels:
+            self.activity.record(f"{guild_id}_{channel_id}")
+        
+        # A guild that has got busier since its drop was drawn gets it sooner
+        plan = self._drop_plans.get(guild_id)
+        deadline = self.drop_scheduler.deadline(guild_id)
+        if plan is None or deadline is None:
+            return
+        planned_at, base_wait = plan
+        when = planned_at + timedelta(seconds=self._drop_wait(guild_id, base_wait))
+        if when.timestamp() < deadline - self.reschedule_slack:
+            self.drop_scheduler.schedule(guild_id, max(when, datetime.now()))
+    
+    def _drop_wait(self, guild_id: str, base_wait: float) -> float:
+        """Seconds between drops for a drawn base wait, scaled down the busier the guild's chat is"""
+        rate = self.activity.rate(guild_id)
+        if rate > 0:
+            wait_seconds = base_wait * self.reference_activity / rate
+        else:
+            wait_seconds = self.max_interval
+        return min(self.max_interval, max(self.min_interval, wait_seconds))
+    
+    def _schedule_next_drop(self, guild_id: str):
+        """Draw the guild's next drop time, scaled down the busier its chat has been"""
+        base_wait = random.uniform(self.min_interval, self.max_interval)
+        now = datetime.now()
+        self._drop_plans[guild_id] = (now, base_wait)
+        self.drop_scheduler.schedule(guild_id, now + timedelta(seconds=self._drop_wait(guild_id, base_wait)))
+    
+    async def _run_guild_drop(self, guild_id: str):
+        """Scheduler callback: drop in one of the guild's channels if anyone is around, then reschedule"""
+        try:
+            if self.activity.rate(guild_id) >= self.min_activity:
+                channel_id = self._pick_drop_channel(guild_id)
+                if channel_id:
+                    await self.create_drop(guild_id, channel_id)
+        except Exception as e:
+            logging.error(f"Error creating drop for guild {guild_id}: {e}")
+        finally:
+            if self.drop_channels.get(guild_id):
+                self._schedule_next_drop(guild_id)
+    
+    def _pick_drop_channel(self, guild_id: str) -> Optional[str]:
+        """A channel chosen by frequency modifier, or the most active one if that had a drop too recently"""
+        guild = self.client.get_guild(int(guild_id))
+        channel_sampler = self._channel_sampler(guild_id)
+        if not guild or not channel_sampler:
+            return None
+        
+        now = datetime.now()
+        min_gap = timedelta(seconds=self.channel_min_interval)
+        
+        def available(channel_id: str) -> bool:
+            last_drop = self.channel_last_drop.get(f"{guild_id}_{channel_id}")
+            return (last_drop is None or now - last_drop >= min_gap) and guild.get_channel(int(channel_id)) is not None
+        
+        channel_id = channel_sampler.sample()
+        if available(channel_id):
+            return channel_id
+        candidates = [channel_id for channel_id in self.drop_channels[guild_id] if available(channel_id)]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda channel_id: self.activity.rate(f"{guild_id}_{channel_id}"))
     
     @tasks.loop(minutes=1)  # Update countdown every minute
     async def update_drop_countdowns(self):
         """Update countdown timers for active drops"""
         try:
             current_time = datetime.now()
-            expired_drops = []
+            edits_by_channel: Dict[str, List] = {}
             
             for message_id, drop_data in self.active_drops.items():
-                expires_at = drop_data['expires_at']
-                
-                # Check if drop has expired
-                if current_time >= expires_at:
-                    expired_drops.append(message_id)
-                    continue
-                
-                # Calculate remaining time
-                time_remaining = expires_at - current_time
+                # Calculate remaining time; expiry itself is handled by the scheduler
+                time_remaining = drop_data['expires_at'] - current_time
                 minutes_remaining = max(0, int(time_remaining.total_seconds() / 60))
+                if minutes_remaining <= 0:
+                    continue
                 
-                # Update embed footer with remaining time
-                try:
-                    guild = self.client.get_guild(int(drop_data['guild_id']))
-                    if guild:
-                        channel = guild.get_channel(int(drop_data['channel_id']))
-                        if channel:
-                            message = await channel.fetch_message(int(message_id))
-                            embed = message.embeds[0] if message.embeds else None
-                            
-                            if embed and minutes_remaining > 0:
-                                if minutes_remaining == 1:
-                                    embed.set_footer(text="Drop expires in less than 1 minute • Wonder drops are magical!")
-                                else:
-                                    embed.set_footer(text=f"Drop expires in {minutes_remaining} minutes • Wonder drops are magical!")
-                                
-                                await message.edit(embed=embed)
-                except Exception as e:
-                    logging.error(f"Error updating countdown for message {message_id}: {e}")
+                if minutes_remaining == 1:
+                    footer = "Drop expires in less than 1 minute • Wonder drops are magical!"
+                else:
+                    footer = f"Drop expires in {minutes_remaining} minutes • Wonder drops are magical!"
+                if footer == drop_data.get('footer'):
+                    continue
+                edits_by_channel.setdefault(drop_data['channel_id'], []).append((message_id, drop_data, footer))
             
-            # Clean up expired drops
-            for message_id in expired_drops:
-                await self._end_drop(message_id)
+            if edits_by_channel:
+                semaphore = asyncio.Semaphore(self.max_concurrent_edits)
+                await asyncio.gather(*(
+                    self._edit_channel_countdowns(edits, semaphore) for edits in edits_by_channel.values()
+                ))
                 
         except Exception as e:
             logging.error(f"Error updating drop countdowns: {e}")
     
-    async def create_random_drop(self):
-        """Create a random drop in a configured channel with advanced features"""
-        try:
-            if not self.drop_channels:
-                await self.initialize_drop_channels()
-            
-            if not self.drop_channels:
-                return
-            
-            # Select random guild
-            guild_id = random.choice(list(self.drop_channels.keys()))
-            guild = self.client.get_guild(int(guild_id))
-            
-            if not guild:
-                return
-            
-            # Select random channel from guild with frequency modifiers
-            channel_ids = self.drop_channels[guild_id]
-            
-            # Apply frequency modifiers
-            weighted_channels = []
-            for channel_id in channel_ids:
-                channel_key = f"{guild_id}_{channel_id}"
-                settings = self.channel_settings.get(channel_key, {})
-                modifier = settings.get('drop_frequency_modifier', 1.0)
-                
-                # Add channel multiple times based on frequency modifier
-                weight = max(1, int(modifier * 10))
-                weighted_channels.extend([channel_id] * weight)
-            
-            channel_id = random.choice(weighted_channels) if weighted_channels else random.choice(channel_ids)
-            channel = guild.get_channel(int(channel_id))
-            
-            if not channel:
-                return
-            
-            # Generate drop with channel-specific settings
-            await self.create_drop(guild_id, channel_id)
-            
-        except Exception as e:
-            logging.error(f"Error creating random drop: {e}")
+    async def _edit_channel_countdowns(self, edits: List, semaphore: asyncio.Semaphore):
+        """Edit one channel's drop countdowns in turn, sharing the global edit budget"""
+        for message_id, drop_data, footer in edits:
+            async with semaphore:
+                # The drop may have ended while waiting for a slot
+                if message_id not in self.active_drops:
+                    continue
+                try:
+                    message = await self._get_drop_message(message_id, drop_data)
+                    embed = drop_data.get('embed')
+                    if message and embed:
+                        embed.set_footer(text=footer)
+                        drop_data['message'] = await message.edit(embed=embed)
+                        drop_data['footer'] = footer
+                except Exception as e:
+                    logging.error(f"Error updating countdown for message {message_id}: {e}")
+    
+    async def _get_drop_message(self, message_id: str, drop_data: Dict[str, Any]) -> Optional[discord.Message]:
+        """The drop's message as last sent or edited, fetched only if it wasn't kept"""
+        message = drop_data.get('message')
+        if message is None:
+            guild = self.client.get_guild(int(drop_data['guild_id']))
+            channel = guild.get_channel(int(drop_data['channel_id'])) if guild else None
+            if channel:
+                message = await channel.fetch_message(int(message_id))
+                drop_data['message'] = message
+        return message
     
     async def create_drop(self, guild_id: str, channel_id: str, 
                         forced_amount: int = None, forced_rarity: str = None):
@@ -429,8 +520,7 @@ class WonderCoinsDropSystem:
             if forced_rarity:
                 rarity = forced_rarity
             else:
-                allowed_rarities = settings.get('allowed_rarities', ['common', 'rare', 'epic', 'legendary'])
-                rarity = self._determine_rarity(allowed_rarities, settings.get('custom_rarity_multiplier', 1.0))
+                rarity = self._rarity_sampler(channel_key, settings).sample()
             
             rarity_config = self.rarity_config[rarity]
             
@@ -462,10 +552,11 @@ class WonderCoinsDropSystem:
             
             # Send drop message with button
             message = await channel.send(embed=embed, view=DropCollectionView(self, "temp", expires_at))
+            self.channel_last_drop[channel_key] = created_at
             
             # Update view with correct message ID
             view = DropCollectionView(self, str(message.id), expires_at)
-            await message.edit(view=view)
+            message = await message.edit(view=view)
             
             # Store active drop with enhanced data including duration tracking
             self.active_drops[str(message.id)] = {
@@ -479,15 +570,17 @@ class WonderCoinsDropSystem:
                 'expires_at': expires_at,
                 'duration_minutes': drop_duration_minutes,
                 'channel_settings': settings,
-                'forced': bool(forced_amount or forced_rarity)
+                'forced': bool(forced_amount or forced_rarity),
+                # Kept so countdown and expiry edits don't refetch the message
+                'message': message,
+                'embed': embed
             }
             
             # Log the drop
             await self._log_drop_creation(guild_id, amount, rarity, collection_type['name'])
             
-            # Set expiry timer using duration tracking
-            expire_delay_seconds = drop_duration_minutes * 60
-            asyncio.create_task(self._expire_drop(message.id, expire_delay_seconds))
+            # Schedule expiry
+            self.expiry_scheduler.schedule(str(message.id), expires_at)
             
         except Exception as e:
             logging.error(f"Error creating drop: {e}")
@@ -522,9 +615,8 @@ class WonderCoinsDropSystem:
             # Calculate collection amount
             final_amount = await self._calculate_collection_amount(user, drop_data)
             
-            # Add to user balance
-            await database.create_user(str(user.id), user.name)
-            await database.update_balance(str(user.id), final_amount)
+            # Add to user balance (creates the user row if needed)
+            await database.increment_balance(str(user.id), final_amount, user.name)
             await database.add_transaction(str(user.id), 'wondercoins_drop', final_amount, 
                                           f'Drop collection: {drop_data["rarity"]} {collection_type["name"]}')
             
@@ -561,42 +653,54 @@ class WonderCoinsDropSystem:
             except:
                 pass
     
-    def _determine_rarity(self, allowed_rarities: List[str] = None, multiplier: float = 1.0) -> str:
-        """Determine the rarity of a drop based on chances and restrictions"""
+    def _rarity_weights(self, allowed_rarities: List[str] = None, multiplier: float = 1.0) -> List:
+        """(rarity, chance) pairs for the allowed rarities, with non-common chances scaled by the multiplier"""
         if not allowed_rarities:
             allowed_rarities = ['common', 'rare', 'epic', 'legendary']
         
-        # Filter rarity config to only allowed rarities
-        available_rarities = {k: v for k, v in self.rarity_config.items() if k in allowed_rarities}
-        
-        # Apply multiplier to rare item chances
-        if multiplier != 1.0:
-            for rarity_name, config in available_rarities.items():
-                if rarity_name != 'common':
-                    config = config.copy()
-                    config['chance'] = min(50, config['chance'] * multiplier)  # Cap at 50%
-        
-        rand = random.randint(1, 100)
-        cumulative_chance = 0
-        
-        for rarity, config in available_rarities.items():
-            cumulative_chance += config['chance']
-            if rand <= cumulative_chance:
-                return rarity
-        
-        return 'common'  # Fallback
+        weights = []
+        for rarity, rarity_config in self.rarity_config.items():
+            if rarity not in allowed_rarities:
+                continue
+            chance = rarity_config['chance']
+            if rarity != 'common' and multiplier != 1.0:
+                chance = min(50, chance * multiplier)  # Cap at 50%
+            weights.append((rarity, chance))
+        return weights
+    
+    def _rarity_sampler(self, channel_key: str, settings: Dict[str, Any]) -> AliasSampler:
+        """The channel's rarity picker, built on first use after its settings change"""
+        sampler = self._rarity_samplers.get(channel_key)
+        if sampler is None:
+            weights = self._rarity_weights(
+                settings.get('allowed_rarities'), settings.get('custom_rarity_multiplier', 1.0)
+            )
+            sampler = AliasSampler(weights or [('common', 1)])
+            self._rarity_samplers[channel_key] = sampler
+        return sampler
+    
+    def _channel_sampler(self, guild_id: str) -> Optional[AliasSampler]:
+        """The guild's drop channel picker, weighted by each channel's frequency modifier"""
+        sampler = self._channel_samplers.get(guild_id)
+        if sampler is None:
+            channel_ids = self.drop_channels.get(guild_id)
+            if not channel_ids:
+                return None
+            weights = []
+            for channel_id in channel_ids:
+                settings = self.channel_settings.get(f"{guild_id}_{channel_id}", {})
+                weights.append((channel_id, max(1, int(settings.get('drop_frequency_modifier', 1.0) * 10))))
+            sampler = AliasSampler(weights)
+            self._channel_samplers[guild_id] = sampler
+        return sampler
+    
+    def _invalidate_samplers(self, guild_id: str, channel_key: str):
+        self._rarity_samplers.pop(channel_key, None)
+        self._channel_samplers.pop(guild_id, None)
     
     def _determine_collection_type(self) -> Dict[str, Any]:
         """Determine the collection type for a drop"""
-        rand = random.randint(1, 100)
-        
-        cumulative_chance = 0
-        for collection in self.collection_types:
-            cumulative_chance += collection['chance']
-            if rand <= cumulative_chance:
-                return collection
-        
-        return self.collection_types[0]  # Fallback to standard
+        return self._collection_sampler.sample()
     
     def _create_enhanced_drop_embed(self, amount: int, rarity: str, collection_type: Dict[str, Any], 
                                   settings: Dict[str, Any], duration_minutes: int = 12) -> discord.Embed:
@@ -696,35 +800,21 @@ class WonderCoinsDropSystem:
     async def _log_drop_creation(self, guild_id: str, amount: int, rarity: str, collection_type: str):
         """Log drop creation to database"""
         try:
-            async with await database._get_connection() as db:
-                await db.execute(
-                    """INSERT INTO drop_stats 
-                       (guild_id, user_id, amount, rarity, collection_type)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (guild_id, 'SYSTEM', amount, rarity, f'created_{collection_type}')
-                )
-                await db.commit()
+            await database.audit_log.log_drop(guild_id, 'SYSTEM', amount, rarity, f'created_{collection_type}')
         except Exception as e:
             logging.error(f"Error logging drop creation: {e}")
     
     async def _log_drop_collection(self, guild_id: str, user_id: str, amount: int, rarity: str, collection_type: str):
         """Log drop collection to database"""
         try:
-            async with await database._get_connection() as db:
-                await db.execute(
-                    """INSERT INTO drop_stats 
-                       (guild_id, user_id, amount, rarity, collection_type)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (guild_id, user_id, amount, rarity, collection_type)
-                )
-                await db.commit()
+            await database.audit_log.log_drop(guild_id, user_id, amount, rarity, collection_type)
         except Exception as e:
             logging.error(f"Error logging drop collection: {e}")
     
     async def _update_user_drop_stats(self, user_id: str, amount: int, rarity: str):
         """Update user's drop statistics"""
         try:
-            async with await database._get_connection() as db:
+            async with database.write() as db:
                 # Check if user stats exist
                 async with db.execute(
                     'SELECT * FROM user_drop_stats WHERE user_id = ?', (user_id,)
@@ -753,53 +843,47 @@ class WonderCoinsDropSystem:
                     )
                 
                 await db.commit()
+            
+            database.leaderboards.add('drops', user_id, amount)
                     
         except Exception as e:
             logging.error(f"Error updating user drop stats: {e}")
     
-    async def _expire_drop(self, message_id: int, delay_seconds: int):
-        """Expire a drop after a delay"""
-        await asyncio.sleep(delay_seconds)
-        await self._end_drop(str(message_id))
-    
     async def _end_drop(self, message_id: str):
         """End a drop and clean up"""
-        if message_id in self.active_drops:
-            drop_data = self.active_drops[message_id]
-            
-            # Update drop message to show it ended and disable button
-            try:
-                guild = self.client.get_guild(int(drop_data['guild_id']))
-                if guild:
-                    channel = guild.get_channel(int(drop_data['channel_id']))
-                    if channel:
-                        message = await channel.fetch_message(int(message_id))
-                        
-                        # Update embed to show ended
-                        embed = message.embeds[0] if message.embeds else None
-                        if embed:
-                            embed.title = "💰 WonderCoins Drop (EXPIRED)"
-                            embed.color = discord.Color.gray()
-                            embed.set_footer(text=f"Drop expired • {len(drop_data['collectors'])} collectors")
-                        
-                        # Create disabled view
-                        disabled_view = DropCollectionView(self, message_id, drop_data['expires_at'])
-                        disabled_view.collect_drop.disabled = True
-                        disabled_view.collect_drop.label = 'Expired'
-                        disabled_view.collect_drop.style = discord.ButtonStyle.secondary
-                        
-                        await message.edit(embed=embed, view=disabled_view)
-            except Exception as e:
-                logging.error(f"Error updating expired drop message: {e}")
-            
-            # Remove from active drops
-            del self.active_drops[message_id]
+        # Removed first so the scheduler and a collection ending it at once can't both get here
+        drop_data = self.active_drops.pop(message_id, None)
+        if drop_data is None:
+            return
+        self.expiry_scheduler.cancel(message_id)
+        
+        # Update drop message to show it ended and disable button
+        try:
+            message = await self._get_drop_message(message_id, drop_data)
+            if message:
+                # Update embed to show ended
+                embed = drop_data.get('embed') or (message.embeds[0] if message.embeds else None)
+                if embed:
+                    embed.title = "💰 WonderCoins Drop (EXPIRED)"
+                    embed.color = discord.Color.dark_gray()
+                    embed.set_footer(text=f"Drop expired • {len(drop_data['collectors'])} collectors")
+                
+                # Create disabled view
+                disabled_view = DropCollectionView(self, message_id, drop_data['expires_at'])
+                disabled_view.collect_drop.disabled = True
+                disabled_view.collect_drop.label = 'Expired'
+                disabled_view.collect_drop.style = discord.ButtonStyle.secondary
+                
+                await message.edit(embed=embed, view=disabled_view)
+        except Exception as e:
+            logging.error(f"Error updating expired drop message: {e}")
     
     async def get_drop_stats(self, guild_id: str) -> Dict[str, Any]:
         """Get drop statistics for a guild"""
         try:
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            # Include drops still waiting in the audit log
+            await database.audit_log.flush()
+            async with database.read() as db:
                 
                 # Get total drops created
                 async with db.execute(
@@ -841,8 +925,7 @@ class WonderCoinsDropSystem:
     async def get_user_drop_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get drop statistics for a user"""
         try:
-            async with await database._get_connection() as db:
-                db.row_factory = aiosqlite.Row
+            async with database.read() as db:
                 async with db.execute(
                     'SELECT * FROM user_drop_stats WHERE user_id = ?', (user_id,)
                 ) as cursor:
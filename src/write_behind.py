@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class WriteBehindBuffer(ABC):
+    """Base for in-memory buffers that persist in the background on a timer or when full"""
+
+    name = "write-behind buffer"
+
+    def __init__(self, flush_interval: float = 10.0):
+        self.flush_interval = flush_interval
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def request_flush(self):
+        """Wake the background task to flush now instead of at the next interval"""
+        self._flush_requested.set()
+
+    async def _run(self):
+        """Flush every flush_interval seconds, or sooner when a flush is requested"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing {self.name}: {e}")
+
+    @abstractmethod
+    async def flush(self) -> int:
+        """Persist everything pending and return how many items were written"""
+
+    async def close(self):
+        """Stop the background task and flush whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
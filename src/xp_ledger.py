@@ -0,0 +1,126 @@
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+from write_behind import WriteBehindBuffer
+
+
+class XPLedger(WriteBehindBuffer):
+    """Write-behind accumulator for message XP, flushed to user_levels in batches"""
+
+    name = "XP ledger"
+
+    def __init__(self, database, flush_interval: float = 10.0, flush_events: int = 200,
+                 idle_seconds: float = 600.0):
+        super().__init__(flush_interval)
+        self.database = database
+        self.flush_events = flush_events
+        self.idle_seconds = idle_seconds
+
+        # user_id -> {'xp', 'loaded', 'pending_xp', 'pending_messages', 'last_xp_gain', 'touched'}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending_events = 0
+
+    async def _load(self, user_id: str) -> Dict[str, Any]:
+        """Return the ledger entry for a user, reading user_levels on first touch"""
+        entry = self._entries.get(user_id)
+        if entry and entry['loaded']:
+            return entry
+
+        # Don't read while a batch is in flight or its XP would be missed
+        async with self._flush_lock:
+            level_data = await self.database.get_user_level(user_id)
+
+        stored_xp = level_data.get('xp', 0) if level_data else 0
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = {
+                'xp': stored_xp,
+                'loaded': True,
+                'pending_xp': 0,
+                'pending_messages': 0,
+                'last_xp_gain': None,
+                'touched': time.monotonic()
+            }
+        elif not entry['loaded']:
+            # Unflushed deltas still sit on top of what is stored
+            entry['xp'] = stored_xp + entry['pending_xp']
+            entry['loaded'] = True
+        return entry
+
+    async def get_xp(self, user_id: str) -> int:
+        """Get a user's total XP including unflushed gains"""
+        entry = await self._load(user_id)
+        return entry['xp']
+
+    async def add_xp(self, user_id: str, xp_gain: int, messages: int = 1) -> Tuple[int, int]:
+        """Record an XP gain in memory and return (old_total_xp, new_total_xp)"""
+        entry = await self._load(user_id)
+
+        old_xp = entry['xp']
+        entry['xp'] = old_xp + xp_gain
+        entry['pending_xp'] += xp_gain
+        entry['pending_messages'] += messages
+        entry['last_xp_gain'] = datetime.now().isoformat()
+        entry['touched'] = time.monotonic()
+        self.database.leaderboards.set('xp', user_id, entry['xp'])
+
+        self._pending_events += 1
+        if self._pending_events >= self.flush_events:
+            self.request_flush()
+
+        return old_xp, entry['xp']
+
+    def pending_xp(self, user_id: str) -> int:
+        """XP gained by a user that hasn't been flushed yet"""
+        entry = self._entries.get(user_id)
+        return entry['pending_xp'] if entry else 0
+
+    def invalidate(self, user_id: str):
+        """Forget the cached total for a user after an out-of-band write to user_levels"""
+        entry = self._entries.get(user_id)
+        if entry:
+            entry['loaded'] = False
+
+    async def flush(self) -> int:
+        """Write all pending deltas in one transaction and return the number of users written"""
+        async with self._flush_lock:
+            rows: List[Tuple[str, int, int, int, str]] = []
+            for user_id, entry in self._entries.items():
+                if entry['pending_xp'] or entry['pending_messages']:
+                    # The level column follows the same curve as update_user_xp, so voice and role XP
+                    # don't see it as behind and report a level up again
+                    rows.append((user_id, entry['pending_xp'], self.database._calculate_level(entry['xp']),
+                                 entry['pending_messages'], entry['last_xp_gain']))
+                    entry['pending_xp'] = 0
+                    entry['pending_messages'] = 0
+            self._pending_events = 0
+
+            if not rows:
+                return 0
+
+            try:
+                await self.database.apply_xp_deltas(rows)
+            except Exception as e:
+                logging.error(f"Error flushing XP ledger ({len(rows)} users): {e}")
+                # Put the deltas back so the next flush retries them
+                for user_id, xp_delta, _, message_delta, _ in rows:
+                    entry = self._entries[user_id]
+                    entry['pending_xp'] += xp_delta
+                    entry['pending_messages'] += message_delta
+                return 0
+
+            self._evict_idle()
+            return len(rows)
+
+    def _evict_idle(self):
+        """Drop fully flushed entries for users who haven't gained XP recently"""
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [
+            user_id for user_id, entry in self._entries.items()
+            if entry['touched'] < cutoff and not entry['pending_xp'] and not entry['pending_messages']
+        ]
+        for user_id in idle:
+            del self._entries[user_id]